@@ -38,6 +38,8 @@ setup(
             # grid
             "GridFiltering = py_eddy_tracker.appli.grid:grid_filtering",
             "EddyId = py_eddy_tracker.appli.grid:eddy_id",
+            "EddyIdBatch = py_eddy_tracker.appli.grid:eddy_id_batch",
+            "EddyIdCube = py_eddy_tracker.appli.grid:eddy_id_cube",
             # eddies
             "MergeEddies = py_eddy_tracker.appli.eddies:merge_eddies",
             "EddyFrequency = py_eddy_tracker.appli.eddies:get_frequency_grid",
@@ -55,6 +57,7 @@ setup(
             "GUIEddy = py_eddy_tracker.appli.gui:guieddy",
             # misc
             "ZarrDump = py_eddy_tracker.appli.misc:zarrdump",
+            "EddyWarmup = py_eddy_tracker.appli.misc:eddy_warmup",
         ]
     ),
     package_data={
@@ -22,10 +22,9 @@ Email: evanmason@gmail.com
 
 from argparse import ArgumentParser
 from datetime import datetime
+from functools import lru_cache
 import logging
 
-import zarr
-
 from ._version import get_versions
 
 __version__ = get_versions()["version"]
@@ -120,6 +119,19 @@ def identify_time(str_date):
     raise Exception("No time model found")
 
 
+@lru_cache(maxsize=None)
+def unit_registry():
+    """Give unit registry shared by all the package, because creation of registry is slow
+
+    :return: pint registry
+    :rtype: pint.UnitRegistry
+    """
+    from pint import UnitRegistry
+
+    return UnitRegistry()
+
+
+# zarr filters are given as numcodecs configurations, codecs are only built when writing zarr
 VAR_DESCR = dict(
     time=dict(
         attr_name="time",
@@ -318,7 +330,7 @@ VAR_DESCR = dict(
         output_type="u2",
         scale_factor=0.0001,
         nc_type="f4",
-        # filters=[zarr.Delta('u2')],
+        # filters=[dict(id="delta", dtype="u2")],
         nc_dims=("obs", "NbSample"),
         nc_attr=dict(
             long_name="Radial Speed Profile",
@@ -454,7 +466,7 @@ VAR_DESCR = dict(
         nc_name="effective_contour_longitude",
         old_nc_name=["contour_lon_e"],
         nc_type="f4",
-        filters=[zarr.Delta("i2")],
+        filters=[dict(id="delta", dtype="i2")],
         output_type="i2",
         scale_factor=0.01,
         add_offset=180.0,
@@ -471,7 +483,7 @@ VAR_DESCR = dict(
         nc_name="effective_contour_latitude",
         old_nc_name=["contour_lat_e"],
         nc_type="f4",
-        filters=[zarr.Delta("i2")],
+        filters=[dict(id="delta", dtype="i2")],
         output_type="i2",
         scale_factor=0.01,
         nc_dims=("obs", "NbSample"),
@@ -498,7 +510,7 @@ VAR_DESCR = dict(
         nc_name="speed_contour_longitude",
         old_nc_name=["contour_lon_s"],
         nc_type="f4",
-        filters=[zarr.Delta("i2")],
+        filters=[dict(id="delta", dtype="i2")],
         output_type="i2",
         scale_factor=0.01,
         add_offset=180.0,
@@ -515,7 +527,7 @@ VAR_DESCR = dict(
         nc_name="speed_contour_latitude",
         old_nc_name=["contour_lat_s"],
         nc_type="f4",
-        filters=[zarr.Delta("i2")],
+        filters=[dict(id="delta", dtype="i2")],
         output_type="i2",
         scale_factor=0.01,
         nc_dims=("obs", "NbSample"),
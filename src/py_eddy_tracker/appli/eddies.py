@@ -174,6 +174,23 @@ def eddies_tracking():
         default=0,
         help="Nb of detection which will not use at the end of the period",
     )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=0,
+        help="Number of next identification files loaded in background during tracking",
+    )
+    parser.add_argument(
+        "--nb_process",
+        type=int,
+        default=1,
+        help="Number of process to track couples of files, only without virtual observations",
+    )
+    parser.add_argument(
+        "--track_store",
+        help="Zarr store where observations of new steps are appended to tracks, "
+        "in place of writing all track files",
+    )
     parser.memory_arg()
     args = parser.parse_args()
 
@@ -215,6 +232,9 @@ def eddies_tracking():
         virtual=int(config.get("VIRTUAL_LENGTH_MAX", 0)),
         previous_correspondance=c_in,
         memory=args.memory,
+        prefetch=args.prefetch,
+        nb_process=args.nb_process,
+        track_store=args.track_store,
         correspondances_only=args.save_correspondance_and_stop,
         raw=not args.unraw,
         zarr=args.zarr,
@@ -305,6 +325,7 @@ def track(
     zarr=False,
     blank_period=0,
     correspondances_only=False,
+    track_store=None,
     **kw_c,
 ):
     kw = dict(date_regexp=".*_([0-9]*?).[nz].*")
@@ -337,6 +358,10 @@ def track(
     c.save(c_out, kw_save)
     if correspondances_only:
         return
+    if track_store is not None:
+        logger.info("Append new steps in %s", track_store)
+        c.append_to_store(track_store)
+        return
 
     logger.info("Start merging")
     c.prepare_merging()
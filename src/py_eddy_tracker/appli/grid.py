@@ -3,9 +3,26 @@
 All entry point to manipulate grid
 """
 from argparse import Action
+from contextlib import nullcontext
+from datetime import datetime
+import logging
+from multiprocessing import Pool, cpu_count
+from os.path import basename, dirname, exists
+from traceback import format_exc
 
 from .. import EddyParser, identify_time
-from ..dataset.grid import RegularGridDataset, UnRegularGridDataset
+from ..dataset.grid import (
+    CurvilinearIndexCache,
+    GridCache,
+    IdentificationStats,
+    KernelCache,
+    NoStats,
+    RegularGridDataset,
+    UnRegularGridDataset,
+)
+from .eddies import browse_dataset_in
+
+logger = logging.getLogger("pet")
 
 
 def filtering_parser():
@@ -23,6 +40,8 @@ def filtering_parser():
     )
     parser.add_argument("--filter_order", default=3, type=int)
     parser.add_argument("--low", action="store_true")
+    help = "Directory to store filter kernels, to reuse them for grids with the same resolution"
+    parser.add_argument("--kernel_cache", default=None, help=help)
     parser.add_argument(
         "--extend",
         default=0,
@@ -35,7 +54,10 @@ def filtering_parser():
 def grid_filtering():
     args = filtering_parser().parse_args()
 
-    h = RegularGridDataset(args.filename, args.longitude, args.latitude)
+    kw_grid = dict()
+    if args.kernel_cache is not None:
+        kw_grid["kernel_cache"] = KernelCache(args.kernel_cache)
+    h = RegularGridDataset(args.filename, args.longitude, args.latitude, **kw_grid)
     if args.low:
         h.bessel_low_filter(
             args.grid, args.cut_wavelength, order=args.filter_order, extend=args.extend
@@ -58,10 +80,8 @@ class DictAction(Action):
         setattr(namespace, self.dest, indexs)
 
 
-def eddy_id(args=None):
-    parser = EddyParser("Eddy Identification")
-    parser.add_argument("filename")
-    parser.add_argument("datetime")
+def add_identification_argument(parser):
+    """Arguments shared by identification applications"""
     parser.add_argument("h")
     parser.add_argument("u", help="If it s None, it will be deduce from h")
     parser.add_argument("v", help="If it s None, it will be deduce from h")
@@ -76,6 +96,15 @@ def eddy_id(args=None):
         "--cut_wavelength", default=[500], type=float, help=help, nargs="+"
     )
     parser.add_argument("--filter_order", default=3, type=int)
+    help = (
+        "Directory to store filter kernels (spatial index for unregular grids), "
+        "to reuse them for grids with the same resolution"
+    )
+    parser.add_argument("--kernel_cache", default=None, help=help)
+    help = "Directory to store filtered grids and u/v, to reuse them with other identification parameters"
+    parser.add_argument("--grid_cache", default=None, help=help)
+    help = "Maximal size of grid cache in GB, least recently used grids are removed"
+    parser.add_argument("--grid_cache_size", default=10, type=float, help=help)
     help = "Step between 2 isoline in m"
     parser.add_argument("--isoline_step", default=0.002, type=float, help=help)
     help = "Error max accepted to fit circle in percent"
@@ -105,8 +134,17 @@ def eddy_id(args=None):
     )
     help = "Minimal number of amplitude in number of step"
     parser.add_argument("--nb_step_min", default=2, type=int, help=help)
-    args = parser.parse_args(args) if args else parser.parse_args()
+    help = "Load grid and compute filtering, u/v and identification in single precision"
+    parser.add_argument("--float32", action="store_true", help=help)
+
 
+def identification_kwargs(args):
+    """Translate arguments of :py:func:`add_identification_argument` in
+    keywords for :py:func:`identification`
+
+    :return: keywords without filename and date
+    :rtype: dict
+    """
     if len(args.pixel_limit) != 2:
         raise Exception(
             "You must define two value minimal number of pixel and maximal number of pixel"
@@ -120,38 +158,202 @@ def eddy_id(args=None):
         cut_wavelength = [0, *cut_wavelength]
     inf_bnds, upper_bnds = cut_wavelength
 
-    date = identify_time(args.datetime)
-    kwargs = dict(
-        step=args.isoline_step,
-        shape_error=args.fit_errmax,
-        pixel_limit=args.pixel_limit,
-        force_height_unit=args.height_unit,
-        force_speed_unit=args.speed_unit,
-        nb_step_to_be_mle=0,
-        nb_step_min=args.nb_step_min,
-    )
-
-    a, c = identification(
-        args.filename,
-        args.longitude,
-        args.latitude,
-        date,
-        args.h,
-        args.u,
-        args.v,
+    return dict(
+        lon=args.longitude,
+        lat=args.latitude,
+        h=args.h,
+        u=args.u,
+        v=args.v,
         unregular=args.unregular,
         cut_wavelength=upper_bnds,
         cut_highwavelength=inf_bnds,
         lat_max=args.lat_max,
         filter_order=args.filter_order,
+        kernel_cache=args.kernel_cache,
+        grid_cache=args.grid_cache,
+        grid_cache_size=args.grid_cache_size,
+        dtype="f4" if args.float32 else None,
         indexs=args.indexs,
         sampling=args.sampling,
         sampling_method=args.sampling_method,
-        **kwargs,
+        step=args.isoline_step,
+        shape_error=args.fit_errmax,
+        pixel_limit=args.pixel_limit,
+        force_height_unit=args.height_unit,
+        force_speed_unit=args.speed_unit,
+        nb_step_to_be_mle=0,
+        nb_step_min=args.nb_step_min,
     )
-    out_name = date.strftime("%(path)s/%(sign_type)s_%Y%m%dT%H%M%S.nc")
+
+
+OUT_NAME = "%(path)s/%(sign_type)s_%Y%m%dT%H%M%S.nc"
+
+
+def eddy_id(args=None):
+    parser = EddyParser("Eddy Identification")
+    parser.add_argument("filename")
+    parser.add_argument("datetime")
+    add_identification_argument(parser)
+    help = "Write in this json file counts of rejected contours by reason and time spent by stage"
+    parser.add_argument("--stats", default=None, help=help)
+    args = parser.parse_args(args) if args else parser.parse_args()
+
+    kwargs = identification_kwargs(args)
+    date = identify_time(args.datetime)
+    stats = None if args.stats is None else IdentificationStats()
+    a, c = identification(args.filename, date=date, stats=stats, **kwargs)
+    out_name = date.strftime(OUT_NAME)
     a.write_file(path=args.path_out, filename=out_name, zarr_flag=args.zarr)
     c.write_file(path=args.path_out, filename=out_name, zarr_flag=args.zarr)
+    if stats is not None:
+        stats.to_json(args.stats)
+
+
+def eddy_id_cube(args=None):
+    parser = EddyParser("Eddy Identification on each time step of a cube")
+    parser.add_argument("filename")
+    parser.add_argument("time", help="Name of time variable")
+    add_identification_argument(parser)
+    help = "Indexes of time steps to identify, all steps by default"
+    parser.add_argument("--steps", nargs="+", type=int, default=None, help=help)
+    help = "Write in this json file counts of rejected contours by reason and time spent by stage"
+    parser.add_argument("--stats", default=None, help=help)
+    args = parser.parse_args(args) if args else parser.parse_args()
+
+    kwargs = identification_kwargs(args)
+    stats = None if args.stats is None else IdentificationStats()
+    cube = identification_cube(
+        args.filename, t_name=args.time, steps=args.steps, stats=stats, **kwargs
+    )
+    for date, a, c in cube:
+        out_name = date.strftime(OUT_NAME)
+        a.write_file(path=args.path_out, filename=out_name, zarr_flag=args.zarr)
+        c.write_file(path=args.path_out, filename=out_name, zarr_flag=args.zarr)
+        logger.info("Identification done for %s", date)
+    if stats is not None:
+        stats.to_json(args.stats)
+
+
+def identification_outputs(date, path_out, zarr=False):
+    """Give filenames which will be produced by an identification
+
+    :param datetime.datetime date: date of identification
+    :param str path_out: output directory
+    :param bool zarr: if True, zarr name will be given
+    :return: anticyclonic and cyclonic filenames
+    :rtype: list(str)
+    """
+    out_name = date.strftime(OUT_NAME)
+    filenames = list()
+    for sign_type in ("Anticyclonic", "Cyclonic"):
+        filename = out_name % dict(path=path_out, sign_type=sign_type)
+        if zarr:
+            filename = filename.replace(".nc", ".zarr")
+        filenames.append(filename)
+    return filenames
+
+
+def _identification_task(task):
+    """Run one identification in a worker, errors are returned and not raised
+    to keep worker alive for next dates
+    """
+    filename, date, path_out, zarr, kwargs = task
+    try:
+        a, c = identification(filename, date=date, **kwargs)
+        out_name = date.strftime(OUT_NAME)
+        a.write_file(path=path_out, filename=out_name, zarr_flag=zarr)
+        c.write_file(path=path_out, filename=out_name, zarr_flag=zarr)
+    except Exception:
+        return filename, date, format_exc()
+    return filename, date, None
+
+
+def eddy_id_batch(args=None):
+    parser = EddyParser("Eddy Identification on a list of grids")
+    parser.add_argument(
+        "pattern", nargs="+", help="Give an expression which will use with glob"
+    )
+    add_identification_argument(parser)
+    help = "Regular expression to extract date from filename, or 'variable:attribute' to read it"
+    parser.add_argument(
+        "--date_regexp", default=".*_([0-9]*?).[nz].*", type=str, help=help
+    )
+    help = "Date model to decode date (like %%Y%%m%%d), if not set we try to guess"
+    parser.add_argument("--date_model", default=None, type=str, help=help)
+    help = "Number of process used, each process will treat one date after the other"
+    parser.add_argument("--nb_process", default=cpu_count(), type=int, help=help)
+    help = "Compute again dates for which outputs already exist"
+    parser.add_argument("--overwrite", action="store_true", help=help)
+    args = parser.parse_args(args) if args else parser.parse_args()
+
+    kwargs = identification_kwargs(args)
+    if len(args.pattern) == 1:
+        kw_browse = dict(
+            data_dir=dirname(args.pattern[0]), files_model=basename(args.pattern[0])
+        )
+    else:
+        kw_browse = dict(data_dir=None, files_model=None, files=args.pattern)
+    datasets = browse_dataset_in(
+        date_regexp=args.date_regexp, date_model=args.date_model, **kw_browse
+    )
+    tasks = list()
+    for filename, date in datasets:
+        date = date.astype(datetime)
+        if not args.overwrite and all(
+            exists(i) for i in identification_outputs(date, args.path_out, args.zarr)
+        ):
+            logger.info("Identification already done for %s", date)
+            continue
+        tasks.append((filename.decode("utf-8"), date, args.path_out, args.zarr, kwargs))
+    logger.info("%d identifications to compute", len(tasks))
+
+    failures = list()
+    nb_process = max(min(args.nb_process, len(tasks)), 1)
+    # Workers stay alive for all dates, so imports and numba compilation are done once
+    # by worker, pool is terminated even if a date raises
+    with Pool(nb_process) if nb_process > 1 else nullcontext() as pool:
+        if pool is None:
+            results = map(_identification_task, tasks)
+        else:
+            results = pool.imap_unordered(_identification_task, tasks)
+        for filename, date, error in results:
+            if error is None:
+                logger.info("Identification done for %s (%s)", date, filename)
+            else:
+                logger.error(
+                    "Identification failed for %s (%s) :\n%s", date, filename, error
+                )
+                failures.append(date)
+    if len(failures):
+        failures.sort()
+        raise Exception(
+            "%d/%d identifications failed : %s"
+            % (len(failures), len(tasks), ", ".join(str(i) for i in failures))
+        )
+
+
+def grid_options(
+    unregular=False,
+    kernel_cache=None,
+    grid_cache=None,
+    grid_cache_size=10,
+    dtype=None,
+):
+    """Give grid class and its keywords for identification
+
+    :return: grid class and keywords
+    :rtype: class, dict
+    """
+    kw_grid = dict(dtype=dtype)
+    if grid_cache is not None:
+        kw_grid["cache"] = GridCache(grid_cache, max_size=int(grid_cache_size * 2**30))
+    if unregular:
+        if kernel_cache is not None:
+            kw_grid["index_cache"] = CurvilinearIndexCache(kernel_cache)
+        return UnRegularGridDataset, kw_grid
+    if kernel_cache is not None:
+        kw_grid["kernel_cache"] = KernelCache(kernel_cache)
+    return RegularGridDataset, kw_grid
 
 
 def identification(
@@ -163,21 +365,87 @@ def identification(
     u="None",
     v="None",
     unregular=False,
+    kernel_cache=None,
+    grid_cache=None,
+    grid_cache_size=10,
+    dtype=None,
+    indexs=None,
+    **kwargs
+):
+    grid_class, kw_grid = grid_options(
+        unregular, kernel_cache, grid_cache, grid_cache_size, dtype
+    )
+    grid = grid_class(filename, lon, lat, indexs=indexs, **kw_grid)
+    return grid_identification(grid, date, h, u, v, **kwargs)
+
+
+def identification_cube(
+    filename,
+    lon,
+    lat,
+    t_name,
+    h,
+    u="None",
+    v="None",
+    unregular=False,
+    kernel_cache=None,
+    grid_cache=None,
+    grid_cache_size=10,
+    dtype=None,
+    indexs=None,
+    steps=None,
+    **kwargs
+):
+    """Identification on each time step of a cube, file is opened once and
+    coordinates, kernels and units are shared by all steps
+
+    :param str t_name: name of time variable
+    :param None,list(int) steps: indexes of time steps to identify, all by default
+    :param kwargs: look at :py:func:`identification`
+    :return: date, anticyclonic and cyclonic eddies of each step
+    :rtype: iterator(datetime, EddiesObservations, EddiesObservations)
+    """
+    grid_class, kw_grid = grid_options(
+        unregular, kernel_cache, grid_cache, grid_cache_size, dtype
+    )
+    cube = grid_class.iter_netcdf_cube(
+        filename, lon, lat, t_name, steps=steps, indexs=indexs, **kw_grid
+    )
+    for date, grid in cube:
+        yield (date, *grid_identification(grid, date, h, u, v, **kwargs))
+
+
+def grid_identification(
+    grid,
+    date,
+    h,
+    u="None",
+    v="None",
     cut_wavelength=500,
     cut_highwavelength=0,
     lat_max=85,
     filter_order=1,
-    indexs=None,
+    stats=None,
     **kwargs
 ):
-    grid_class = UnRegularGridDataset if unregular else RegularGridDataset
-    grid = grid_class(filename, lon, lat, indexs=indexs)
+    """Filter grid and identify eddies on it
+
+    :param GridDataset grid: grid where eddies will be identified
+    :param datetime.datetime date: date of grid
+    :param kwargs: look at :py:meth:`~py_eddy_tracker.dataset.grid.GridDataset.eddy_identification`
+    :return: anticyclonic and cyclonic eddies
+    """
+    if stats is None:
+        stats = NoStats
     if u == "None" and v == "None":
-        grid.add_uv(h)
+        with stats.stage("add_uv"):
+            grid.add_uv(h)
         u, v = "u", "v"
     kw_filter = dict(order=filter_order, lat_max=lat_max)
-    if cut_highwavelength != 0:
-        grid.bessel_low_filter(h, cut_highwavelength, **kw_filter)
-    if cut_wavelength != 0:
-        grid.bessel_high_filter(h, cut_wavelength, **kw_filter)
-    return grid.eddy_identification(h, u, v, date, **kwargs)
+    with stats.stage("filter"):
+        if cut_highwavelength != 0:
+            grid.bessel_low_filter(h, cut_highwavelength, **kw_filter)
+        if cut_wavelength != 0:
+            grid.bessel_high_filter(h, cut_wavelength, **kw_filter)
+    with stats.stage("identification"):
+        return grid.eddy_identification(h, u, v, date, stats=stats, **kwargs)
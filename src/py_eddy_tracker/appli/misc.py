@@ -3,8 +3,16 @@
 Entry point with no direct link with eddies
 """
 import argparse
+from datetime import datetime
+import logging
+from os import environ
+import sys
 
-import zarr
+from .. import EddyParser
+
+logger = logging.getLogger("pet")
+
+WARMUP_STEPS = ("identification", "tracking", "advection")
 
 
 def zarr_header_parser():
@@ -15,6 +23,144 @@ def zarr_header_parser():
 
 def zarrdump():
     args = zarr_header_parser().parse_args()
+    import zarr
+
     print(args.dataset)
     for v in zarr.open(args.dataset).values():
         print(v.info)
+
+
+def compiled_kernels():
+    """Get numba kernels of py_eddy_tracker and their compiled signatures
+
+    :return: signatures by kernel name
+    :rtype: dict
+    """
+    from numba.core.registry import CPUDispatcher
+
+    kernels = dict()
+    for module_name, module in list(sys.modules.items()):
+        if not module_name.startswith("py_eddy_tracker") or module is None:
+            continue
+        for name, item in vars(module).items():
+            if isinstance(item, CPUDispatcher) and item.__module__ == module_name:
+                kernels[f"{module_name}.{name}"] = list(item.signatures)
+    return kernels
+
+
+def warmup_identification():
+    from ..data import get_demo_path
+    from .grid import identification
+
+    filename = get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc")
+    for sampling_method in ("visvalingam", "uniform"):
+        eddies = identification(
+            filename,
+            "longitude",
+            "latitude",
+            datetime(2019, 2, 23),
+            "adt",
+            sampling_method=sampling_method,
+        )
+    return eddies
+
+
+def warmup_tracking(eddies):
+    import zarr
+
+    from ..tracking import Correspondances
+
+    for e in eddies:
+        datasets = list()
+        for i in range(3):
+            h = zarr.group()
+            e_ = e.copy()
+            e_.time[:] += i
+            e_.to_zarr(h)
+            datasets.append(h)
+        c = Correspondances(datasets=datasets, virtual=1)
+        c.track()
+        c.prepare_merging()
+        c.merge(raw_data=False)
+
+
+def warmup_advection():
+    from numpy import arange, meshgrid
+
+    from ..data import get_demo_path
+    from ..dataset.grid import GridCollection, RegularGridDataset
+
+    x0, y0 = meshgrid(arange(32, 35, 0.5), arange(32.5, 34.5, 0.5))
+    x0, y0 = x0.reshape(-1), y0.reshape(-1)
+    c = GridCollection.from_netcdf_cube(
+        get_demo_path("dt_med_allsat_phy_l4_2005T2.nc"),
+        "longitude",
+        "latitude",
+        "time",
+        unset=True,
+    )
+    kw = dict(h_name="adt", t_init=20210, nb_step=1, time_step=14400, nb_time=2)
+    for rk4 in (True, False):
+        c.path(x0, y0, rk4=rk4, **kw)
+    g = RegularGridDataset(
+        get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc"),
+        "longitude",
+        "latitude",
+    )
+    g.add_uv("adt")
+    for rk4 in (True, False):
+        next(g.advect(x0.copy(), y0.copy(), "u", "v", nb_step=2, rk4=rk4))
+    for method in ("bilinear", "nearest"):
+        g.interp("adt", x0, y0, method=method)
+
+
+def warmup(steps=WARMUP_STEPS):
+    """Run pipeline on demo data to compile numba kernels, compiled kernels are stored
+    in numba cache (directory could be changed with environment variable NUMBA_CACHE_DIR)
+    and next processes will load them instead of compiling them again
+
+    :param list(str) steps: pipeline steps to run, among :py:data:`WARMUP_STEPS`
+    :return: signatures by kernel name
+    :rtype: dict
+    """
+    for step in steps:
+        if step not in WARMUP_STEPS:
+            raise Exception(f"Unknown warmup step : {step}")
+    if "identification" in steps or "tracking" in steps:
+        logger.info("Warmup identification")
+        eddies = warmup_identification()
+    if "tracking" in steps:
+        logger.info("Warmup tracking")
+        warmup_tracking(eddies)
+    if "advection" in steps:
+        logger.info("Warmup advection")
+        warmup_advection()
+    return compiled_kernels()
+
+
+def eddy_warmup(args=None):
+    parser = EddyParser("Compile numba kernels used by identification and tracking")
+    help = (
+        "Directory to store compiled kernels, workers must use the same directory "
+        "with environment variable NUMBA_CACHE_DIR"
+    )
+    parser.add_argument("--cache_dir", default=None, help=help)
+    parser.add_argument(
+        "--steps", nargs="+", default=WARMUP_STEPS, choices=WARMUP_STEPS
+    )
+    args = parser.parse_args(args) if args else parser.parse_args()
+    if args.cache_dir is not None:
+        if "numba" in sys.modules:
+            raise Exception("numba is already imported, cache directory can't be set")
+        environ["NUMBA_CACHE_DIR"] = args.cache_dir
+    kernels = warmup(args.steps)
+    nb_signature = sum(len(i) for i in kernels.values())
+    nb_compiled = sum(len(i) > 0 for i in kernels.values())
+    logger.info(
+        "%d/%d kernels ready with %d signatures",
+        nb_compiled,
+        len(kernels),
+        nb_signature,
+    )
+    for name, signatures in sorted(kernels.items()):
+        logger.debug("%s : %s", name, ", ".join(str(i) for i in signatures))
@@ -14,8 +14,6 @@ import lzma
 from os import path
 import tarfile
 
-import requests
-
 
 def get_demo_path(name):
     return path.join(path.dirname(__file__), name)
@@ -33,6 +31,8 @@ def get_remote_demo_sample(path):
                 return py_eddy_tracker_sample_id.get_remote_demo_sample(path)
             content = open(py_eddy_tracker_sample_id.get_remote_demo_sample(f"{path}.tar.xz"), "rb").read()
         except:
+            import requests
+
             if path.endswith(".nc"):
                 content = requests.get(
                     f"https://github.com/AntSimi/py-eddy-tracker-sample-id/raw/master/{path}"
@@ -2,24 +2,39 @@
 """
 Class to load and manipulate RegularGrid and UnRegularGrid
 """
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from copy import copy
 from datetime import datetime
+from glob import glob
+from hashlib import sha1
+import json
 import logging
+from multiprocessing import Pool
+from os import getpid, makedirs, remove, replace, stat, utime
+from os.path import exists, join
+from time import perf_counter
+from zlib import crc32
 
 from cv2 import filter2D
 from matplotlib.path import Path as BasePath
-from netCDF4 import Dataset
+from netCDF4 import Dataset, num2date
 from numba import njit, prange, types as numba_types
 import numpy as np
 from numpy import (
     arange,
     array,
+    bincount,
     ceil,
+    clip,
     concatenate,
     cos,
     deg2rad,
+    diff,
     empty,
     errstate,
     exp,
+    float32,
     float_,
     floor,
     histogram2d,
@@ -28,40 +43,39 @@ from numpy import (
     isnan,
     linspace,
     ma,
-    mean as np_mean,
     meshgrid,
     nan,
     nanmean,
+    nanmedian,
     ones,
     percentile,
     pi,
     radians,
+    repeat,
     sin,
     sinc,
     sqrt,
+    take_along_axis,
+    unique,
     where,
     zeros,
 )
-from pint import UnitRegistry
-from scipy.interpolate import RectBivariateSpline, interp1d
-from scipy.ndimage import gaussian_filter
-from scipy.signal import welch
-from scipy.spatial import cKDTree
-from scipy.special import j1
-
-from .. import VAR_DESCR
+
+from .. import VAR_DESCR, unit_registry
 from ..data import get_demo_path
 from ..eddy_feature import Amplitude, Contours
 from ..generic import (
     bbox_indice_regular,
     coordinates_to_local,
     distance,
+    interp2d_apply,
     interp2d_geo,
+    interp2d_indexes,
     local_to_coordinates,
     nearest_grd_indice,
     uniform_resample,
 )
-from ..observations.observation import EddiesObservations
+from ..observations.observation import EddiesObservations, ObservationsBuilder
 from ..poly import (
     create_vertice,
     fit_circle,
@@ -106,7 +120,7 @@ BasePath.lat = lat
 
 
 @njit(cache=True)
-def uniform_resample_stack(vertices, num_fac=2, fixed_size=None):
+def uniform_resample_stack(vertices, num_fac=2, fixed_size=-1):
     x_val, y_val = vertices[:, 0], vertices[:, 1]
     x_new, y_new = uniform_resample(x_val, y_val, num_fac, fixed_size)
     data = empty((x_new.shape[0], 2), dtype=vertices.dtype)
@@ -135,6 +149,57 @@ def mean_on_regular_contour(
         return values.mean()
 
 
+@njit(cache=True)
+def mean_on_regular_contours(
+    x_g,
+    y_g,
+    z_g,
+    m_g,
+    x_value,
+    y_value,
+    contour_index,
+    nb_pt_per_contour,
+    i_start,
+    i_stop,
+    num_fac=2,
+    nan_remove=False,
+):
+    """Same as :py:func:`mean_on_regular_contour` for contours from `i_start` to `i_stop`
+    read in flat buffers of :py:class:`~py_eddy_tracker.eddy_feature.Contours`
+    """
+    means = empty(i_stop - i_start)
+    for i in range(i_start, i_stop):
+        i0 = contour_index[i]
+        i1 = i0 + nb_pt_per_contour[i]
+        x_new, y_new = uniform_resample(x_value[i0:i1], y_value[i0:i1], num_fac, -1)
+        values = interp2d_geo(x_g, y_g, z_g, m_g, x_new[1:], y_new[1:])
+        means[i - i_start] = nanmean(values) if nan_remove else values.mean()
+    return means
+
+
+@njit(cache=True)
+def uniform_resample_contours(
+    x_value, y_value, contour_index, nb_pt_per_contour, i_start, i_stop, num_fac=2
+):
+    """Resample contours from `i_start` to `i_stop` like :py:func:`uniform_resample_stack`,
+    first point of each contour is removed
+
+    :return: resampled coordinates (N, 2) and number of points for each contour
+    """
+    nb_new = nb_pt_per_contour[i_start:i_stop] * num_fac - 1
+    data = empty((nb_new.sum(), 2), dtype=x_value.dtype)
+    j = 0
+    for i in range(i_start, i_stop):
+        i0 = contour_index[i]
+        i1 = i0 + nb_pt_per_contour[i]
+        x_new, y_new = uniform_resample(x_value[i0:i1], y_value[i0:i1], num_fac, -1)
+        nb = x_new.shape[0] - 1
+        data[j : j + nb, 0] = x_new[1:]
+        data[j : j + nb, 1] = y_new[1:]
+        j += nb
+    return data, nb_new
+
+
 def fit_circle_path(self, method="fit"):
     if not hasattr(self, "_circle_params"):
         self._circle_params = dict()
@@ -198,6 +263,121 @@ def _get_pixel_in_unregular(vertices, x_c, y_c, x_start, x_stop, y_start, y_stop
     return i_x, i_y
 
 
+@njit(cache=True)
+def lattice_query(
+    x, y, x0, y0, step, nb_x, nb_y, first, pixels, x_c, y_c, k, dist, idx
+):
+    """
+    Search k nearest pixels of each point in buckets of a lattice, buckets are
+    explored ring by ring around bucket of point until ring is farther than k-th
+    nearest pixel found.
+
+    :param array x: x of points
+    :param array y: y of points
+    :param float x0: x of first bucket
+    :param float y0: y of first bucket
+    :param float step: size of bucket
+    :param int nb_x: number of buckets along x
+    :param int nb_y: number of buckets along y
+    :param array first: index in `pixels` of first pixel of each bucket
+    :param array pixels: flat index of pixels sorted by bucket
+    :param array x_c: flat x of pixels
+    :param array y_c: flat y of pixels
+    :param int k: number of neighbours
+    :param array dist: array (nb point, k) where distances will be written
+    :param array idx: array (nb point, k) where flat indexes will be written
+    """
+    r_max = max(nb_x, nb_y)
+    for i_pt in range(x.shape[0]):
+        x_, y_ = x[i_pt], y[i_pt]
+        i0 = min(max(int(floor((x_ - x0) / step)), 0), nb_x - 1)
+        j0 = min(max(int(floor((y_ - y0) / step)), 0), nb_y - 1)
+        d, n = dist[i_pt], idx[i_pt]
+        d[:] = np.inf
+        n[:] = -1
+        for r in range(r_max + 1):
+            for i in range(max(i0 - r, 0), min(i0 + r + 1, nb_x)):
+                # Only border of ring, inside was already explored
+                border = i == i0 - r or i == i0 + r
+                for j in range(j0 - r, j0 + r + 1, 1 if border else 2 * r):
+                    if j < 0 or j >= nb_y:
+                        continue
+                    bucket = i * nb_y + j
+                    for p in pixels[first[bucket] : first[bucket + 1]]:
+                        d_ = (x_c[p] - x_) ** 2 + (y_c[p] - y_) ** 2
+                        if d_ >= d[k - 1]:
+                            continue
+                        # Sorted insertion
+                        i_k = k - 1
+                        while i_k > 0 and d[i_k - 1] > d_:
+                            d[i_k], n[i_k] = d[i_k - 1], n[i_k - 1]
+                            i_k -= 1
+                        d[i_k], n[i_k] = d_, p
+            # Pixels of next rings are at least at r * step
+            if d[k - 1] <= (r * step) ** 2:
+                break
+        for i_k in range(k):
+            d[i_k] = d[i_k] ** 0.5
+
+
+@njit(cache=True)
+def lattice_pixels_in(
+    vertices,
+    x0,
+    y0,
+    step,
+    nb_x,
+    nb_y,
+    first,
+    pixels,
+    x_c,
+    y_c,
+    nb_y_grid,
+    x_start,
+    x_stop,
+    y_start,
+    y_stop,
+):
+    """
+    Give flat indexes of pixels in a polygon, only pixels of buckets in bbox of
+    polygon and in index slices are tested
+
+    :param array vertices: polygon
+    :param int nb_y_grid: size of grid along second dimension
+    :param int x_start: first index along first dimension
+    :param int x_stop: last index (excluded) along first dimension
+    :param int y_start: first index along second dimension
+    :param int y_stop: last index (excluded) along second dimension
+    :return: sorted flat indexes
+    :rtype: array
+
+    Other parameters, look at :py:func:`lattice_query`
+    """
+    x_min, x_max = vertices[:, 0].min(), vertices[:, 0].max()
+    y_min, y_max = vertices[:, 1].min(), vertices[:, 1].max()
+    i0 = min(max(int(floor((x_min - x0) / step)), 0), nb_x - 1)
+    i1 = min(max(int(floor((x_max - x0) / step)), 0), nb_x - 1)
+    j0 = min(max(int(floor((y_min - y0) / step)), 0), nb_y - 1)
+    j1 = min(max(int(floor((y_max - y0) / step)), 0), nb_y - 1)
+    nb = 0
+    for i in range(i0, i1 + 1):
+        nb += first[i * nb_y + j1 + 1] - first[i * nb_y + j0]
+    selected = empty(nb, dtype=numba_types.int64)
+    nb = 0
+    for i in range(i0, i1 + 1):
+        for p in pixels[first[i * nb_y + j0] : first[i * nb_y + j1 + 1]]:
+            i_x, i_y = p // nb_y_grid, p % nb_y_grid
+            if i_x < x_start or i_x >= x_stop or i_y < y_start or i_y >= y_stop:
+                continue
+            x_, y_ = x_c[p], y_c[p]
+            if x_ < x_min or x_ > x_max or y_ < y_min or y_ > y_max:
+                continue
+            if winding_number_poly(x_, y_, vertices) != 0:
+                selected[nb] = p
+                nb += 1
+    return np.sort(selected[:nb])
+
+
 BasePath.fit_circle = fit_circle_path
 
 
@@ -236,6 +416,98 @@ BasePath.bbox_slice = bbox_slice
 BasePath.nb_pixel = nb_pixel
 
 
+class IdentificationStats(object):
+    """Counters of contours and time spent by stage during an eddy identification.
+
+    .. code-block:: python
+
+        stats = IdentificationStats()
+        a, c = g.eddy_identification("adt", "u", "v", date, stats=stats)
+        stats.to_json("stats.json")
+    """
+
+    __slots__ = ("timing", "counts")
+
+    #: Reject code stored in contours with their names
+    REJECT_REASONS = {
+        1: "shape_error",
+        2: "masked_pixels",
+        3: "pixel_limit",
+        4: "amplitude",
+    }
+
+    def __init__(self):
+        self.timing = dict()
+        self.counts = dict()
+
+    @contextmanager
+    def stage(self, name):
+        """Context which adds elapsed time to the stage `name`"""
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            self.timing[name] = self.timing.get(name, 0) + perf_counter() - t0
+
+    def count(self, group, reason):
+        """Count one contour
+
+        :param str group: group of counter, like anticyclonic or cyclonic
+        :param str reason: accepted or reason of rejection
+        """
+        counts = self.counts.setdefault(group, dict())
+        counts[reason] = counts.get(reason, 0) + 1
+
+    def reject(self, group, code):
+        """Count one rejected contour with its reject code"""
+        self.count(group, self.REJECT_REASONS[code])
+
+    def add(self, other):
+        """Add counters and time of an other stats, like stats of tiles identified
+        in other process
+
+        :param IdentificationStats other: stats to add
+        """
+        for name, elapsed in other.timing.items():
+            self.timing[name] = self.timing.get(name, 0) + elapsed
+        for group, counts in other.counts.items():
+            counts_ = self.counts.setdefault(group, dict())
+            for reason, nb in counts.items():
+                counts_[reason] = counts_.get(reason, 0) + nb
+
+    def to_dict(self):
+        return dict(
+            timing=dict(self.timing),
+            counts={group: dict(counts) for group, counts in self.counts.items()},
+        )
+
+    def to_json(self, filename):
+        """Write stats in a json file"""
+        with open(filename, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+
+NO_STAGE = nullcontext()
+
+
+class NoStats(object):
+    """Same interface than :py:class:`IdentificationStats`, used when stats are not asked"""
+
+    __slots__ = ()
+
+    @staticmethod
+    def stage(name):
+        return NO_STAGE
+
+    @staticmethod
+    def count(group, reason):
+        pass
+
+    @staticmethod
+    def reject(group, code):
+        pass
+
+
 class GridDataset(object):
     """
     Class for basic tools on NetCDF Grid
@@ -258,6 +530,10 @@ class GridDataset(object):
         "vars",
         "contours",
         "nan_mask",
+        "cache",
+        "vars_key",
+        "handler",
+        "dtype",
     )
 
     GRAVITY = 9.807
@@ -275,6 +551,8 @@ class GridDataset(object):
         indexs=None,
         unset=False,
         nan_masking=False,
+        cache=None,
+        dtype=None,
     ):
         """
         :param str filename: Filename to load
@@ -284,6 +562,10 @@ class GridDataset(object):
         :param dict indexs: A dictionary that sets indexes to use for non-coordinate dimensions
         :param bool unset: Set to True to create an empty grid object without file
         :param bool nan_masking: Set to True to replace data.mask with isnan method result
+        :param GridCache cache: Store for variables derived from file (filtering, u/v),
+            could be shared by several grids
+        :param str,None dtype: If defined (like "f4"), floating variables are cast in this type
+            when loaded, and filtering, u/v and identification are computed in this type
         """
         self.dimensions = None
         self.variables_description = None
@@ -295,6 +577,10 @@ class GridDataset(object):
         self.x_dim = None
         self.y_dim = None
         self.nan_mask = nan_masking
+        self.cache = cache
+        self.vars_key = dict()
+        self.handler = None
+        self.dtype = dtype
         self.centered = centered
         self.contours = None
         self.filename = filename
@@ -339,12 +625,86 @@ class GridDataset(object):
         else:
             return self.centered
 
+    def open(self):
+        """Open file of grid, if grid is linked to an opened handler, handler is given
+        and will not be closed
+
+        :return: context which gives a netCDF4 handler
+        """
+        if self.handler is None:
+            return Dataset(self.filename)
+        return nullcontext(self.handler)
+
+    def select_indexs(self, **indexs):
+        """Get grid of another layer of the same file (time, depth, ...), coordinates
+        and variables description are shared, file handler too if there is one
+
+        :param indexs: new indexes of non-coordinate dimensions
+        :return: grid with only coordinates loaded
+        :rtype: GridDataset
+        """
+        new = copy(self)
+        new.indexs = dict(self.indexs, **indexs)
+        new.vars = {k: self.vars[k] for k in self.coordinates}
+        new.vars_key = dict()
+        new.contours = None
+        new.variables_description = {
+            k: dict(v, infos=v["infos"].copy())
+            for k, v in self.variables_description.items()
+        }
+        return new
+
+    @classmethod
+    def iter_netcdf_cube(cls, filename, x_name, y_name, t_name, steps=None, **kwargs):
+        """Iterate on time steps of a netcdf cube, file is opened and coordinates are read
+        only once for all steps. File is closed at the end of iteration, grid of a step
+        uses the opened file only until next step, then it opens the file again if needed.
+
+        :param str filename: Filename to load
+        :param str x_name: Name of longitude coordinates
+        :param str y_name: Name of latitude coordinates
+        :param str t_name: Name of time variable, which must have same name as its dimension
+        :param None,list(int) steps: Indexes of time steps to iterate, all by default
+        :param kwargs: look at :py:meth:`__init__`
+        :return: date and grid of each step
+        :rtype: iterator(datetime, GridDataset)
+        """
+        indexs = kwargs.pop("indexs", None)
+        indexs = dict() if indexs is None else indexs.copy()
+        with Dataset(filename) as h:
+            t = h.variables[t_name]
+            if steps is None:
+                steps = range(t.shape[0])
+            dates = num2date(
+                t[:],
+                t.units,
+                getattr(t, "calendar", "standard"),
+                only_use_cftime_datetimes=False,
+                only_use_python_datetimes=True,
+            )
+            indexs[t_name] = steps[0] if len(steps) else 0
+            grid = cls(filename, x_name, y_name, indexs=indexs, unset=True, **kwargs)
+            grid.handler = h
+            grid.populate()
+            step_grid = None
+            try:
+                for i in steps:
+                    logger.debug("Step %d of %s", i, filename)
+                    step_grid = grid.select_indexs(**{t_name: i})
+                    yield dates[i], step_grid
+                    step_grid.handler = None
+            finally:
+                # Grids kept by caller must not use the closed handler
+                if step_grid is not None:
+                    step_grid.handler = None
+                grid.handler = None
+
     def load_general_features(self):
         """Load attrs to be stored in object"""
         logger.debug(
             "Load general feature from %(filename)s", dict(filename=self.filename)
         )
-        with Dataset(self.filename) as h:
+        with self.open() as h:
             # Load generals
             self.dimensions = {i: len(v) for i, v in h.dimensions.items()}
             self.variables_description = dict()
@@ -407,7 +767,7 @@ class GridDataset(object):
         Get coordinates and setup coordinates function
         """
         x_name, y_name = self.coordinates
-        with Dataset(self.filename) as h:
+        with self.open() as h:
             self.x_dim = h.variables[x_name].dimensions
             self.y_dim = h.variables[y_name].dimensions
 
@@ -481,7 +841,7 @@ class GridDataset(object):
         stored_units = self.variables_description[varname]["attrs"].get("units", None)
         if stored_units is not None:
             return stored_units
-        with Dataset(self.filename) as h:
+        with self.open() as h:
             var = h.variables[varname]
             if hasattr(var, "units"):
                 return var.units
@@ -535,7 +895,7 @@ class GridDataset(object):
                 "Load %(varname)s from %(filename)s",
                 dict(varname=varname, filename=self.filename),
             )
-            with Dataset(self.filename) as h:
+            with self.open() as h:
                 dims = h.variables[varname].dimensions
                 sl = [
                     indexs.get(
@@ -563,8 +923,85 @@ class GridDataset(object):
                     self.vars[varname],
                     mask=zeros(self.vars[varname].shape, dtype="bool"),
                 )
+            if self.dtype is not None and self.vars[varname].dtype.kind == "f":
+                self.vars[varname] = self.vars[varname].astype(self.dtype)
+            if self.cache is not None:
+                self.set_var_key(
+                    varname,
+                    GridCache.key(
+                        file_hash(self.filename),
+                        varname,
+                        sorted(self.indexs.items()),
+                        sorted(indexs.items()),
+                        self.nan_mask,
+                        self.dtype,
+                    ),
+                )
         return self.vars[varname]
 
+    @staticmethod
+    def content_checksum(var):
+        """Checksum of values and mask of a variable, to know if it was modified
+
+        :param array var: variable
+        :rtype: (int, int)
+        """
+        data = np.ascontiguousarray(ma.getdata(var))
+        mask = np.ascontiguousarray(ma.getmaskarray(var))
+        return crc32(data), crc32(mask)
+
+    def set_var_key(self, varname, key):
+        """Define key of variable content in cache, None to forget it"""
+        if key is None:
+            self.vars_key.pop(varname, None)
+        else:
+            var = self.vars[varname]
+            self.vars_key[varname] = key, self.content_checksum(var)
+
+    def var_key(self, varname):
+        """Give key of variable content in cache
+
+        :param str varname: variable name
+        :return: key, None if content is unknown (variable replaced or modified in
+            place since key was set)
+        :rtype: str
+        """
+        key, checksum = self.vars_key.get(varname, (None, None))
+        var = self.vars.get(varname)
+        if key is None or var is None or checksum != self.content_checksum(var):
+            return None
+        return key
+
+    def derive_vars(self, compute, sources, targets, operation, **params):
+        """Compute variables with cache, if cache is not set or if sources could not
+        be identified, variables are only computed
+
+        :param func compute: function without argument which fill targets in vars
+        :param list(str) sources: variables used by compute
+        :param list(str) targets: variables filled by compute
+        :param str operation: name of operation
+        :param dict params: all parameters which could change result
+        """
+        if self.cache is None:
+            return compute()
+        for name in sources:
+            # To be sure to have the key of data read in file
+            self.grid(name)
+        keys = [self.var_key(name) for name in sources]
+        if None in keys:
+            return compute()
+        key = GridCache.key(operation, keys, sorted(params.items()))
+        arrays = self.cache.get(key)
+        if arrays is None:
+            compute()
+            self.cache.set(key, [self.vars[name] for name in targets])
+        else:
+            logger.debug("%s read in cache for %s", operation, ", ".join(targets))
+            for name, array_ in zip(targets, arrays):
+                self.vars[name] = array_
+        for i, name in enumerate(targets):
+            self.set_var_key(name, GridCache.key(key, i))
+
     def grid_tiles(self, varname, slice_x, slice_y):
         """Give the grid tiles required, without buffer system"""
         coordinates_dims = list(self.x_dim)
@@ -578,7 +1015,7 @@ class GridDataset(object):
                 slice_x=slice_x,
             ),
         )
-        with Dataset(self.filename) as h:
+        with self.open() as h:
             dims = h.variables[varname].dimensions
             sl = [
                 (slice_x if dim in list(self.x_dim) else slice_y)
@@ -639,6 +1076,9 @@ class GridDataset(object):
         precision=None,
         force_height_unit=None,
         force_speed_unit=None,
+        levels_bounds=None,
+        contour_backend="native",
+        stats=None,
         **kwargs,
     ):
         """
@@ -659,6 +1099,12 @@ class GridDataset(object):
         :param float,None precision: Truncate values at the defined precision in m
         :param str force_height_unit: Unit used for height unit
         :param str force_speed_unit: Unit used for speed unit
+        :param (float,float),None levels_bounds:
+            Min and max height used to define levels, if None they are computed from grid
+        :param str contour_backend: Backend used to compute iso lines, 'native' or 'matplotlib'.
+            Look at :py:class:`py_eddy_tracker.eddy_feature.Contours`
+        :param IdentificationStats,None stats: If given, filled with contours counts by reason
+            of rejection and time spent by stage
         :param dict kwargs: Arguments given to amplitude (mle, nb_step_min, nb_step_to_be_mle).
             Look at :py:meth:`py_eddy_tracker.eddy_feature.Amplitude`
             The amplitude threshold is given by `step*nb_step_min`
@@ -674,6 +1120,8 @@ class GridDataset(object):
         # The inf limit must be in pixel and sup limit in surface
         if pixel_limit is None:
             pixel_limit = (4, 1000)
+        if stats is None:
+            stats = NoStats
 
         # Compute an interpolator for eke
         self.init_speed_coef(uname, vname)
@@ -682,7 +1130,7 @@ class GridDataset(object):
         h_units = (
             self.units(grid_height) if force_height_unit is None else force_height_unit
         )
-        units = UnitRegistry()
+        units = unit_registry()
         in_h_unit = units.parse_expression(h_units)
         if in_h_unit is not None:
             factor, _ = in_h_unit.to("m").to_tuple()
@@ -695,7 +1143,8 @@ class GridDataset(object):
                 precision /= factor
 
         # Get ssh grid
-        data = self.grid(grid_height).astype("f8")
+        data = self.grid(grid_height)
+        data = data.astype("f8" if self.dtype is None else self.dtype)
         # In case of a reduced mask
         if len(data.mask.shape) == 0 and not data.mask:
             data.mask = zeros(data.shape, dtype="bool")
@@ -703,24 +1152,10 @@ class GridDataset(object):
         if precision is not None:
             data = (data / precision).round() * precision
         # Compute levels for ssh
-        z_min, z_max = data.min(), data.max()
-        d_z = z_max - z_min
-        data_tmp = data[~data.mask]
-        epsilon = 0.001  # in %
-        z_min_p, z_max_p = (
-            percentile(data_tmp, epsilon),
-            percentile(data_tmp, 100 - epsilon),
-        )
-        d_zp = z_max_p - z_min_p
-        if d_z / d_zp > 2:
-            logger.warning(
-                "Maybe some extrema are present zmin %f (m) and zmax %f (m) will be replace by %f and %f",
-                z_min,
-                z_max,
-                z_min_p,
-                z_max_p,
-            )
-            z_min, z_max = z_min_p, z_max_p
+        if levels_bounds is None:
+            z_min, z_max = self.levels_bounds(data)
+        else:
+            z_min, z_max = levels_bounds
 
         logger.debug("Levels from %f to %f", z_min, z_max)
         levels = arange(z_min - z_min % step, z_max - z_max % step + 2 * step, step)
@@ -729,7 +1164,13 @@ class GridDataset(object):
         x, y = self.x_c, self.y_c
 
         # Compute ssh contour
-        self.contours = Contours(x, y, data, levels, wrap_x=self.is_circular())
+        with stats.stage("contours"):
+            self.contours = Contours(
+                x, y, data, levels, wrap_x=self.is_circular(), backend=contour_backend
+            )
+        # Speed of all contours in one pass, most of them will be read by get_uavg
+        with stats.stage("contour_speeds"):
+            contour_speeds = self.speed_coef_mean_contours(self.contours)
 
         out_sampling = dict(fixed_size=sampling)
         resample = visvalingam if sampling_method == "visvalingam" else uniform_resample
@@ -750,8 +1191,15 @@ class GridDataset(object):
         # Complete cyclonic and anticylonic research:
         a_and_c = list()
         for anticyclonic_search in [True, False]:
-            eddies = list()
+            eddies = ObservationsBuilder(
+                EddiesObservations(
+                    track_extra_variables=track_extra_variables,
+                    track_array_variables=sampling,
+                    array_variables=array_variables,
+                )
+            )
             iterator = 1 if anticyclonic_search else -1
+            group = "anticyclonic" if anticyclonic_search else "cyclonic"
 
             # Loop over each collection
             for coll_ind, coll in enumerate(self.contours.iter(step=iterator)):
@@ -774,29 +1222,35 @@ class GridDataset(object):
                 # Loop over individual c_s contours (i.e., every eddy in field)
                 for contour in contour_paths:
                     if contour.used:
+                        stats.count(group, "already_used")
                         continue
                     # FIXME : center could be outside the contour due to the fit
                     # FIXME : warning : the fit is made on raw sampling
-                    _, _, _, aerr = contour.fit_circle()
+                    with stats.stage("fit_circle"):
+                        _, _, _, aerr = contour.fit_circle()
 
                     # Filter for shape
                     if aerr < 0 or aerr > shape_error or isnan(aerr):
                         contour.reject = 1
+                        stats.reject(group, 1)
                         continue
 
                     # Find all pixels in the contour
-                    i_x_in, i_y_in = contour.pixels_in(self)
+                    with stats.stage("pixels_in"):
+                        i_x_in, i_y_in = contour.pixels_in(self)
 
                     # Check if pixels in contour are masked
                     if has_masked_value(data.mask, i_x_in, i_y_in):
                         if contour.reject == 0:
                             contour.reject = 2
+                        stats.reject(group, 2)
                         continue
 
                     # Test of the rotating sense: cyclone or anticyclone
                     if has_value(
                         data.data, i_x_in, i_y_in, cvalues, below=anticyclonic_search
                     ):
+                        stats.count(group, "other_sign")
                         continue
 
                     # Test the number of pixels within the outermost contour
@@ -806,24 +1260,27 @@ class GridDataset(object):
                         or contour.nb_pixel > pixel_limit[1]
                     ):
                         contour.reject = 3
+                        stats.reject(group, 3)
                         continue
 
                     # Here the considered contour passed shape_error test, masked_pixels test,
                     # values strictly above (AEs) or below (CEs) the contour, number_pixels test)
 
                     # Compute amplitude
-                    reset_centroid, amp = self.get_amplitude(
-                        contour,
-                        cvalues,
-                        data,
-                        anticyclonic_search=anticyclonic_search,
-                        level=self.contours.levels[corrected_coll_index],
-                        interval=step,
-                        **kwargs,
-                    )
+                    with stats.stage("get_amplitude"):
+                        reset_centroid, amp = self.get_amplitude(
+                            contour,
+                            cvalues,
+                            data,
+                            anticyclonic_search=anticyclonic_search,
+                            level=self.contours.levels[corrected_coll_index],
+                            interval=step,
+                            **kwargs,
+                        )
                     # If we have a valid amplitude
                     if (not amp.within_amplitude_limits()) or (amp.amplitude == 0):
                         contour.reject = 4
+                        stats.reject(group, 4)
                         continue
                     if reset_centroid:
                         if self.is_circular():
@@ -840,94 +1297,100 @@ class GridDataset(object):
                             centlat_e = y[centi, centj]
 
                     # centlat_e and centlon_e must be indexes of maximum, we will loose some inner contour if it's not
-                    (
-                        max_average_speed,
-                        speed_contour,
-                        inner_contour,
-                        speed_array,
-                        i_max_speed,
-                        i_inner,
-                    ) = self.get_uavg(
-                        self.contours,
-                        centlon_e,
-                        centlat_e,
-                        contour,
-                        anticyclonic_search,
-                        corrected_coll_index,
-                        pixel_min=pixel_limit[0],
-                    )
-
-                    # FIXME : Instantiate new EddyObservation object (high cost, need to be reviewed)
-                    obs = EddiesObservations(
-                        size=1,
-                        track_extra_variables=track_extra_variables,
-                        track_array_variables=sampling,
-                        array_variables=array_variables,
-                    )
-                    obs.height_max_speed_contour[:] = self.contours.cvalues[i_max_speed]
-                    obs.height_external_contour[:] = cvalues
-                    obs.height_inner_contour[:] = self.contours.cvalues[i_inner]
+                    with stats.stage("get_uavg"):
+                        (
+                            max_average_speed,
+                            speed_contour,
+                            inner_contour,
+                            speed_array,
+                            i_max_speed,
+                            i_inner,
+                        ) = self.get_uavg(
+                            self.contours,
+                            centlon_e,
+                            centlat_e,
+                            contour,
+                            anticyclonic_search,
+                            corrected_coll_index,
+                            pixel_min=pixel_limit[0],
+                            contour_speeds=contour_speeds,
+                        )
+                    stats.count(group, "accepted")
+
+                    # Values are written directly in builder storage
+                    i_obs = eddies.append()
+                    obs = eddies.observations
+                    obs["height_max_speed_contour"][i_obs] = self.contours.cvalues[
+                        i_max_speed
+                    ]
+                    obs["height_external_contour"][i_obs] = cvalues
+                    obs["height_inner_contour"][i_obs] = self.contours.cvalues[i_inner]
                     array_size = speed_array.shape[0]
-                    obs.nb_contour_selected[:] = array_size
+                    obs["nb_contour_selected"][i_obs] = array_size
                     if speed_array.shape[0] == 1:
-                        obs.uavg_profile[:] = speed_array[0]
+                        obs["uavg_profile"][i_obs] = speed_array[0]
                     else:
-                        obs.uavg_profile[:] = raw_resample(speed_array, sampling)
-                    obs.amplitude[:] = amp.amplitude
-                    obs.speed_average[:] = max_average_speed
-                    obs.num_point_e[:] = contour.lon.shape[0]
-                    obs.num_point_s[:] = speed_contour.lon.shape[0]
-
-                    # Evenly resample contours with nb_pts = nb_pts_original x presampling_multiplier
-                    xy_i = uniform_resample(
-                        inner_contour.lon,
-                        inner_contour.lat,
-                        num_fac=presampling_multiplier,
-                    )
-                    xy_e = uniform_resample(
-                        contour.lon,
-                        contour.lat,
-                        num_fac=presampling_multiplier,
-                    )
-                    xy_s = uniform_resample(
-                        speed_contour.lon,
-                        speed_contour.lat,
-                        num_fac=presampling_multiplier,
-                    )
+                        obs["uavg_profile"][i_obs] = raw_resample(speed_array, sampling)
+                    obs["amplitude"][i_obs] = amp.amplitude
+                    obs["speed_average"][i_obs] = max_average_speed
+                    obs["num_point_e"][i_obs] = contour.lon.shape[0]
+                    obs["num_point_s"][i_obs] = speed_contour.lon.shape[0]
+
+                    with stats.stage("fit_and_resample"):
+                        # Evenly resample contours with nb_pts = nb_pts_original x presampling_multiplier
+                        xy_i = uniform_resample(
+                            inner_contour.lon,
+                            inner_contour.lat,
+                            num_fac=presampling_multiplier,
+                        )
+                        xy_e = uniform_resample(
+                            contour.lon,
+                            contour.lat,
+                            num_fac=presampling_multiplier,
+                        )
+                        xy_s = uniform_resample(
+                            speed_contour.lon,
+                            speed_contour.lat,
+                            num_fac=presampling_multiplier,
+                        )
 
-                    # First, get position of max SSH based on best fit circle with resampled innermost contour
-                    centlon_i, centlat_i, _, _ = _fit_circle_path(create_vertice(*xy_i))
-                    obs.lon_max[:] = centlon_i
-                    obs.lat_max[:] = centlat_i
+                        # First, get position of max SSH based on best fit circle with resampled innermost contour
+                        centlon_i, centlat_i, _, _ = _fit_circle_path(
+                            create_vertice(*xy_i)
+                        )
+                        obs["lon_max"][i_obs] = centlon_i
+                        obs["lat_max"][i_obs] = centlat_i
 
-                    # Second, get speed-based radius, shape error, eddy center, area based on resampled contour of max uavg
-                    centlon_s, centlat_s, eddy_radius_s, aerr_s = _fit_circle_path(
-                        create_vertice(*xy_s)
-                    )
-                    obs.radius_s[:] = eddy_radius_s
-                    obs.shape_error_s[:] = aerr_s
-                    obs.speed_area[:] = poly_area(
-                        *coordinates_to_local(*xy_s, lon0=centlon_s, lat0=centlat_s)
-                    )
-                    obs.lon[:] = centlon_s
-                    obs.lat[:] = centlat_s
+                        # Second, get speed-based radius, shape error, eddy center, area based on resampled contour of max uavg
+                        centlon_s, centlat_s, eddy_radius_s, aerr_s = _fit_circle_path(
+                            create_vertice(*xy_s)
+                        )
+                        obs["radius_s"][i_obs] = eddy_radius_s
+                        obs["shape_error_s"][i_obs] = aerr_s
+                        obs["speed_area"][i_obs] = poly_area(
+                            *coordinates_to_local(*xy_s, lon0=centlon_s, lat0=centlat_s)
+                        )
+                        obs["lon"][i_obs] = centlon_s
+                        obs["lat"][i_obs] = centlat_s
 
-                    # Third, compute effective radius, shape error, area from resampled effective contour
-                    _, _, eddy_radius_e, aerr_e = _fit_circle_path(
-                        create_vertice(*xy_e)
-                    )
-                    obs.radius_e[:] = eddy_radius_e
-                    obs.shape_error_e[:] = aerr_e
-                    obs.effective_area[:] = poly_area(
-                        *coordinates_to_local(*xy_e, lon0=centlon_s, lat0=centlat_s)
-                    )
+                        # Third, compute effective radius, shape error, area from resampled effective contour
+                        _, _, eddy_radius_e, aerr_e = _fit_circle_path(
+                            create_vertice(*xy_e)
+                        )
+                        obs["radius_e"][i_obs] = eddy_radius_e
+                        obs["shape_error_e"][i_obs] = aerr_e
+                        obs["effective_area"][i_obs] = poly_area(
+                            *coordinates_to_local(*xy_e, lon0=centlon_s, lat0=centlat_s)
+                        )
 
-                    # Finally, resample contours with output parameters
-                    xy_e_f = resample(*xy_e, **out_sampling)
-                    xy_s_f = resample(*xy_s, **out_sampling)
+                        # Finally, resample contours with output parameters
+                        xy_e_f = resample(*xy_e, **out_sampling)
+                        xy_s_f = resample(*xy_s, **out_sampling)
 
-                    obs.contour_lon_s[:], obs.contour_lat_s[:] = xy_s_f
-                    obs.contour_lon_e[:], obs.contour_lat_e[:] = xy_e_f
+                        obs["contour_lon_s"][i_obs] = xy_s_f[0]
+                        obs["contour_lat_s"][i_obs] = xy_s_f[1]
+                        obs["contour_lon_e"][i_obs] = xy_e_f[0]
+                        obs["contour_lat_e"][i_obs] = xy_e_f[1]
 
                     if aerr > 99.9 or aerr_s > 99.9:
                         logger.warning(
@@ -936,17 +1399,9 @@ class GridDataset(object):
                             aerr_s,
                         )
 
-                    eddies.append(obs)
                     # To reserve definitively the area
                     data.mask[i_x_in, i_y_in] = True
-            if len(eddies) == 0:
-                eddies = EddiesObservations(
-                    track_extra_variables=track_extra_variables,
-                    track_array_variables=sampling,
-                    array_variables=array_variables,
-                )
-            else:
-                eddies = EddiesObservations.concatenate(eddies)
+            eddies = eddies.build()
             eddies.sign_type = 1 if anticyclonic_search else -1
             eddies.time[:] = (date - datetime(1950, 1, 1)).total_seconds() / 86400.0
 
@@ -979,6 +1434,35 @@ class GridDataset(object):
                 a_and_c[1].obs[name] *= factor
         return a_and_c
 
+    @staticmethod
+    def levels_bounds(data):
+        """Give height bounds used to define levels, extrema could be replaced by percentiles
+        if they are too far from the rest of the data
+
+        :param array data: masked height grid
+        :return: min and max height
+        :rtype: (float,float)
+        """
+        z_min, z_max = data.min(), data.max()
+        d_z = z_max - z_min
+        data_tmp = data[~data.mask]
+        epsilon = 0.001  # in %
+        z_min_p, z_max_p = (
+            percentile(data_tmp, epsilon),
+            percentile(data_tmp, 100 - epsilon),
+        )
+        d_zp = z_max_p - z_min_p
+        if d_z / d_zp > 2:
+            logger.warning(
+                "Maybe some extrema are present zmin %f (m) and zmax %f (m) will be replace by %f and %f",
+                z_min,
+                z_max,
+                z_min_p,
+                z_max_p,
+            )
+            z_min, z_max = z_min_p, z_max_p
+        return z_min, z_max
+
     def get_uavg(
         self,
         all_contours,
@@ -988,13 +1472,24 @@ class GridDataset(object):
         anticyclonic_search,
         level_start,
         pixel_min=3,
+        contour_speeds=None,
     ):
         """
         Compute geostrophic speed around successive contours
         Returns the average
+
+        :param array contour_speeds: speed of each contour of `all_contours` computed
+            with :py:meth:`speed_coef_mean_contours`, if None speed is computed contour by contour
         """
+        if contour_speeds is None:
+            speed_coef_mean = self.speed_coef_mean
+        else:
+
+            def speed_coef_mean(contour):
+                return contour_speeds[contour.i_contour]
+
         # Init max speed to search maximum
-        max_average_speed = self.speed_coef_mean(original_contour)
+        max_average_speed = speed_coef_mean(original_contour)
         speed_array = [max_average_speed]
 
         eddy_contours = [original_contour]
@@ -1017,7 +1512,7 @@ class GridDataset(object):
             # nb_pixel properties need to call pixels_in before with a grid of pixel
             level_contour.pixels_in(self)
             # Interpolate uspd to seglon, seglat, then get mean
-            level_average_speed = self.speed_coef_mean(level_contour)
+            level_average_speed = speed_coef_mean(level_contour)
             speed_array.append(level_average_speed)
             if (
                 pixel_min < level_contour.nb_pixel
@@ -1045,6 +1540,8 @@ class GridDataset(object):
     @staticmethod
     def _gaussian_filter(data, sigma, mode="reflect"):
         """Standard gaussian filter"""
+        from scipy.ndimage import gaussian_filter
+
         local_data = data.copy()
         local_data[data.mask] = 0
 
@@ -1075,18 +1572,229 @@ class GridDataset(object):
         return reset_centroid, amp
 
 
+def _atomic_savez(filename, **arrays):
+    """Store arrays in a npz file, written in a temporary file then renamed to never
+    expose an incomplete file to other process
+
+    :param str filename: npz file
+    :param dict arrays: arrays to store by name
+    """
+    tmp_filename = f"{filename[:-4]}.{getpid()}.tmp.npz"
+    np.savez(tmp_filename, **arrays)
+    replace(tmp_filename, filename)
+
+
+class CurvilinearIndex(object):
+    """Spatial index of pixels of a curvilinear grid.
+
+    Pixel centres are stored by bucket of a regular lattice, nearest pixels and pixels
+    in a polygon are searched only in buckets around query instead of in all pixels.
+    Index depends only on coordinates, so it could be stored and shared by all grids
+    with the same coordinates.
+    """
+
+    __slots__ = ("x0", "y0", "step", "lattice_shape", "first", "pixels", "x", "y")
+
+    def __init__(self, x0, y0, step, lattice_shape, first, pixels, x, y):
+        self.x0, self.y0, self.step = x0, y0, step
+        self.lattice_shape = lattice_shape
+        self.first = first
+        self.pixels = pixels
+        self.x, self.y = x, y
+
+    @classmethod
+    def build(cls, x_c, y_c, step=None):
+        """Create index of coordinates
+
+        :param array x_c: 2D x of pixels
+        :param array y_c: 2D y of pixels
+        :param float,None step: size of lattice bucket, by default median distance
+            between two neighbour pixels
+        :rtype: CurvilinearIndex
+        """
+        x_c, y_c = cls.coordinates(x_c), cls.coordinates(y_c)
+        x, y = x_c.reshape(-1), y_c.reshape(-1)
+        valid = ~(isnan(x) | isnan(y))
+        x_min, x_max = x[valid].min(), x[valid].max()
+        y_min, y_max = y[valid].min(), y[valid].max()
+        nb_pixel = valid.sum()
+        if step is None:
+            step = max(
+                nanmedian(sqrt(diff(x_c, axis=i) ** 2 + diff(y_c, axis=i) ** 2))
+                for i in range(2)
+                if x_c.shape[i] > 1
+            )
+        # Lattice must not have more buckets than pixels
+        step = max(step, sqrt((x_max - x_min) * (y_max - y_min) / nb_pixel), 1e-6)
+        nb_x = int((x_max - x_min) / step) + 1
+        nb_y = int((y_max - y_min) / step) + 1
+        pixels = where(valid)[0]
+        bucket = ((x[pixels] - x_min) // step).astype(int_) * nb_y + (
+            (y[pixels] - y_min) // step
+        ).astype(int_)
+        i = bucket.argsort(kind="stable")
+        first = zeros(nb_x * nb_y + 1, dtype=int_)
+        first[1:] = bincount(bucket, minlength=nb_x * nb_y).cumsum()
+        logger.debug(
+            "Index of %d pixels in a lattice of %d x %d buckets", nb_pixel, nb_x, nb_y
+        )
+        return cls(x_min, y_min, step, (nb_x, nb_y), first, pixels[i], x, y)
+
+    @staticmethod
+    def coordinates(values):
+        """Give coordinates in float64 with nan for masked values"""
+        return ma.filled(ma.array(values, dtype="f8"), nan)
+
+    @property
+    def lattice(self):
+        return self.x0, self.y0, self.step, *self.lattice_shape, self.first, self.pixels
+
+    def query(self, points, k=1):
+        """Give nearest pixels of points, same interface as `scipy.spatial.cKDTree.query`
+
+        :param array points: one point (x, y) or array of points (N, 2)
+        :param int k: number of neighbours
+        :return: distances and flat indexes of neighbours, last dimension is removed
+            if k == 1
+        :rtype: array,array
+        """
+        points = array(points, dtype="f8")
+        single = points.ndim == 1
+        points = points.reshape((-1, 2))
+        nb = points.shape[0]
+        dist, idx = empty((nb, k), dtype="f8"), empty((nb, k), dtype=int_)
+        lattice_query(
+            points[:, 0], points[:, 1], *self.lattice, self.x, self.y, k, dist, idx
+        )
+        if k == 1:
+            dist, idx = dist[:, 0], idx[:, 0]
+        if single:
+            dist, idx = dist[0], idx[0]
+        return dist, idx
+
+    def pixels_in(self, vertices, shape, x_start, x_stop, y_start, y_stop):
+        """Give pixels in a polygon and in index slices
+
+        :param array vertices: polygon
+        :param (int,int) shape: shape of grid
+        :return: indexes of pixels along each dimension
+        :rtype: array,array
+        """
+        idx = lattice_pixels_in(
+            vertices,
+            *self.lattice,
+            self.x,
+            self.y,
+            shape[1],
+            x_start,
+            x_stop,
+            y_start,
+            y_stop,
+        )
+        return idx // shape[1], idx % shape[1]
+
+    def save(self, filename):
+        """Store index in a npz file"""
+        _atomic_savez(
+            filename,
+            lattice=array([self.x0, self.y0, self.step]),
+            lattice_shape=array(self.lattice_shape),
+            first=self.first,
+            pixels=self.pixels,
+        )
+
+    @classmethod
+    def load(cls, filename, x_c, y_c):
+        """Read index stored with :py:meth:`save`
+
+        :param str filename: npz file
+        :param array x_c: 2D x of pixels used to build index
+        :param array y_c: 2D y of pixels used to build index
+        :rtype: CurvilinearIndex
+        """
+        with np.load(filename) as h:
+            x0, y0, step = h["lattice"]
+            nb_x, nb_y = h["lattice_shape"]
+            first, pixels = h["first"], h["pixels"]
+        x = cls.coordinates(x_c).reshape(-1)
+        y = cls.coordinates(y_c).reshape(-1)
+        return cls(x0, y0, step, (int(nb_x), int(nb_y)), first, pixels, x, y)
+
+
+class CurvilinearIndexCache(object):
+    """Store spatial indexes of curvilinear grids by hash of coordinates.
+
+    Indexes are kept in memory, if a directory is given they are also stored in npz files
+    which will be read by next processes.
+    """
+
+    __slots__ = ("path", "indexes")
+
+    def __init__(self, path=None):
+        """
+        :param str path: directory to store indexes, if None indexes are only kept in memory
+        """
+        self.path = path
+        self.indexes = dict()
+
+    @staticmethod
+    def key(x_c, y_c):
+        """Give key of coordinates"""
+        h = sha1(repr(x_c.shape).encode())
+        for coordinates in (x_c, y_c):
+            h.update(np.ascontiguousarray(ma.getdata(coordinates), dtype="f8"))
+        return h.hexdigest()
+
+    def filename(self, key):
+        return join(self.path, f"curvilinear_index_{key}.npz")
+
+    def get(self, x_c, y_c):
+        """Get index of coordinates, index is built if not already known
+
+        :param array x_c: 2D x of pixels
+        :param array y_c: 2D y of pixels
+        :rtype: CurvilinearIndex
+        """
+        key = self.key(x_c, y_c)
+        if key not in self.indexes:
+            if self.path is not None and exists(self.filename(key)):
+                index = CurvilinearIndex.load(self.filename(key), x_c, y_c)
+                logger.debug("Index loaded from %s", self.filename(key))
+            else:
+                index = CurvilinearIndex.build(x_c, y_c)
+                if self.path is not None:
+                    makedirs(self.path, exist_ok=True)
+                    index.save(self.filename(key))
+            self.indexes[key] = index
+        return self.indexes[key]
+
+
+# Indexes cache shared by all unregular grids in a process
+CURVILINEAR_INDEX_CACHE = CurvilinearIndexCache()
+
+
 class UnRegularGridDataset(GridDataset):
     """Class managing unregular grid"""
 
     __slots__ = (
         "index_interp",
+        "index_cache",
         "_speed_norm",
     )
 
+    def __init__(self, *args, index_cache=CURVILINEAR_INDEX_CACHE, **kwargs):
+        """
+        :param CurvilinearIndexCache index_cache: cache for spatial index of coordinates,
+            by default indexes are shared in memory with all grids, if None index is built
+            for each grid
+        """
+        self.index_cache = index_cache
+        super().__init__(*args, **kwargs)
+
     def load(self):
         """Load variable (data)"""
         x_name, y_name = self.coordinates
-        with Dataset(self.filename) as h:
+        with self.open() as h:
             self.x_dim = h.variables[x_name].dimensions
             self.y_dim = h.variables[y_name].dimensions
 
@@ -1116,8 +1824,8 @@ class UnRegularGridDataset(GridDataset):
 
     def get_pixels_in(self, contour):
         (x_start, x_stop), (y_start, y_stop) = contour.bbox_slice
-        return _get_pixel_in_unregular(
-            contour.vertices, self.x_c, self.y_c, x_start, x_stop, y_start, y_stop
+        return self.index_interp.pixels_in(
+            contour.vertices, self.x_c.shape, x_start, x_stop, y_start, y_stop
         )
 
     def normalize_x_indice(self, indices):
@@ -1134,14 +1842,14 @@ class UnRegularGridDataset(GridDataset):
         pass
 
     def init_pos_interpolator(self):
-        logger.debug("Create a KdTree, could be long ...")
-        self.index_interp = cKDTree(
-            create_vertice(self.x_c.reshape(-1), self.y_c.reshape(-1))
-        )
-
-        logger.debug("... OK")
+        if self.index_cache is None:
+            self.index_interp = CurvilinearIndex.build(self.x_c, self.y_c)
+        else:
+            self.index_interp = self.index_cache.get(self.x_c, self.y_c)
 
     def _low_filter(self, grid_name, w_cut, factor=8.0):
+        from scipy.interpolate import RectBivariateSpline
+
         data = self.grid(grid_name)
         x = self.grid(self.coordinates[0])
         y = self.grid(self.coordinates[1])
@@ -1193,10 +1901,333 @@ class UnRegularGridDataset(GridDataset):
         # A simplified solution to be change by a weight mean
         return self._speed_norm[i_x, i_y].mean(axis=1).mean()
 
+    def speed_coef_mean_contours(self, contours, level=None):
+        """Same as :py:meth:`speed_coef_mean` for all contours of a level with only one query
+
+        :param Contours contours: contours computed on this grid
+        :param int level: level index, if None all contours are computed
+        :return: speed for each contour, in the order of flat arrays of `contours`
+        :rtype: array
+        """
+        vertices, nb_pt = uniform_resample_contours(
+            contours.x_value,
+            contours.y_value,
+            contours.contour_index,
+            contours.nb_pt_per_contour,
+            *contours.contours_range(level),
+        )
+        dist, idx = self.index_interp.query(vertices, k=4)
+        i_y = idx % self.x_c.shape[1]
+        i_x = int_((idx - i_y) / self.x_c.shape[1])
+        speed = ma.array(self._speed_norm[i_x, i_y]).mean(axis=1)
+        valid = ~ma.getmaskarray(speed)
+        i_contour = repeat(arange(nb_pt.shape[0]), nb_pt)
+        nb_contour = nb_pt.shape[0]
+        with errstate(invalid="ignore"):
+            return bincount(
+                i_contour, where(valid, speed.data, 0), minlength=nb_contour
+            ) / bincount(i_contour, valid, minlength=nb_contour)
+
     def init_speed_coef(self, uname="u", vname="v"):
         self._speed_norm = (self.grid(uname) ** 2 + self.grid(vname) ** 2) ** 0.5
 
 
+class KernelCache(object):
+    """Store kernels of convolution with dynamic kernel.
+
+    Kernels depend only on latitude, grid step and kernel parameters, so grids with the same
+    resolution could share them. Kernels are stored in memory by set of parameters and by
+    latitude, if a directory is given each set of parameters is also stored in a npz file
+    named with a hash of parameters, which will be read by next processes.
+    Least recently used sets of parameters are removed from memory when size of kernels
+    is over `max_size`.
+    """
+
+    __slots__ = ("path", "kernels", "modified", "max_size", "size")
+
+    def __init__(self, path=None, max_size=2**30):
+        """
+        :param str path: directory to store kernels, if None kernels are only kept in memory
+        :param int max_size: maximal size in bytes of kernels kept in memory
+        """
+        self.path = path
+        self.kernels = dict()
+        self.modified = set()
+        self.max_size = max_size
+        self.size = 0
+
+    def filename(self, key):
+        """Give npz filename for a set of parameters"""
+        return join(self.path, f"{key[0]}_{sha1(repr(key).encode()).hexdigest()}.npz")
+
+    def get(self, key, lat, kernel_func, **kwargs_func):
+        """Get kernel from cache, kernel is computed if not already known
+
+        :param tuple key: parameters of kernel without latitude
+        :param float lat: latitude of kernel
+        :param func kernel_func: function to compute kernel
+        :param dict kwargs_func: look at kernel_func
+        :return: kernel, read only
+        :rtype: array
+        """
+        kernels = self.kernels.pop(key, None)
+        if kernels is None:
+            kernels = self.load(key)
+            self.size += sum(kernel.nbytes for kernel in kernels.values())
+        # Last used set of parameters is moved at the end
+        self.kernels[key] = kernels
+        lat = float(lat)
+        if lat not in kernels:
+            kernel = kernel_func(lat, **kwargs_func)
+            kernel.flags.writeable = False
+            kernels[lat] = kernel
+            self.modified.add(key)
+            self.size += kernel.nbytes
+            self.free(key)
+        return kernels[lat]
+
+    def free(self, current_key=None):
+        """Remove least recently used sets of parameters from memory while size is over
+        `max_size`, new kernels of removed sets are written before
+
+        :param tuple current_key: set of parameters which must be kept
+        """
+        for key in list(self.kernels.keys()):
+            if self.size <= self.max_size:
+                break
+            if key == current_key:
+                continue
+            if key in self.modified:
+                self.write(key)
+            kernels = self.kernels.pop(key)
+            self.size -= sum(kernel.nbytes for kernel in kernels.values())
+
+    def load(self, key):
+        """Read kernels of a set of parameters from disk
+
+        :return: kernels by latitude
+        :rtype: dict
+        """
+        kernels = dict()
+        if self.path is None:
+            return kernels
+        filename = self.filename(key)
+        if not exists(filename):
+            return kernels
+        with np.load(filename) as h:
+            lats, shapes, values = h["lat"], h["shape"], h["values"]
+        i = 0
+        for lat, (nb_x, nb_y) in zip(lats, shapes):
+            kernel = values[i : i + nb_x * nb_y].reshape((nb_x, nb_y))
+            kernel.flags.writeable = False
+            kernels[float(lat)] = kernel
+            i += nb_x * nb_y
+        logger.debug("%d kernels loaded from %s", len(kernels), filename)
+        return kernels
+
+    def write(self, key):
+        """Write on disk kernels of a set of parameters, if cache has a directory"""
+        self.modified.discard(key)
+        if self.path is None:
+            return
+        makedirs(self.path, exist_ok=True)
+        filename = self.filename(key)
+        kernels = self.kernels[key]
+        _atomic_savez(
+            filename,
+            lat=array(list(kernels.keys())),
+            shape=array([kernel.shape for kernel in kernels.values()]),
+            values=concatenate([kernel.ravel() for kernel in kernels.values()]),
+        )
+        logger.debug("%d kernels stored in %s", len(kernels), filename)
+
+    def flush(self):
+        """Write on disk sets of parameters which get new kernels"""
+        for key in list(self.modified):
+            self.write(key)
+
+
+# Kernels cache shared by all regular grids in a process
+KERNEL_CACHE = KernelCache()
+
+
+# Hash of files already read, by filename, size and modification time
+FILE_HASH = dict()
+
+
+def file_hash(filename):
+    """Give sha1 of file content, hash is computed once by version of file
+
+    :param str filename: file to hash
+    :rtype: str
+    """
+    infos = stat(filename)
+    key = filename, infos.st_size, infos.st_mtime_ns
+    if key not in FILE_HASH:
+        h = sha1()
+        with open(filename, "rb") as f:
+            for block in iter(lambda: f.read(2**20), b""):
+                h.update(block)
+        FILE_HASH[key] = h.hexdigest()
+    return FILE_HASH[key]
+
+
+class GridCache(object):
+    """Store variables derived from grid files (filtered height, u/v, ...) in a directory.
+
+    Entries are addressed by a hash of file content, variable, indexs and parameters of
+    all operations applied, so a new set of parameters never read an old result.
+    Least recently used entries are removed when total size is over `max_size`.
+    """
+
+    __slots__ = ("path", "max_size")
+
+    def __init__(self, path, max_size=10 * 2**30):
+        """
+        :param str path: directory of cache
+        :param int max_size: maximal size of cache in bytes
+        """
+        self.path = path
+        self.max_size = max_size
+
+    @staticmethod
+    def key(*args):
+        """Give key for a set of arguments"""
+        return sha1(repr(args).encode()).hexdigest()
+
+    def filename(self, key):
+        return join(self.path, f"{key}.npz")
+
+    def get(self, key):
+        """Read arrays stored with key
+
+        :param str key: key of entry
+        :return: masked arrays, None if key is unknown
+        :rtype: list(array)
+        """
+        filename = self.filename(key)
+        if not exists(filename):
+            return None
+        with np.load(filename) as h:
+            arrays = [
+                ma.array(h[f"data_{i}"], mask=h[f"mask_{i}"])
+                for i in range(len(h.files) // 2)
+            ]
+        # Update of modification time to know least recently used entries
+        utime(filename)
+        return arrays
+
+    def set(self, key, arrays):
+        """Store arrays with key and remove old entries if cache is too big
+
+        :param str key: key of entry
+        :param list(array) arrays: masked arrays to store
+        """
+        makedirs(self.path, exist_ok=True)
+        filename = self.filename(key)
+        items = dict()
+        for i, array_ in enumerate(arrays):
+            items[f"data_{i}"] = ma.getdata(array_)
+            items[f"mask_{i}"] = ma.getmaskarray(array_)
+        _atomic_savez(filename, **items)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until size of cache is below `max_size`"""
+        entries = list()
+        for filename in glob(join(self.path, "*.npz")):
+            if filename.endswith(".tmp.npz"):
+                continue
+            try:
+                infos = stat(filename)
+            except FileNotFoundError:
+                # Already removed by an other process
+                continue
+            entries.append((infos.st_mtime_ns, infos.st_size, filename))
+        total = sum(entry[1] for entry in entries)
+        for _, size, filename in sorted(entries):
+            if total <= self.max_size:
+                break
+            logger.debug("Remove %s from grid cache", filename)
+            try:
+                remove(filename)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class InterpolationPlan(object):
+    """Pixels and weights to interpolate grids with the same coordinates on a set of points.
+
+    Plan is computed once and could be applied on many variables and time steps, each
+    application only reads pixels and computes a weighted sum.
+    """
+
+    __slots__ = ("shape", "i_x", "i_y", "weights", "valid", "nearest", "flat_index")
+
+    def __init__(self, x_g, y_g, x, y, method="bilinear"):
+        """
+        :param array x_g: coordinates of grid
+        :param array y_g: coordinates of grid
+        :param array x: coordinates where grids will be interpolated
+        :param array y: coordinates where grids will be interpolated
+        :param str method: Could be 'bilinear' or 'nearest'
+        """
+        if method not in ("bilinear", "nearest"):
+            raise Exception(f'method "{method}" unknown')
+        self.shape = x_g.shape[0], y_g.shape[0]
+        self.nearest = method == "nearest"
+        self.flat_index = dict()
+        self.i_x, self.i_y, self.weights, self.valid = interp2d_indexes(
+            x_g,
+            y_g,
+            array(x, dtype="f8").reshape(-1),
+            array(y, dtype="f8").reshape(-1),
+            self.nearest,
+        )
+
+    def __len__(self):
+        return self.valid.shape[0]
+
+    def apply(self, z):
+        """Interpolate grids, same result as :py:func:`~py_eddy_tracker.generic.interp2d_geo`
+
+        :param array z: grid (nb_x, nb_y) or stack of grids (..., nb_x, nb_y),
+            like several time steps
+        :return: values on points with nan where data are missing, (N,) or (..., N)
+        :rtype: array
+        """
+        if z.shape[-2:] != self.shape:
+            raise Exception(f"Grid shape {z.shape[-2:]} is not plan shape {self.shape}")
+        stack_shape = z.shape[:-2]
+        data, m = ma.getdata(z), ma.getmask(z)
+        # Grids are often transposed from file, pixels are read in memory order
+        order = "F" if data.strides[-2] < data.strides[-1] else "C"
+        if order == "F":
+            data = data.swapaxes(-1, -2)
+            m = m if m is ma.nomask else m.swapaxes(-1, -2)
+        data = data.reshape((-1, self.shape[0] * self.shape[1]))
+        m = ones((1, 1), dtype="bool") if m is ma.nomask else m.reshape(data.shape)
+        if order not in self.flat_index:
+            if order == "F":
+                index = self.i_y * self.shape[0] + self.i_x
+            else:
+                index = self.i_x * self.shape[1] + self.i_y
+            self.flat_index[order] = index
+        dtype = data.dtype if data.dtype.kind == "f" else "f8"
+        values = empty((data.shape[0], len(self)), dtype=dtype)
+        interp2d_apply(
+            data,
+            m,
+            self.flat_index[order],
+            self.weights,
+            self.valid,
+            self.nearest,
+            values,
+        )
+        return values.reshape((*stack_shape, len(self)))
+
+
 class RegularGridDataset(GridDataset):
     """Class only for regular grid"""
 
@@ -1206,11 +2237,17 @@ class RegularGridDataset(GridDataset):
         "x_size",
         "_x_step",
         "_y_step",
+        "kernel_cache",
     )
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, kernel_cache=KERNEL_CACHE, **kwargs):
+        """
+        :param KernelCache kernel_cache: cache for kernels of filters, by default kernels are
+            shared in memory with all grids, if None kernels are computed for each filtering
+        """
         super().__init__(*args, **kwargs)
         self._is_circular = None
+        self.kernel_cache = kernel_cache
 
     def setup_coordinates(self):
         super().setup_coordinates()
@@ -1335,6 +2372,262 @@ class RegularGridDataset(GridDataset):
             )
         return self._is_circular
 
+    def eddy_identification_tiled(
+        self,
+        grid_height,
+        uname,
+        vname,
+        date,
+        tiles=(2, 2),
+        halo=None,
+        nb_process=1,
+        **kwargs,
+    ):
+        """
+        Compute eddy identification on overlapping tiles, each tile is identified independently
+        and eddies are kept only by the tile which owns their center, so halo must be wider
+        than eddies to get the same result as :py:meth:`eddy_identification`.
+        On circular grid, tiles use continuous longitudes across the grid edge, so eddies on this edge
+        could be slightly different than the one found with the wrap of :py:meth:`eddy_identification`
+
+        :param str grid_height: Grid name of Sea Surface Height
+        :param str uname: Grid name of u speed component
+        :param str vname: Grid name of v speed component
+        :param datetime.datetime date: Date to be stored in object to date data
+        :param (int,int) tiles: Number of tiles along x and y
+        :param int,None halo: Number of pixels added on each side of tiles,
+            by default twice the diameter of the biggest eddy allowed by pixel_limit
+        :param int nb_process: Number of process used to identify tiles
+        :param dict kwargs: Arguments given to :py:meth:`eddy_identification`
+
+        :return: Return a list of 2 elements: Anticyclones and Cyclones
+        :rtype: py_eddy_tracker.observations.observation.EddiesObservations
+        """
+        nb_x, nb_y = tiles
+        x_size, y_size = self.x_size, self.y_c.shape[0]
+        circular = self.is_circular()
+        if halo is None:
+            pixel_limit = kwargs.get("pixel_limit")
+            pixel_max = 1000 if pixel_limit is None else pixel_limit[1]
+            halo = int(ceil(4 * sqrt(pixel_max / pi)))
+        # Levels must be the same for all tiles
+        kwargs["levels_bounds"] = self.levels_bounds(self.grid(grid_height))
+        # Tiles are built with array, so units must be known before
+        if kwargs.get("force_height_unit") is None:
+            kwargs["force_height_unit"] = self.units(grid_height)
+        if kwargs.get("force_speed_unit") is None:
+            kwargs["force_speed_unit"] = self.units(uname)
+        x_name, y_name = self.coordinates
+        x_cuts = linspace(0, x_size, nb_x + 1).round().astype(int)
+        y_cuts = linspace(0, y_size, nb_y + 1).round().astype(int)
+        logger.info(
+            "Identification on %d x %d tiles with a halo of %d pixels", nb_x, nb_y, halo
+        )
+
+        tasks, cores = list(), list()
+        for x0, x1 in zip(x_cuts[:-1], x_cuts[1:]):
+            if nb_x == 1 or (circular and (x1 - x0 + 2 * halo) >= x_size):
+                i_x = arange(x_size)
+            elif circular:
+                i_x = arange(x0 - halo, x1 + halo)
+            else:
+                i_x = arange(max(x0 - halo, 0), min(x1 + halo, x_size))
+            # Longitudes are unwrapped to keep increasing coordinates across dateline
+            x_tile = self.x_c[i_x % x_size] + 360 * (i_x // x_size)
+            i_x %= x_size
+            for y0, y1 in zip(y_cuts[:-1], y_cuts[1:]):
+                sl_y = slice(max(y0 - halo, 0), min(y1 + halo, y_size))
+                datas = {x_name: x_tile, y_name: self.y_c[sl_y]}
+                for name in (grid_height, uname, vname):
+                    datas[name] = self.grid(name)[i_x][:, sl_y]
+                tasks.append(
+                    (
+                        (x_name, y_name),
+                        datas,
+                        {k: self.variables_description[k]["attrs"] for k in datas},
+                        self.is_centered,
+                        (grid_height, uname, vname, date),
+                        kwargs,
+                    )
+                )
+                cores.append((x0, x1, y0, y1))
+
+        results = _identify_tiles(tasks, nb_process, kwargs.get("stats"))
+
+        a_and_c = list()
+        for i_sign in range(2):
+            eddies = list()
+            for (x0, x1, y0, y1), a_c in zip(cores, results):
+                obs = a_c[i_sign]
+                i_x = ((obs.lon - self.x_c[0]) % 360 / self.xstep).round().astype(int)
+                i_x = i_x % x_size if circular else clip(i_x, 0, x_size - 1)
+                i_y = clip(
+                    ((obs.lat - self.y_c[0]) / self.ystep).round().astype(int),
+                    0,
+                    y_size - 1,
+                )
+                m = (i_x >= x0) * (i_x < x1) * (i_y >= y0) * (i_y < y1)
+                eddies.append(obs.index(where(m)[0]))
+            a_and_c.append(EddiesObservations.concatenate(eddies))
+        return a_and_c
+
+    def eddy_identification_coarse_to_fine(
+        self,
+        grid_height,
+        uname,
+        vname,
+        date,
+        factor=4,
+        margin=None,
+        nb_process=1,
+        reference=None,
+        **kwargs,
+    ):
+        """
+        Compute eddy identification in two passes: a first identification on the grid
+        decimated by `factor` gives candidate eddies, then identification at full resolution
+        is done only on windows around candidates. Eddies which are not seen on the
+        decimated grid are lost, so recall must be checked with `reference` on a few dates
+        before using it.
+
+        :param str grid_height: Grid name of Sea Surface Height
+        :param str uname: Grid name of u speed component
+        :param str vname: Grid name of v speed component
+        :param datetime.datetime date: Date to be stored in object to date data
+        :param int factor: Decimation factor of the grid used to find candidates
+        :param int,None margin: Number of pixels added around the effective contour
+            diameter of each candidate, by default 2 * factor
+        :param int nb_process: Number of process used to identify windows
+        :param (EddiesObservations,EddiesObservations),None reference: Anticyclones and
+            Cyclones of :py:meth:`eddy_identification`, if given counts of eddies found
+            again are logged, look at :py:func:`identification_recall`
+        :param dict kwargs: Arguments given to :py:meth:`eddy_identification`, stats
+            are filled only by identification at full resolution
+
+        :return: Return a list of 2 elements: Anticyclones and Cyclones
+        :rtype: py_eddy_tracker.observations.observation.EddiesObservations
+        """
+        from scipy.ndimage import find_objects, label
+
+        x_size, y_size = self.x_size, self.y_c.shape[0]
+        circular = self.is_circular()
+        if margin is None:
+            margin = 2 * factor
+        # Levels must be the same for all windows
+        kwargs["levels_bounds"] = self.levels_bounds(self.grid(grid_height))
+        # Windows are built with array, so units must be known before
+        if kwargs.get("force_height_unit") is None:
+            kwargs["force_height_unit"] = self.units(grid_height)
+        if kwargs.get("force_speed_unit") is None:
+            kwargs["force_speed_unit"] = self.units(uname)
+        x_name, y_name = self.coordinates
+        names = (x_name, y_name, grid_height, uname, vname)
+        attrs = {k: self.variables_description[k]["attrs"] for k in names}
+
+        # Candidates on decimated grid, pixel limit is reduced with the same factor
+        datas = {x_name: self.x_c[::factor], y_name: self.y_c[::factor]}
+        for name in names[2:]:
+            datas[name] = self.grid(name)[::factor, ::factor]
+        coarse = RegularGridDataset.with_array(
+            (x_name, y_name), datas, attrs, centered=self.is_centered
+        )
+        coarse_kwargs = kwargs.copy()
+        coarse_kwargs.pop("stats", None)
+        pixel_min, pixel_max = kwargs.get("pixel_limit") or (4, 1000)
+        coarse_kwargs["pixel_limit"] = (
+            max(pixel_min // factor**2, 1),
+            max(pixel_max // factor**2, 1),
+        )
+        candidates = coarse.eddy_identification(
+            grid_height, uname, vname, date, **coarse_kwargs
+        )
+
+        # Windows around candidates
+        coverage = zeros((x_size, y_size), dtype="bool")
+        m_by_degree = distance(0, 0, 0, 1)
+        for obs in candidates:
+            i_x = ((obs.lon - self.x_c[0]) % 360 / self.xstep).round().astype(int)
+            i_y = ((obs.lat - self.y_c[0]) / self.ystep).round().astype(int)
+            radius = 2 * obs.radius_e / m_by_degree
+            half_x = ceil(radius / self.xstep / cos(radians(obs.lat))).astype(int)
+            half_y = ceil(radius / self.ystep).astype(int)
+            for i, j, h_x, h_y in zip(i_x, i_y, half_x + margin, half_y + margin):
+                sl_y = slice(max(j - h_y, 0), min(j + h_y + 1, y_size))
+                if circular:
+                    coverage[arange(i - h_x, i + h_x + 1) % x_size, sl_y] = True
+                else:
+                    coverage[max(i - h_x, 0) : min(i + h_x + 1, x_size), sl_y] = True
+        # Windows are grouped by connected areas, on circular grid an empty column is
+        # used as first column to not cut areas on grid edge
+        empty_columns = where(~coverage.any(axis=1))[0]
+        shift = empty_columns[0] if circular and empty_columns.shape[0] else 0
+        labels, nb_area = label(coverage[(arange(x_size) + shift) % x_size])
+        logger.info(
+            "%d candidates on grid decimated by %d, %.1f%% of grid identified in %d areas",
+            sum(len(obs) for obs in candidates),
+            factor,
+            coverage.mean() * 100,
+            nb_area,
+        )
+
+        tasks = list()
+        for i_area, (sl_x, sl_y) in enumerate(find_objects(labels)):
+            if circular and empty_columns.shape[0] == 0:
+                # Area could cross grid edge, so all longitudes are used
+                i = arange(x_size)
+            else:
+                i = arange(sl_x.start, sl_x.stop) + shift
+            # Longitudes are unwrapped to keep increasing coordinates across dateline
+            datas = {x_name: self.x_c[i % x_size] + 360 * (i // x_size)}
+            datas[y_name] = self.y_c[sl_y]
+            for name in names[2:]:
+                datas[name] = self.grid(name)[i % x_size][:, sl_y]
+            # Height outside of area is masked to not search contours there
+            outside = labels[(i - shift) % x_size][:, sl_y] != i_area + 1
+            datas[grid_height] = ma.array(
+                datas[grid_height], mask=ma.getmaskarray(datas[grid_height]) | outside
+            )
+            tasks.append(
+                (
+                    (x_name, y_name),
+                    datas,
+                    attrs,
+                    self.is_centered,
+                    (grid_height, uname, vname, date),
+                    kwargs,
+                )
+            )
+        results = _identify_tiles(tasks, nb_process, kwargs.get("stats"))
+
+        a_and_c = list()
+        for i_sign in range(2):
+            eddies = list()
+            for i_area, a_c in enumerate(results):
+                obs = a_c[i_sign]
+                # Eddy is kept only by area which contains its center
+                i_x = ((obs.lon - self.x_c[0]) % 360 / self.xstep).round().astype(int)
+                i_x = (i_x - shift) % x_size if circular else clip(i_x, 0, x_size - 1)
+                i_y = clip(
+                    ((obs.lat - self.y_c[0]) / self.ystep).round().astype(int),
+                    0,
+                    y_size - 1,
+                )
+                eddies.append(obs.index(where(labels[i_x, i_y] == i_area + 1)[0]))
+            a_and_c.append(EddiesObservations.concatenate(eddies))
+        if reference is not None:
+            for label_, eddies, ref in zip(
+                ("Anticyclonic", "Cyclonic"), a_and_c, reference
+            ):
+                recall = identification_recall(eddies, ref)
+                logger.info(
+                    "%s : %d/%d eddies of reference found, %d eddies identified",
+                    label_,
+                    recall["match"],
+                    recall["reference"],
+                    recall["found"],
+                )
+        return a_and_c
+
     @staticmethod
     def check_order(order):
         if order < 1:
@@ -1420,6 +2713,8 @@ class RegularGridDataset(GridDataset):
         """wave_length in km
         order must be int
         """
+        from scipy.special import j1
+
         order = self.check_order(order)
         half_x_pt, half_y_pt, dist_norm = self.estimate_kernel_shape(
             lat, wave_length, order
@@ -1437,13 +2732,18 @@ class RegularGridDataset(GridDataset):
         )
 
     def convolve_filter_with_dynamic_kernel(
-        self, grid, kernel_func, lat_max=85, extend=False, **kwargs_func
+        self, grid, kernel_func, lat_max=85, extend=False, nb_thread=1, **kwargs_func
     ):
         """
+        Each latitude row needs its own kernel, rows which share the same kernel shape are
+        grouped in bands, a band is copied once with its halo and each row is convolved on
+        a window of kernel width. Data and weights are convolved together in a 2 channels image.
+
         :param str grid: grid name
         :param func kernel_func: function of kernel to use
         :param float lat_max: absolute latitude above no filtering apply
         :param bool extend: if False, only non masked value will return a filtered value
+        :param int nb_thread: number of threads used to convolve bands (filter2D release the GIL)
         :param dict kwargs_func: look at kernel_func
         :return: filtered value
         :rtype: array
@@ -1454,82 +2754,100 @@ class RegularGridDataset(GridDataset):
             data = self.grid(grid).copy()
         else:
             data = grid.copy()
-        # Matrix for result
-        data_out = ma.empty(data.shape)
-        data_out.mask = ones(data_out.shape, dtype=bool)
-        nb_lines = self.y_c.shape[0]
-        dt = list()
-
-        debug_active = logger.getEffectiveLevel() == logging.DEBUG
+        nb_x, nb_y = data.shape
+        # Masked values are replaced by 0 and have a weight of 0
+        valid = ~ma.getmaskarray(data)
+        values = where(valid, data.data, 0)
+        # Single precision data are convolved in single precision
+        dtype = float32 if data.dtype == float32 else "f8"
+
+        # Kernels of grid methods are only function of grid step and parameters
+        cache = self.kernel_cache
+        if cache is not None and getattr(kernel_func, "__self__", None) is self:
+            key = (
+                f"{self.__class__.__name__}.{kernel_func.__name__}",
+                float(self.xstep),
+                float(self.ystep),
+                *sorted(kwargs_func.items()),
+            )
+        else:
+            cache = None
 
+        # Group consecutive rows with the same kernel shape
+        bands = list()
+        kernel_total = zeros(nb_y)
         for i, lat in enumerate(self.y_c):
-            if abs(lat) > lat_max or data[:, i].mask.all():
-                data_out.mask[:, i] = True
+            if abs(lat) > lat_max or not valid[:, i].any():
                 continue
-            # Get kernel
-            kernel = kernel_func(lat, **kwargs_func)
-            # Kernel shape
-            k_shape = kernel.shape
-            t0 = datetime.now()
-            if debug_active and len(dt) > 0:
-                dt_mean = np_mean(dt) * (nb_lines - i)
-                print(
-                    "Remain ",
-                    dt_mean,
-                    "ETA ",
-                    t0 + dt_mean,
-                    "current kernel size :",
-                    k_shape,
-                    "Step : %d/%d    " % (i, nb_lines),
-                    end="\r",
-                )
-
+            if cache is None:
+                kernel = kernel_func(lat, **kwargs_func)
+            else:
+                kernel = cache.get(key, lat, kernel_func, **kwargs_func)
+            kernel_total[i] = kernel.sum()
+            # With an even width, last column of kernel is always applied on the border of
+            # the window which is masked, so we remove it to center kernel on the row
+            if kernel.shape[1] % 2 == 0:
+                kernel = kernel[:, :-1]
+            kernel = kernel.astype(dtype, copy=False)
+            if len(bands) and bands[-1][0] == kernel.shape and bands[-1][1] == i:
+                bands[-1][1] = i + 1
+                bands[-1][2].append(kernel)
+            else:
+                bands.append([kernel.shape, i + 1, [kernel]])
+        if cache is not None:
+            cache.flush()
+        logger.debug("%d bands of latitude to convolve", len(bands))
+
+        values_sum = zeros(data.shape, dtype=dtype)
+        kernel_sum = zeros(data.shape, dtype=dtype)
+        computed = zeros(nb_y, dtype=bool)
+        circular = self.is_circular()
+
+        def convolve_band(band):
+            k_shape, i_stop, kernels = band
+            i_start = i_stop - len(kernels)
             # Half size, k_shape must be always impair
-            d_lat = int((k_shape[1] - 1) / 2)
-            d_lon = int((k_shape[0] - 1) / 2)
-            # Temporary matrix to have exact shape at outuput
-            tmp_matrix = ma.zeros((2 * d_lon + data.shape[0], k_shape[1]))
-            tmp_matrix.mask = ones(tmp_matrix.shape, dtype=bool)
-            # Slice to apply on input data
-            # +1 for upper bound, to take in acount this column
-            sl_lat_data = slice(max(0, i - d_lat), min(i + d_lat + 1, data.shape[1]))
-            # slice to apply on temporary matrix to store input data
+            d_lon, d_lat = (k_shape[0] - 1) // 2, (k_shape[1] - 1) // 2
+            # Band with halo, channel 0 for values and channel 1 for weights
+            tmp_matrix = zeros(
+                (nb_x + 2 * d_lon, i_stop - i_start + 2 * d_lat, 2), dtype=dtype
+            )
+            sl_lat_data = slice(max(0, i_start - d_lat), min(i_stop + d_lat, nb_y))
             sl_lat_in = slice(
-                d_lat - (i - sl_lat_data.start), d_lat + (sl_lat_data.stop - i)
+                sl_lat_data.start - i_start + d_lat, sl_lat_data.stop - i_start + d_lat
             )
+            tmp_matrix[d_lon : d_lon + nb_x, sl_lat_in, 0] = values[:, sl_lat_data]
+            tmp_matrix[d_lon : d_lon + nb_x, sl_lat_in, 1] = valid[:, sl_lat_data]
             # If global => manual wrapping
-            if self.is_circular():
-                tmp_matrix[:d_lon, sl_lat_in] = data[-d_lon:, sl_lat_data]
-                tmp_matrix[-d_lon:, sl_lat_in] = data[:d_lon, sl_lat_data]
-            # Copy data
-            tmp_matrix[d_lon:-d_lon, sl_lat_in] = data[:, sl_lat_data]
-            # Convolution
-            m = ~tmp_matrix.mask
-            tmp_matrix[~m] = 0
-
-            demi_x, demi_y = k_shape[0] // 2, k_shape[1] // 2
-            values_sum = filter2D(tmp_matrix.data, -1, kernel)[demi_x:-demi_x, demi_y]
-            kernel_sum = filter2D(m.astype(float), -1, kernel)[demi_x:-demi_x, demi_y]
-            with errstate(invalid="ignore", divide="ignore"):
-                if extend:
-                    data_out[:, i] = ma.array(
-                        values_sum / kernel_sum,
-                        mask=kernel_sum < (extend * kernel.sum()),
-                    )
-                else:
-                    data_out[:, i] = values_sum / kernel_sum
-            dt.append(datetime.now() - t0)
-            if len(dt) == 100:
-                dt.pop(0)
-        if extend:
-            out = ma.array(data_out, mask=data_out.mask)
+            if circular:
+                tmp_matrix[:d_lon] = tmp_matrix[nb_x : nb_x + d_lon]
+                tmp_matrix[-d_lon:] = tmp_matrix[d_lon : 2 * d_lon]
+            for j, kernel in enumerate(kernels):
+                # Only center column of window is complete
+                conv = filter2D(tmp_matrix[:, j : j + 2 * d_lat + 1], -1, kernel)
+                i = i_start + j
+                values_sum[:, i] = conv[d_lon:-d_lon, d_lat, 0]
+                kernel_sum[:, i] = conv[d_lon:-d_lon, d_lat, 1]
+                computed[i] = True
+
+        if nb_thread > 1 and len(bands) > 1:
+            with ThreadPoolExecutor(nb_thread) as executor:
+                # list to raise exception of threads
+                list(executor.map(convolve_band, bands))
         else:
-            out = ma.array(data_out, mask=data.mask + data_out.mask)
-        if debug_active:
-            print()
-        if out.dtype != data.dtype:
-            return out.astype(data.dtype)
-        return out
+            for band in bands:
+                convolve_band(band)
+
+        with errstate(invalid="ignore", divide="ignore"):
+            data_out = values_sum / kernel_sum
+            if extend:
+                mask = kernel_sum < (extend * kernel_total)
+            else:
+                mask = ~valid
+        mask = mask + ~computed
+        if data_out.dtype != data.dtype:
+            data_out = data_out.astype(data.dtype)
+        return ma.array(data_out, mask=mask)
 
     def lanczos_high_filter(
         self, grid_name, wave_length, order=1, lat_max=85, **kwargs
@@ -1581,29 +2899,55 @@ class RegularGridDataset(GridDataset):
             "Run filtering with wavelength of %(wave_length)s km and order of %(order)s ...",
             dict(wave_length=wave_length, order=order),
         )
-        data_out = self.convolve_filter_with_dynamic_kernel(
-            grid_name,
-            self.kernel_bessel,
-            lat_max=lat_max,
+
+        def compute():
+            data_out = self.convolve_filter_with_dynamic_kernel(
+                grid_name,
+                self.kernel_bessel,
+                lat_max=lat_max,
+                wave_length=wave_length,
+                order=order,
+                **kwargs,
+            )
+            self.vars[grid_name] -= data_out
+
+        self.derive_vars(
+            compute,
+            (grid_name,),
+            (grid_name,),
+            "bessel_high_filter",
             wave_length=wave_length,
             order=order,
-            **kwargs,
+            lat_max=lat_max,
+            extend=kwargs.get("extend", False),
         )
         logger.debug("Filtering done")
-        self.vars[grid_name] -= data_out
 
     def bessel_low_filter(self, grid_name, wave_length, order=1, lat_max=85, **kwargs):
-        data_out = self.convolve_filter_with_dynamic_kernel(
-            grid_name,
-            self.kernel_bessel,
-            lat_max=lat_max,
+        def compute():
+            self.vars[grid_name] = self.convolve_filter_with_dynamic_kernel(
+                grid_name,
+                self.kernel_bessel,
+                lat_max=lat_max,
+                wave_length=wave_length,
+                order=order,
+                **kwargs,
+            )
+
+        self.derive_vars(
+            compute,
+            (grid_name,),
+            (grid_name,),
+            "bessel_low_filter",
             wave_length=wave_length,
             order=order,
-            **kwargs,
+            lat_max=lat_max,
+            extend=kwargs.get("extend", False),
         )
-        self.vars[grid_name] = data_out
 
     def spectrum_lonlat(self, grid_name, area=None, ref=None, **kwargs):
+        from scipy.signal import welch
+
         if area is None:
             area = dict(llcrnrlon=190, urcrnrlon=280, llcrnrlat=-62, urcrnrlat=8)
         scaling = kwargs.pop("scaling", "density")
@@ -1611,52 +2955,43 @@ class RegularGridDataset(GridDataset):
         x0, y0 = self.nearest_grd_indice(area["llcrnrlon"], area["llcrnrlat"])
         x1, y1 = self.nearest_grd_indice(area["urcrnrlon"], area["urcrnrlat"])
 
-        data = self.grid(grid_name)[x0:x1, y0:y1]
+        data = ma.getdata(self.grid(grid_name)[x0:x1, y0:y1])
 
-        # Lat spectrum
-        pws = list()
+        # Lat spectrum, all columns have the same step and are computed together
         step_y_km = self.ystep * distance(0, 0, 0, 1) / 1000
-        nb_invalid = 0
-        for i, _ in enumerate(self.x_c[x0:x1]):
-            f, pw = welch(data[i, :], 1 / step_y_km, scaling=scaling, **kwargs)
-            if isnan(pw).any():
-                nb_invalid += 1
-                continue
-            pws.append(pw)
-        if nb_invalid:
-            logger.warning("%d/%d columns invalid", nb_invalid, i + 1)
+        f, pws = welch(data, 1 / step_y_km, scaling=scaling, axis=1, **kwargs)
+        valid = ~isnan(pws).any(axis=1)
+        if not valid.all():
+            logger.warning("%d/%d columns invalid", (~valid).sum(), valid.shape[0])
         with errstate(divide="ignore"):
-            lat_content = 1 / f, array(pws).mean(axis=0)
-
-        # Lon spectrum
-        fs, pws = list(), list()
-        f_min, f_max = None, None
-        nb_invalid = 0
-        for i, lat in enumerate(self.y_c[y0:y1]):
-            step_x_km = self.xstep * distance(0, lat, 1, lat) / 1000
-            f, pw = welch(data[:, i], 1 / step_x_km, scaling=scaling, **kwargs)
-            if isnan(pw).any():
-                nb_invalid += 1
-                continue
-            if f_min is None:
-                f_min = f.min()
-                f_max = f.max()
-            else:
-                f_min = max(f_min, f.min())
-                f_max = min(f_max, f.max())
-            fs.append(f)
-            pws.append(pw)
-        if nb_invalid:
-            logger.warning("%d/%d lines invalid", nb_invalid, i + 1)
-        f_interp = linspace(f_min, f_max, f.shape[0])
-        pw_m = array(
-            [
-                interp1d(f, pw, fill_value=0.0, bounds_error=False)(f_interp)
-                for f, pw in zip(fs, pws)
-            ]
-        ).mean(axis=0)
+            lat_content = 1 / f, pws[valid].mean(axis=0)
+
+        # Lon spectrum, step in km depends on latitude. All lines are computed together
+        # with an unit step, frequencies are multiplied by sampling frequency of each
+        # line and density divided by it, like welch with its own sampling frequency
+        lat = self.y_c[y0:y1]
+        fs_x = 1 / (self.xstep * distance(0, lat, 1, lat) / 1000)
+        f, pws = welch(data, 1, scaling=scaling, axis=0, **kwargs)
+        pws = pws.T
+        valid = ~isnan(pws).any(axis=1)
+        if not valid.all():
+            logger.warning("%d/%d lines invalid", (~valid).sum(), valid.shape[0])
+        pws, fs_x = pws[valid], fs_x[valid]
+        if scaling == "density":
+            pws = pws / fs_x.reshape(-1, 1)
+        f_interp = linspace((f.min() * fs_x).max(), (f.max() * fs_x).min(), f.shape[0])
+        # Linear resampling of all lines on common frequencies, welch frequencies
+        # are regularly spaced
+        position = (f_interp / fs_x.reshape(-1, 1) - f[0]) / (f[1] - f[0])
+        i0 = clip(floor(position).astype(int_), 0, f.shape[0] - 2)
+        w = position - i0
+        pw_interp = take_along_axis(pws, i0, axis=1) * (1 - w) + take_along_axis(
+            pws, i0 + 1, axis=1
+        ) * w
+        # Like interp1d with fill_value=0
+        pw_interp[(position < -1e-9) | (position > f.shape[0] - 1 + 1e-9)] = 0
         with errstate(divide="ignore"):
-            lon_content = 1 / f_interp, pw_m
+            lon_content = 1 / f_interp, pw_interp.mean(axis=0)
         if ref is None:
             return lon_content, lat_content
         else:
@@ -1832,13 +3167,16 @@ class RegularGridDataset(GridDataset):
         self.vars[vname][:, sl] = self.vars[vname][:, sl] * w + v_lagerloef[:, sl] * (1 - w)
         self.vars[uname][:, sl] = self.vars[uname][:, sl] * w + u_lagerloef[:, sl] * (1 - w)
 
-    def add_uv(self, grid_height, uname="u", vname="v", stencil_halfwidth=4):
+    def add_uv(
+        self, grid_height, uname="u", vname="v", stencil_halfwidth=4, out=None
+    ):
         r"""Compute a u and v grid
 
         :param str grid_height: grid name where the funtion will apply stencil method
         :param str uname: future name of u
         :param str vname: future name of v
         :param int stencil_halfwidth: largest stencil could be apply (max: 4)
+        :param None,(array,array) out: look at :py:meth:`compute_uv`
 
         .. math::
             u = \frac{g}{f} \frac{dh}{dy}
@@ -1871,30 +3209,55 @@ class RegularGridDataset(GridDataset):
                 self.variables_description[variable]["attrs"][
                     "long_name"
                 ] += " gradient"
-        # Divide by sideral day
-        gof = (
-            sin(deg2rad(self.y_c))
-            * ones((self.x_c.shape[0], 1))
-            * 4.0
-            * pi
-            / (23 * 3600 + 56 * 60 + 4.1)
-        )
-        with errstate(divide="ignore"):
-            gof = self.GRAVITY / (gof * ones((self.x_c.shape[0], 1)))
 
-        # Compute v
-        mode = "wrap" if self.is_circular() else "reflect"
-        self.vars[vname] = (
-            self.compute_stencil(data, mode=mode, stencil_halfwidth=stencil_halfwidth)
-            * gof
-        )
-        # Compute u
-        self.vars[uname] = (
-            -self.compute_stencil(
-                data, vertical=True, stencil_halfwidth=stencil_halfwidth
+        def compute():
+            self.vars[uname], self.vars[vname] = self.compute_uv(
+                data, stencil_halfwidth=stencil_halfwidth, out=out
             )
-            * gof
+
+        self.derive_vars(
+            compute,
+            (grid_height,),
+            (uname, vname),
+            "add_uv",
+            stencil_halfwidth=stencil_halfwidth,
+        )
+
+    def compute_uv(self, data, stencil_halfwidth=4, out=None):
+        """Compute geostrophic u/v of a height grid in one compiled pass,
+        with the same stencils as :py:meth:`compute_stencil`
+
+        :param array data: height grid
+        :param int stencil_halfwidth: largest stencil could be apply (max: 4)
+        :param None,(array,array) out: masked arrays where u and v will be written,
+            to reuse memory between grids of the same shape
+        :return: u and v
+        :rtype: array,array
+        """
+        stencil_halfwidth = max(min(int(stencil_halfwidth), 4), 1)
+        # Divide by sideral day
+        gof = sin(deg2rad(self.y_c)) * 4.0 * pi / (23 * 3600 + 56 * 60 + 4.1)
+        with errstate(divide="ignore"):
+            gof = self.GRAVITY / gof
+        m = self.get_mask(data)
+        if out is None:
+            u = ma.array(empty(data.shape, dtype=data.dtype), mask=m.copy())
+            v = ma.array(empty(data.shape, dtype=data.dtype), mask=m.copy())
+        else:
+            u, v = out
+            u.mask, v.mask = m, m
+        compute_geostrophic_uv(
+            self.x_c,
+            self.y_c,
+            data.data,
+            m,
+            gof,
+            self.EARTH_RADIUS,
+            u.data,
+            v.data,
+            stencil_halfwidth,
         )
+        return u, v
 
     def speed_coef_mean(self, contour):
         """Some nan can be computed over contour if we are near borders,
@@ -1909,6 +3272,27 @@ class RegularGridDataset(GridDataset):
             nan_remove=True,
         )
 
+    def speed_coef_mean_contours(self, contours, level=None):
+        """Same as :py:meth:`speed_coef_mean` for all contours of a level in one compiled pass
+
+        :param Contours contours: contours computed on this grid
+        :param int level: level index, if None all contours are computed
+        :return: speed for each contour, in the order of flat arrays of `contours`
+        :rtype: array
+        """
+        return mean_on_regular_contours(
+            self.x_c,
+            self.y_c,
+            self._speed_ev.data,
+            self._speed_ev.mask,
+            contours.x_value,
+            contours.y_value,
+            contours.contour_index,
+            contours.nb_pt_per_contour,
+            *contours.contours_range(level),
+            nan_remove=True,
+        )
+
     def init_speed_coef(self, uname="u", vname="v"):
         """Draft"""
         u, v = self.grid(uname), self.grid(vname)
@@ -1997,6 +3381,23 @@ class RegularGridDataset(GridDataset):
             self.x_c, self.y_c, g.data, m, lons, lats, nearest=method == "nearest"
         )
 
+    def interpolation_plan(self, lons, lats, method="bilinear"):
+        """
+        Precompute pixels and weights to interpolate several variables or grids
+        with the same coordinates over lons, lats
+
+        :param lons: new x
+        :param lats: new y
+        :param str method: Could be 'bilinear' or 'nearest'
+        :rtype: InterpolationPlan
+
+        .. code-block:: python
+
+            plan = g.interpolation_plan(lons, lats)
+            sst, chl = plan.apply(g.grid("sst")), plan.apply(g.grid("chl"))
+        """
+        return InterpolationPlan(self.x_c, self.y_c, lons, lats, method)
+
     def uv_for_advection(
         self,
         u_name=None,
@@ -2096,6 +3497,62 @@ class RegularGridDataset(GridDataset):
             yield f_x, f_y
 
 
+def _tile_eddy_identification(task):
+    """Identification on one tile, must be at module level to be used by a process pool.
+    If stats are asked, tile fills its own stats which are returned with eddies"""
+    coordinates, datas, variables_description, centered, args, kwargs = task
+    tile = RegularGridDataset.with_array(
+        coordinates, datas, variables_description, centered=centered
+    )
+    stats = None
+    if kwargs.get("stats") is not None:
+        stats = IdentificationStats()
+        kwargs = dict(kwargs, stats=stats)
+    return tile.eddy_identification(*args, **kwargs), stats
+
+
+def _identify_tiles(tasks, nb_process=1, stats=None):
+    """Identification of tiles, in a process pool if nb_process > 1
+
+    :param list tasks: tasks of :py:func:`_tile_eddy_identification`
+    :param int nb_process: Number of process
+    :param IdentificationStats,None stats: If given, stats of all tiles are added
+    :return: Anticyclones and Cyclones of each tile
+    :rtype: list
+    """
+    if nb_process == 1:
+        results = [_tile_eddy_identification(task) for task in tasks]
+    else:
+        with Pool(nb_process) as pool:
+            results = pool.map(_tile_eddy_identification, tasks)
+    if stats is not None:
+        for _, stats_ in results:
+            stats.add(stats_)
+    return [a_c for a_c, _ in results]
+
+
+def identification_recall(eddies, reference, cmin=0.5):
+    """Count eddies of a reference identification found again in an other one,
+    like with :py:meth:`RegularGridDataset.eddy_identification_coarse_to_fine`
+
+    :param EddiesObservations eddies: eddies to check
+    :param EddiesObservations reference: eddies of reference
+    :param float cmin: minimal overlap of effective contours to match two eddies
+    :return: number of eddies in reference, number of eddies found, number of
+        reference eddies matched and recall
+    :rtype: dict
+    """
+    i_ref, _, _ = reference.match(eddies, cmin=cmin)
+    nb_match = unique(i_ref).shape[0]
+    nb_ref = len(reference)
+    return dict(
+        reference=nb_ref,
+        found=len(eddies),
+        match=nb_match,
+        recall=nb_match / nb_ref if nb_ref else nan,
+    )
+
+
 @njit(cache=True)
 def advect_rk4(x_g, y_g, u_g, v_g, m_g, x, y, m, nb_step):
     # Grid coordinates
@@ -2397,10 +3854,10 @@ class GridCollection:
         t1 = t0 + 1
         h0, h1 = self[t0], self[t1]
         g0, g1 = h0.grid(grid_name), h1.grid(grid_name)
-        m0, m1 = h0.get_mask(g0), h0.get_mask(g1)
-        kw = dict(x=lons, y=lats, nearest=method == "nearest")
-        v0 = interp2d_geo(h0.x_c, h0.y_c, g0, m0, **kw)
-        v1 = interp2d_geo(h1.x_c, h1.y_c, g1, m1, **kw)
+        g0, g1 = ma.array(g0, mask=h0.get_mask(g0)), ma.array(g1, mask=h1.get_mask(g1))
+        # Grids of collection share coordinates, pixels and weights are computed once
+        plan = h0.interpolation_plan(lons, lats, method)
+        v0, v1 = plan.apply(g0), plan.apply(g1)
         w = (t - t0) / (t1 - t0)
         return v1 * w + v0 * (1 - w)
 
@@ -2881,14 +4338,7 @@ def advect_t_rk4(
         x[i], y[i] = x_, y_
 
 
-@njit(
-    [
-        "Tuple((f8[:,:],b1[:,:]))(f8[:],f8[:],f8[:,:],b1[:,:],f8,b1,i1)",
-        "Tuple((f4[:,:],b1[:,:]))(f8[:],f8[:],f4[:,:],b1[:,:],f8,b1,i1)",
-    ],
-    cache=True,
-    fastmath=True,
-)
+@njit(cache=True, fastmath=True)
 def compute_stencil(x, y, h, m, earth_radius, vertical=False, stencil_halfwidth=4):
     """
     Compute stencil on RegularGrid
@@ -3001,3 +4451,127 @@ def compute_stencil(x, y, h, m, earth_radius, vertical=False, stencil_halfwidth=
         return grad.T, m_out.T
     else:
         return grad, m_out
+
+
+@njit(cache=True)
+def stencil_line(
+    h, m, i0, j0, di, dj, n, circular, d, gof, sign, out, stencil_halfwidth
+):
+    """
+    Derivate one line of grid along x or y with stencils of :py:func:`compute_stencil`,
+    derivative is multiplied by `sign`, `d` and `gof` of its latitude and written
+    in `out`.
+    Masked pixels are not written.
+
+    :param array h: 2D array to derivate
+    :param array m: mask associated to h to know where are invalid data
+    :param int i0: x index of first pixel of line
+    :param int j0: y index of first pixel of line
+    :param int di: 1 if line is along x else 0
+    :param int dj: 1 if line is along y else 0
+    :param int n: number of pixels in line
+    :param bool circular: if True, line is wrapped
+    :param float d: factor to convert pixel in m
+    :param array gof: factor for each latitude
+    :param int sign: sign of output
+    :param array out: array where output will be written
+    :param int stencil_halfwidth: from 1 to 4 to specify maximal kernel usable
+    """
+    # Buffer of maximal size of stencil (9)
+    if circular:
+        i, j = i0 + (n - 4) * di, j0 + (n - 4) * dj
+        h_3, h_2, h_1, h0 = (
+            h[i, j],
+            h[i + di, j + dj],
+            h[i + 2 * di, j + 2 * dj],
+            h[i + 3 * di, j + 3 * dj],
+        )
+        m_3, m_2, m_1, m0 = (
+            m[i, j],
+            m[i + di, j + dj],
+            m[i + 2 * di, j + 2 * dj],
+            m[i + 3 * di, j + 3 * dj],
+        )
+    else:
+        h_3 = h_2 = h_1 = h0 = h[i0, j0]
+        m_3, m_2, m_1, m0 = True, True, True, True
+    i, j = i0, j0
+    h1, h2, h3, h4 = (
+        h[i, j],
+        h[i + di, j + dj],
+        h[i + 2 * di, j + 2 * dj],
+        h[i + 3 * di, j + 3 * dj],
+    )
+    m1, m2, m3, m4 = (
+        m[i, j],
+        m[i + di, j + dj],
+        m[i + 2 * di, j + 2 * dj],
+        m[i + 3 * di, j + 3 * dj],
+    )
+    for p in range(n):
+        # Roll value and only last
+        h_4, h_3, h_2, h_1, h0, h1, h2, h3 = h_3, h_2, h_1, h0, h1, h2, h3, h4
+        m_4, m_3, m_2, m_1, m0, m1, m2, m3 = m_3, m_2, m_1, m0, m1, m2, m3, m4
+        p_ = p + 4
+        if p_ >= n:
+            if circular:
+                p_ = p_ % n
+                i, j = i0 + p_ * di, j0 + p_ * dj
+                h4, m4 = h[i, j], m[i, j]
+            else:
+                # When we are out, last value is repeated
+                m4 = False
+        else:
+            i, j = i0 + p_ * di, j0 + p_ * dj
+            h4, m4 = h[i, j], m[i, j]
+        # Current value not defined
+        if m0:
+            continue
+        if m1 ^ m_1:
+            # unbalanced kernel
+            g = (h1 - h0) if m_1 else (h0 - h_1)
+        elif m2 or m_2 or stencil_halfwidth == 1:
+            g = (h1 - h_1) / 2
+        elif m3 or m_3 or stencil_halfwidth == 2:
+            g = (h_2 - h2 + 8 * (h1 - h_1)) / 12
+        elif m4 or m_4 or stencil_halfwidth == 3:
+            g = (h3 - h_3 + 9 * (h_2 - h2) + 45 * (h1 - h_1)) / 60
+        else:
+            # If all values of buffer are available
+            g = (
+                3 * (h_4 - h4) + 32 * (h3 - h_3) + 168 * (h_2 - h2) + 672 * (h1 - h_1)
+            ) / 840
+        i, j = i0 + p * di, j0 + p * dj
+        out[i, j] = sign * (g * d) * gof[j]
+
+
+@njit(cache=True)
+def compute_geostrophic_uv(x, y, h, m, gof, earth_radius, u, v, stencil_halfwidth=4):
+    """
+    Compute u/v from height on RegularGrid with stencils of :py:func:`compute_stencil`,
+    in one call without intermediate grid.
+    Masked pixels of h are not written in u/v.
+
+    :param array x: longitude coordinates
+    :param array y: latitude coordinates
+    :param array h: 2D array of height
+    :param array m: mask associated to h to know where are invalid data
+    :param array gof: gravity divided by coriolis parameter for each latitude
+    :param float earth_radius: Earth radius in m
+    :param array u: array where u will be written, same shape as h
+    :param array v: array where v will be written, same shape as h
+    :param int stencil_halfwidth: from 1 to 4 to specify maximal kernel usable
+    """
+    nb_x, nb_y = h.shape
+    x_step, y_step = x[1] - x[0], y[1] - y[0]
+    circular = abs(x[-1] % 360 - (x[0] - x_step) % 360) < 1e-5
+    # v from derivative along x, for each latitude
+    for j in range(nb_y):
+        d_x = 360 / (x_step * cos(deg2rad(y[j])) * pi * 2 * earth_radius)
+        stencil_line(
+            h, m, 0, j, 1, 0, nb_x, circular, d_x, gof, 1, v, stencil_halfwidth
+        )
+    # u from derivative along y, for each longitude
+    d_y = 360 / (y_step * pi * 2 * earth_radius)
+    for i in range(nb_x):
+        stencil_line(h, m, i, 0, 0, 1, nb_y, False, d_y, gof, -1, u, stencil_halfwidth)
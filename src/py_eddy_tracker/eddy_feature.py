@@ -7,17 +7,25 @@ import logging
 
 from matplotlib.cm import get_cmap
 from matplotlib.colors import Normalize
-from matplotlib.figure import Figure
+from matplotlib.path import Path
 from numba import njit, types as numba_types
 from numpy import (
+    arange,
     array,
+    bincount,
+    broadcast_to,
     concatenate,
     digitize,
     empty,
     int_,
+    isnan,
     ma,
+    maximum,
+    minimum,
     ones,
+    repeat,
     round,
+    searchsorted,
     unique,
     zeros,
 )
@@ -285,6 +293,42 @@ def detect_local_minima_(grid, general_mask, pixel_mask, maximum_local_extremum,
     return xs, ys
 
 
+class ContourLevel(object):
+    """Paths of one level, with the same interface than the matplotlib collection
+    used by :py:class:`Contours`
+    """
+
+    __slots__ = ("_paths", "color", "get_nearest_path_bbox_contain_pt")
+
+    def __init__(self, paths, color):
+        self._paths = paths
+        self.color = color
+
+    def get_paths(self):
+        return self._paths
+
+    def get_edgecolor(self):
+        return self.color
+
+
+class ContourLevels(object):
+    """Levels computed by native backend, with the same interface than the matplotlib
+    ContourSet used by :py:class:`Contours`
+    """
+
+    __slots__ = ("collections", "levels", "_mins", "_maxs")
+
+    def __init__(self, collections, levels, mins, maxs):
+        self.collections = collections
+        self.levels = levels
+        if mins is not None:
+            self._mins, self._maxs = mins, maxs
+
+    @property
+    def cvalues(self):
+        return self.levels
+
+
 class Contours(object):
     """
     Class to calculate average geostrophic velocity along
@@ -293,7 +337,8 @@ class Contours(object):
 
     Attributes:
       contour:
-        A matplotlib contour object of high-pass filtered SSH
+        A matplotlib contour object of high-pass filtered SSH, or
+        :py:class:`ContourLevels` with native backend
 
       eddy:
         A tracklist object holding the SSH data
@@ -314,6 +359,7 @@ class Contours(object):
         "y_max_per_contour",
         "nb_pt_per_contour",
         "nb_contour_per_level",
+        "bbox_index",
     )
 
     DELTA_PREC = 1e-10
@@ -397,11 +443,137 @@ class Contours(object):
                 collection._paths = paths_out
         logger.info("%d contours close over the bounds", poly_solve)
 
-    def __init__(self, x, y, z, levels, wrap_x=False, keep_unclose=False):
+    def __init__(
+        self, x, y, z, levels, wrap_x=False, keep_unclose=False, backend="native"
+    ):
         """
         c_i : index to contours
         l_i : index to levels
+
+        :param array x: x coordinates
+        :param array y: y coordinates
+        :param array z: values to contour, masked array
+        :param array levels: levels to compute
+        :param bool wrap_x: if True, contours are closed across the x bounds
+        :param bool keep_unclose: if True, unclosed contours are kept
+        :param str backend: 'native' (marching squares in numba) or 'matplotlib'
         """
+        if backend == "native":
+            self.native_contours(x, y, z, levels, wrap_x, keep_unclose)
+        elif backend == "matplotlib":
+            self.matplotlib_contours(x, y, z, levels, wrap_x, keep_unclose)
+        else:
+            raise Exception("Unknown contour backend : %s" % backend)
+        # Index of bbox for each level, to find quickly contours which could contain a point
+        self.bbox_index = build_bbox_index_(
+            self.level_index,
+            self.nb_contour_per_level,
+            self.x_min_per_contour,
+            self.y_min_per_contour,
+            self.x_max_per_contour,
+            self.y_max_per_contour,
+        )
+
+    def native_contours(self, x, y, z, levels, wrap_x=False, keep_unclose=False):
+        """Compute iso lines with :py:func:`marching_squares_`, points are written directly
+        in flat arrays and paths are only views on them
+        """
+        logger.info(
+            "Start computing iso lines with %d levels from %f to %f ...",
+            len(levels),
+            levels[0],
+            levels[-1],
+        )
+        levels = array(levels, dtype="f8")
+        nb_level = levels.shape[0]
+        data = ma.getdata(z).astype("f8")
+        # Coordinates of unregular grids are read as masked arrays
+        x, y = ma.getdata(x), ma.getdata(y)
+        if x.shape != data.shape:
+            x, y = broadcast_to(x.reshape(-1, 1), data.shape), broadcast_to(
+                y.reshape(1, -1), data.shape
+            )
+        m = ma.getmaskarray(z) + isnan(data)
+        xs, ys, nb_pt, nb_line = marching_squares_(x, y, data, m, levels, wrap_x)
+        logger.info("Finish computing iso lines")
+
+        # Same selection than with matplotlib
+        i_first = nb_pt.cumsum() - nb_pt
+        i_last = i_first + nb_pt - 1
+        d_closed = (
+            (xs[i_first] - xs[i_last]) ** 2 + (ys[i_first] - ys[i_last]) ** 2
+        ) ** 0.5
+        keep = nb_pt >= 4
+        if not keep_unclose:
+            keep *= d_closed <= self.DELTA_SUP
+        almost_closed = keep * (d_closed != 0) * (d_closed <= self.DELTA_SUP)
+        xs[i_last[almost_closed]] = xs[i_first[almost_closed]]
+        ys[i_last[almost_closed]] = ys[i_first[almost_closed]]
+        if len(nb_pt):
+            x_min, x_max = minimum.reduceat(xs, i_first), maximum.reduceat(xs, i_first)
+            y_min, y_max = minimum.reduceat(ys, i_first), maximum.reduceat(ys, i_first)
+            ptp_min = self.DELTA_PREC * 100
+            keep *= (abs(x_min - x_max) >= ptp_min) * (abs(y_min - y_max) >= ptp_min)
+        else:
+            x_min = x_max = y_min = y_max = xs
+        logger.info(
+            "Repair %d almost closed contours / %d contours",
+            almost_closed.sum(),
+            keep.sum(),
+        )
+
+        m_pt = repeat(keep, nb_pt)
+        self.x_value, self.y_value = xs[m_pt], ys[m_pt]
+        self.nb_pt_per_contour = array(nb_pt[keep], dtype="u4")
+        self.contour_index = array(
+            self.nb_pt_per_contour.cumsum() - self.nb_pt_per_contour, dtype="u4"
+        )
+        self.x_min_per_contour, self.x_max_per_contour = x_min[keep], x_max[keep]
+        self.y_min_per_contour, self.y_max_per_contour = y_min[keep], y_max[keep]
+        level_per_line = repeat(arange(nb_level), nb_line)
+        self.nb_contour_per_level = array(
+            bincount(level_per_line[keep], minlength=nb_level), dtype="u4"
+        )
+        self.level_index = array(
+            self.nb_contour_per_level.cumsum() - self.nb_contour_per_level, dtype="u4"
+        )
+
+        # Paths are views on flat arrays
+        vertices = empty((self.x_value.shape[0], 2))
+        vertices[:, 0], vertices[:, 1] = self.x_value, self.y_value
+        colors = get_cmap("rainbow")(Normalize(levels[0], levels[-1])(levels))
+        collections = list()
+        i_c = 0
+        for i in range(nb_level):
+            paths = list()
+            for _ in range(self.nb_contour_per_level[i]):
+                i0 = self.contour_index[i_c]
+                contour = Path(vertices[i0 : i0 + self.nb_pt_per_contour[i_c]])
+                contour.xmin = self.x_min_per_contour[i_c]
+                contour.xmax = self.x_max_per_contour[i_c]
+                contour.ymin = self.y_min_per_contour[i_c]
+                contour.ymax = self.y_max_per_contour[i_c]
+                contour.used = False
+                contour.reject = 0
+                contour.i_contour = i_c
+                paths.append(contour)
+                i_c += 1
+            collection = ContourLevel(paths, colors[i])
+            collection.get_nearest_path_bbox_contain_pt = (
+                lambda x, y, i=i: self.get_index_nearest_path_bbox_contain_pt(i, x, y)
+            )
+            collections.append(collection)
+        self.contours = ContourLevels(
+            collections,
+            levels,
+            (self.x_value.min(), self.y_value.min()) if i_c else None,
+            (self.x_value.max(), self.y_value.max()) if i_c else None,
+        )
+
+    def matplotlib_contours(self, x, y, z, levels, wrap_x=False, keep_unclose=False):
+        """Compute iso lines with matplotlib"""
+        from matplotlib.figure import Figure
+
         logger.info("Start computing iso lines")
         fig = Figure()
         ax = fig.add_subplot(111)
@@ -525,6 +697,7 @@ class Contours(object):
 
                 # Count pt
                 self.nb_pt_per_contour[i_c] = nb_pt
+                contour.i_contour = i_c
                 i_pt += nb_pt
                 i_c += 1
             i_l += 1
@@ -539,6 +712,19 @@ class Contours(object):
     def iter(self, start=None, stop=None, step=None):
         return self.contours.collections[slice(start, stop, step)]
 
+    def contours_range(self, level=None):
+        """Give index of first and last (excluded) contour of a level in flat arrays,
+        contour index is also available with `i_contour` attribute of each path
+
+        :param int level: level index, if None range cover all contours
+        :return: start and stop
+        :rtype: (int, int)
+        """
+        if level is None:
+            return 0, self.nb_pt_per_contour.shape[0]
+        i_start = int(self.level_index[level])
+        return i_start, i_start + int(self.nb_contour_per_level[level])
+
     @property
     def cvalues(self):
         return self.contours.cvalues
@@ -565,6 +751,7 @@ class Contours(object):
             self.y_min_per_contour,
             self.x_max_per_contour,
             self.y_max_per_contour,
+            *self.bbox_index,
             xpt,
             ypt,
         )
@@ -728,6 +915,62 @@ class Contours(object):
                     i.contain_eddies = True
 
 
+@njit(cache=True)
+def build_bbox_index_(l_i, nb_c_per_l, x_min_per_c, y_min_per_c, x_max_per_c, y_max_per_c):
+    """
+    Build for each level a regular grid of buckets over the bbox of its contours,
+    each bucket store (in increasing order) index of contours whose bbox overlap the bucket.
+
+    :return: origin and step of grid (x0, y0, dx, dy) for each level,
+        shape and first bucket of grid (nx, ny, i_first) for each level,
+        index of first contour for each bucket and contour index in buckets
+    :rtype: array,array,array,array
+    """
+    nb_level = l_i.shape[0]
+    grid_info = empty((nb_level, 4))
+    grid_shape = empty((nb_level, 3), dtype=numba_types.int64)
+    nb_bucket = 0
+    for i_l in range(nb_level):
+        i0, i1 = l_i[i_l], l_i[i_l] + nb_c_per_l[i_l]
+        nb = max(int(nb_c_per_l[i_l] ** 0.5), 1)
+        x0, y0, dx, dy = 0.0, 0.0, 1.0, 1.0
+        if i1 > i0:
+            x0, y0 = x_min_per_c[i0:i1].min(), y_min_per_c[i0:i1].min()
+            d_x = x_max_per_c[i0:i1].max() - x0
+            d_y = y_max_per_c[i0:i1].max() - y0
+            if d_x > 0:
+                dx = d_x / nb
+            if d_y > 0:
+                dy = d_y / nb
+        grid_info[i_l] = x0, y0, dx, dy
+        grid_shape[i_l] = nb, nb, nb_bucket
+        nb_bucket += nb * nb
+    # Count and fill buckets
+    bucket_index = zeros(nb_bucket + 1, dtype=numba_types.int64)
+    for step in range(2):
+        if step == 1:
+            bucket_index = bucket_index.cumsum()
+            contours = empty(bucket_index[-1], dtype=numba_types.uint32)
+            cursor = bucket_index[:-1].copy()
+        for i_l in range(nb_level):
+            x0, y0, dx, dy = grid_info[i_l]
+            nx, ny, i_first = grid_shape[i_l]
+            for i_c in range(l_i[i_l], l_i[i_l] + nb_c_per_l[i_l]):
+                i_start = min(int((x_min_per_c[i_c] - x0) / dx), nx - 1)
+                i_end = min(int((x_max_per_c[i_c] - x0) / dx), nx - 1)
+                j_start = min(int((y_min_per_c[i_c] - y0) / dy), ny - 1)
+                j_end = min(int((y_max_per_c[i_c] - y0) / dy), ny - 1)
+                for i in range(i_start, i_end + 1):
+                    for j in range(j_start, j_end + 1):
+                        i_bucket = i_first + i * ny + j
+                        if step == 0:
+                            bucket_index[i_bucket + 1] += 1
+                        else:
+                            contours[cursor[i_bucket]] = i_c
+                            cursor[i_bucket] += 1
+    return grid_info, grid_shape, bucket_index, contours
+
+
 @njit(cache=True, fastmath=True)
 def index_from_nearest_path_with_pt_in_bbox_(
     level_index,
@@ -741,28 +984,57 @@ def index_from_nearest_path_with_pt_in_bbox_(
     y_min_per_c,
     x_max_per_c,
     y_max_per_c,
+    grid_info,
+    grid_shape,
+    bucket_index,
+    bucket_contours,
     xpt,
     ypt,
 ):
-    """Get index from nearest path in edge bbox contain pt"""
+    """Get index from nearest path in edge bbox contain pt,
+    only contours in buckets of pt (look at :py:func:`build_bbox_index_`) are checked
+    """
     # Nb contour in level
     if nb_c_per_l[level_index] == 0:
         return -1
     # First contour in level
     i_start_c = l_i[level_index]
-    # First contour of the next level
-    i_end_c = i_start_c + nb_c_per_l[level_index]
 
-    # Flag to check if we iterate
-    find_contour = 0
     # We select the first pt of the first contour in the level
     # to initialize dist
     i_ref = i_start_c
     i_start_pt = indices_of_first_pts[i_start_c]
     dist_ref = (x_value[i_start_pt] - xpt) ** 2 + (y_value[i_start_pt] - ypt) ** 2
 
+    # Bucket which contain pt
+    x0, y0, dx, dy = grid_info[level_index]
+    nx, ny, i_first = grid_shape[level_index]
+    if ypt < y0:
+        return int_(-1)
+    j = int((ypt - y0) / dy)
+    if j >= ny:
+        if ypt > y0 + dy * ny:
+            return int_(-1)
+        j = ny - 1
+    # Pt could be in bucket with all x equivalent modulo 360
+    candidates = empty(0, dtype=numba_types.uint32)
+    nb_bucket = 0
+    x_ = (xpt - x0) % 360 + x0
+    while x_ <= x0 + dx * nx:
+        i = min(int((x_ - x0) / dx), nx - 1)
+        i_bucket = i_first + i * ny + j
+        candidates = concatenate(
+            (candidates, bucket_contours[bucket_index[i_bucket] : bucket_index[i_bucket + 1]])
+        )
+        nb_bucket += 1
+        x_ += 360
+    if nb_bucket > 1:
+        candidates = unique(candidates)
+
+    # Flag to check if we iterate
+    find_contour = 0
     # We iterate over contour in the same level
-    for i_elt_c in range(i_start_c, i_end_c):
+    for i_elt_c in candidates:
         # if bbox of contour doesn't contain pt, we skip this contour
         if y_min_per_c[i_elt_c] > ypt:
             continue
@@ -796,3 +1068,237 @@ def index_from_nearest_path_with_pt_in_bbox_(
         return int_(-1)
     # We return index of contour, for the specific level
     return int_(i_ref - i_start_c)
+
+
+@njit(cache=True)
+def _edge_point(edge, level, x, y, z, m, nb_h, nb_hv, wrap):
+    """Position where level crosses the grid edge"""
+    nx, ny = z.shape
+    if edge < nb_h:
+        # Edge along x
+        i0, j0 = edge // ny, edge % ny
+        i1, j1 = i0 + 1, j0
+    elif edge < nb_hv:
+        # Edge along y
+        edge -= nb_h
+        i0, j0 = edge // (ny - 1), edge % (ny - 1)
+        i1, j1 = i0, j0 + 1
+    else:
+        # Diagonal of a cell with one masked corner
+        edge -= nb_hv
+        i, j = edge // (ny - 1), edge % (ny - 1)
+        i_ = i + 1 if i + 1 < nx else 0
+        if m[i, j] or m[i_, j + 1]:
+            i0, j0, i1, j1 = i + 1, j, i, j + 1
+        else:
+            i0, j0, i1, j1 = i, j, i + 1, j + 1
+    x0, y0, z0 = x[i0 % nx, j0], y[i0 % nx, j0], z[i0 % nx, j0]
+    x1, y1, z1 = x[i1 % nx, j1], y[i1 % nx, j1], z[i1 % nx, j1]
+    # Only with wrap
+    if i0 == nx:
+        x0 += 360
+    if i1 == nx:
+        x1 += 360
+    t = (level - z0) / (z1 - z0)
+    return x0 + t * (x1 - x0), y0 + t * (y1 - y0)
+
+
+@njit(cache=True)
+def marching_squares_(x, y, z, m, levels, wrap):
+    """
+    Compute iso-lines of all levels with marching squares, lines are oriented with
+    values above level on the left, so closed lines around maxima are counterclockwise.
+    Like matplotlib, saddles are solved with the mean of the cell and the three valid corners
+    of a cell with one masked corner are used as a triangle.
+
+    :param array x: x coordinates for each node (2D)
+    :param array y: y coordinates for each node (2D)
+    :param array z: values to contour (2D)
+    :param array[bool] m: mask of z
+    :param array levels: levels sorted in increasing order
+    :param bool wrap: if True, last column will be connected with first one (with x + 360)
+    :return: x and y of all points, number of points for each line, number of lines for each level
+    :rtype: array,array,array,array
+    """
+    nx, ny = z.shape
+    ncx = nx if wrap else nx - 1
+    ncy = ny - 1
+    nb_level = levels.shape[0]
+    nb_h = ncx * ny
+    nb_hv = nb_h + nx * ncy
+    nb_edge = nb_hv + ncx * ncy
+    # Levels which cross each cell are in [k_start, k_end[
+    k_start = zeros((ncx, ncy), dtype=numba_types.int32)
+    k_end = zeros((ncx, ncy), dtype=numba_types.int32)
+    nb_cell_per_level = zeros(nb_level + 1, dtype=numba_types.int64)
+    for i in range(ncx):
+        i1 = i + 1 if i + 1 < nx else 0
+        for j in range(ncy):
+            nb_masked = m[i, j] + m[i1, j] + m[i1, j + 1] + m[i, j + 1]
+            if nb_masked > 1:
+                continue
+            z_min, z_max = 1e300, -1e300
+            for i_, j_ in ((i, j), (i1, j), (i1, j + 1), (i, j + 1)):
+                if not m[i_, j_]:
+                    z_min = min(z_min, z[i_, j_])
+                    z_max = max(z_max, z[i_, j_])
+            # A corner is above if value > level
+            k0 = searchsorted(levels, z_min)
+            k1 = searchsorted(levels, z_max)
+            k_start[i, j], k_end[i, j] = k0, k1
+            nb_cell_per_level[k0] += 1
+            nb_cell_per_level[k1] -= 1
+    nb_cell_per_level = nb_cell_per_level.cumsum()[:nb_level]
+    # Cells sorted by level
+    cell_index = zeros(nb_level + 1, dtype=numba_types.int64)
+    cell_index[1:] = nb_cell_per_level.cumsum()
+    cells = empty(cell_index[-1], dtype=numba_types.int64)
+    cursor = cell_index[:-1].copy()
+    # Cells are visited row by row like matplotlib, to get paths in the same order
+    for j in range(ncy):
+        for i in range(ncx):
+            for k in range(k_start[i, j], k_end[i, j]):
+                cells[cursor[k]] = i * ncy + j
+                cursor[k] += 1
+
+    next_edge = -ones(nb_edge, dtype=numba_types.int64)
+    previous_edge = -ones(nb_edge, dtype=numba_types.int64)
+    touched = empty(max(nb_cell_per_level.max(), 1) * 4, dtype=numba_types.int64)
+    nb_line_per_level = zeros(nb_level, dtype=numba_types.int64)
+    capacity = cells.shape[0] + cells.shape[0] // 4 + 16
+    xs, ys = empty(capacity), empty(capacity)
+    nb_pt_per_line = empty(capacity, dtype=numba_types.int64)
+    edges = empty(3, dtype=numba_types.int64)
+    values = empty(3)
+    i_pt, i_line = 0, 0
+    for k in range(nb_level):
+        level = levels[k]
+        nb_touched = 0
+        # Oriented segments of each cell, stored as a link between edges
+        for i_cell in range(cell_index[k], cell_index[k + 1]):
+            i, j = cells[i_cell] // ncy, cells[i_cell] % ncy
+            i1 = i + 1 if i + 1 < nx else 0
+            bottom, top = i * ny + j, i * ny + j + 1
+            left, right = nb_h + i * ncy + j, nb_h + i1 * ncy + j
+            e0, e1, e2, e3 = -1, -1, -1, -1
+            if m[i, j] or m[i1, j] or m[i1, j + 1] or m[i, j + 1]:
+                # Triangle with valid corners, in counterclockwise order
+                diagonal = nb_hv + i * ncy + j
+                if m[i, j + 1]:
+                    edges[:] = bottom, right, diagonal
+                    values[:] = z[i, j], z[i1, j], z[i1, j + 1]
+                elif m[i, j]:
+                    edges[:] = right, top, diagonal
+                    values[:] = z[i1, j], z[i1, j + 1], z[i, j + 1]
+                elif m[i1, j]:
+                    edges[:] = top, left, diagonal
+                    values[:] = z[i1, j + 1], z[i, j + 1], z[i, j]
+                else:
+                    edges[:] = left, bottom, diagonal
+                    values[:] = z[i, j + 1], z[i, j], z[i1, j]
+                nb_above = 0
+                for i_ in range(3):
+                    nb_above += values[i_] > level
+                for i_ in range(3):
+                    if nb_above == 1 and values[i_] > level:
+                        e0, e1 = edges[i_], edges[i_ - 1]
+                    elif nb_above == 2 and values[i_] <= level:
+                        e0, e1 = edges[i_ - 1], edges[i_]
+            else:
+                case = (
+                    (z[i, j] > level)
+                    + 2 * (z[i1, j] > level)
+                    + 4 * (z[i1, j + 1] > level)
+                    + 8 * (z[i, j + 1] > level)
+                )
+                if case == 1:
+                    e0, e1 = bottom, left
+                elif case == 2:
+                    e0, e1 = right, bottom
+                elif case == 3:
+                    e0, e1 = right, left
+                elif case == 4:
+                    e0, e1 = top, right
+                elif case == 5:
+                    center = (z[i, j] + z[i1, j] + z[i1, j + 1] + z[i, j + 1]) / 4
+                    if center > level:
+                        e0, e1, e2, e3 = bottom, right, top, left
+                    else:
+                        e0, e1, e2, e3 = bottom, left, top, right
+                elif case == 6:
+                    e0, e1 = top, bottom
+                elif case == 7:
+                    e0, e1 = top, left
+                elif case == 8:
+                    e0, e1 = left, top
+                elif case == 9:
+                    e0, e1 = bottom, top
+                elif case == 10:
+                    center = (z[i, j] + z[i1, j] + z[i1, j + 1] + z[i, j + 1]) / 4
+                    if center > level:
+                        e0, e1, e2, e3 = left, bottom, right, top
+                    else:
+                        e0, e1, e2, e3 = right, bottom, left, top
+                elif case == 11:
+                    e0, e1 = right, top
+                elif case == 12:
+                    e0, e1 = left, right
+                elif case == 13:
+                    e0, e1 = bottom, right
+                elif case == 14:
+                    e0, e1 = left, bottom
+            if e0 != -1:
+                next_edge[e0], previous_edge[e1] = e1, e0
+                touched[nb_touched], touched[nb_touched + 1] = e0, e1
+                nb_touched += 2
+            if e2 != -1:
+                next_edge[e2], previous_edge[e3] = e3, e2
+                touched[nb_touched], touched[nb_touched + 1] = e2, e3
+                nb_touched += 2
+        # Lines are traced in order of the first cell where they are found
+        for i_touched in range(nb_touched):
+            start = touched[i_touched]
+            if next_edge[start] == -1:
+                continue
+            if previous_edge[start] != -1:
+                # Check if it's a closed line or the middle of an open line
+                edge = next_edge[start]
+                while edge != start and edge != -1:
+                    edge = next_edge[edge]
+                if edge == -1:
+                    # Open line must be traced from its first edge
+                    while previous_edge[start] != -1:
+                        start = previous_edge[start]
+            first_pt = i_pt
+            edge = start
+            # Closed lines come back on their first edge, so last point is the first one
+            while edge != -1:
+                if i_pt == capacity:
+                    capacity *= 2
+                    xs_, ys_ = empty(capacity), empty(capacity)
+                    xs_[:i_pt], ys_[:i_pt] = xs[:i_pt], ys[:i_pt]
+                    xs, ys = xs_, ys_
+                x_, y_ = _edge_point(edge, level, x, y, z, m, nb_h, nb_hv, wrap)
+                if wrap and i_pt != first_pt:
+                    # Keep continuity across the wrap
+                    d_x = x_ - xs[i_pt - 1]
+                    if d_x > 180:
+                        x_ -= 360
+                    elif d_x < -180:
+                        x_ += 360
+                xs[i_pt], ys[i_pt] = x_, y_
+                i_pt += 1
+                next_ = next_edge[edge]
+                next_edge[edge] = -1
+                edge = next_
+            if i_line == nb_pt_per_line.shape[0]:
+                nb_pt_per_line_ = empty(i_line * 2, dtype=numba_types.int64)
+                nb_pt_per_line_[:i_line] = nb_pt_per_line
+                nb_pt_per_line = nb_pt_per_line_
+            nb_pt_per_line[i_line] = i_pt - first_pt
+            i_line += 1
+            nb_line_per_level[k] += 1
+        for i_touched in range(nb_touched):
+            edge = touched[i_touched]
+            next_edge[edge], previous_edge[edge] = -1, -1
+    return xs[:i_pt], ys[:i_pt], nb_pt_per_line[:i_line], nb_line_per_level
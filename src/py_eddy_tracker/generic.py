@@ -300,6 +300,95 @@ def interp2d_bilinear(x_g, y_g, z_g, m_g, x, y):
     return z
 
 
+@njit(cache=True)
+def interp2d_indexes(x_g, y_g, x, y, nearest=False):
+    """
+    Give pixels and weights used by :py:func:`interp2d_bilinear`
+    or :py:func:`interp2d_nearest` for each point
+
+    :param array x_g: coordinates of grid
+    :param array y_g: coordinates of grid
+    :param array x: coordinate where interpolate z
+    :param array y: coordinate where interpolate z
+    :param bool nearest: if True we will take nearest pixel
+    :return: x and y indexes (N, 4) of corners (00, 01, 10, 11), weights (N, 4)
+        and False for points outside of grid
+    :rtype: array,array,array,array
+    """
+    x_ref = x_g[0]
+    y_ref = y_g[0]
+    x_step = x_g[1] - x_ref
+    y_step = y_g[1] - y_ref
+    nb_x = x_g.shape[0]
+    nb_y = y_g.shape[0]
+    is_circular = abs(x_g[-1] % 360 - (x_g[0] - x_step) % 360) < 1e-5
+    nb = x.size
+    i_x = zeros((nb, 4), dtype=numba_types.int32)
+    i_y = zeros((nb, 4), dtype=numba_types.int32)
+    weights = zeros((nb, 4))
+    valid = ones(nb, dtype=bool_)
+    for i in range(nb):
+        x_ = (x[i] - x_ref) / x_step
+        y_ = (y[i] - y_ref) / y_step
+        if nearest:
+            i0, j0 = int(round(x_)), int(round(y_))
+            if is_circular:
+                i0 %= nb_x
+            if i0 >= nb_x or i0 < 0 or j0 < 0 or j0 >= nb_y:
+                valid[i] = False
+                continue
+            i_x[i], i_y[i] = i0, j0
+            weights[i, 0] = 1
+            continue
+        i0, j0 = int(floor(x_)), int(floor(y_))
+        xd, yd = x_ - i0, y_ - j0
+        i1, j1 = i0 + 1, j0 + 1
+        if is_circular:
+            i0 %= nb_x
+            i1 %= nb_x
+        if i1 >= nb_x or i0 < 0 or j0 < 0 or j1 >= nb_y:
+            valid[i] = False
+            continue
+        i_x[i, 0], i_x[i, 1], i_x[i, 2], i_x[i, 3] = i0, i0, i1, i1
+        i_y[i, 0], i_y[i, 1], i_y[i, 2], i_y[i, 3] = j0, j1, j0, j1
+        weights[i, 0], weights[i, 1] = (1 - xd) * (1 - yd), (1 - xd) * yd
+        weights[i, 2], weights[i, 3] = xd * (1 - yd), xd * yd
+    return i_x, i_y, weights, valid
+
+
+@njit(cache=True, fastmath=True)
+def interp2d_apply(z, m, index, weights, valid, nearest, out):
+    """
+    Interpolate flat grids with pixels and weights of :py:func:`interp2d_indexes`
+
+    :param array z: flat grids (K, nb_x * nb_y)
+    :param array m: flat masks (K, nb_x * nb_y), True if value is masked,
+        mask is not checked if its shape is (1, 1)
+    :param array index: flat indexes of corners (N, 4)
+    :param array weights: weights of corners (N, 4)
+    :param array valid: False for points outside of grid
+    :param bool nearest: if True only first corner is used and mask is not checked
+    :param array out: array (K, N) where values will be written
+    """
+    check_mask = not nearest and m.shape != (1, 1)
+    for k in range(z.shape[0]):
+        z_, m_, out_ = z[k], m[0] if m.shape[0] == 1 else m[k], out[k]
+        for i in range(index.shape[0]):
+            if not valid[i]:
+                out_[i] = nan
+                continue
+            i00, i01, i10, i11 = index[i, 0], index[i, 1], index[i, 2], index[i, 3]
+            if nearest:
+                out_[i] = z_[i00]
+            elif check_mask and (m_[i00] or m_[i01] or m_[i10] or m_[i11]):
+                out_[i] = nan
+            else:
+                w = weights[i]
+                out_[i] = (
+                    z_[i00] * w[0] + z_[i01] * w[1] + z_[i10] * w[2] + z_[i11] * w[3]
+                )
+
+
 @njit(cache=True, fastmath=True)
 def uniform_resample(x_val, y_val, num_fac=2, fixed_size=-1):
     """
@@ -28,9 +28,7 @@ from numpy import (
     where,
     zeros,
 )
-import zarr
 
-from ..dataset.grid import GridCollection
 from ..generic import build_index, wrap_longitude
 from ..poly import bbox_intersection, vertice_overlap
 from .groups import GroupEddiesObservations, get_missing_indices, particle_candidate
@@ -1742,6 +1740,8 @@ class NetworkObservations(GroupEddiesObservations):
             # TODO : check size? compression?
             params_seg = dict()
             params_pct = dict()
+            import zarr
+
             zg = zarr.open(output_name + ".zarr", mode="w")
             zg.array("target_forward", target_forward, **params_seg)
             zg.array("pct_forward", pct_forward, **params_pct)
@@ -1781,6 +1781,8 @@ class NetworkObservations(GroupEddiesObservations):
 
                     return f"/tmp/dt_global_{date.strftime('%Y%m%d')}.nc"
         """
+        from ..dataset.grid import GridCollection
+
         shape = len(self), 2
         itb_final = -ones(shape, dtype="i4")
         ptb_final = zeros(shape, dtype="i1")
@@ -1858,6 +1860,8 @@ class NetworkObservations(GroupEddiesObservations):
 
                     return f"/tmp/dt_global_{date.strftime('%Y%m%d')}.nc"
         """
+        from ..dataset.grid import GridCollection
+
         shape = len(self), 2
         itf_final = -ones(shape, dtype="i4")
         ptf_final = zeros(shape, dtype="i1")
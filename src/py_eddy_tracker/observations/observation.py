@@ -2,6 +2,7 @@
 """
 Base class to manage eddy observation
 """
+from collections.abc import MutableMapping
 from datetime import datetime
 from io import BufferedReader, BytesIO
 import logging
@@ -9,16 +10,16 @@ from tarfile import ExFileObject
 from tokenize import TokenError
 
 from Polygon import Polygon
-from matplotlib.cm import get_cmap
-from matplotlib.collections import LineCollection, PolyCollection
-from matplotlib.colors import Normalize
 from netCDF4 import Dataset
 from numba import njit, types as numba_types
+import numpy as np
 from numpy import (
     absolute,
     arange,
+    argsort,
     array,
     array_equal,
+    bincount,
     ceil,
     concatenate,
     cos,
@@ -31,12 +32,14 @@ from numpy import (
     histogram2d,
     in1d,
     isnan,
+    lexsort,
     linspace,
     ma,
     nan,
     ndarray,
     ones,
     percentile,
+    pi,
     radians,
     sin,
     unique,
@@ -44,11 +47,8 @@ from numpy import (
     zeros,
 )
 import packaging.version
-from pint import UnitRegistry
-from pint.errors import UndefinedUnitError
-import zarr
 
-from .. import VAR_DESCR, VAR_DESCR_inv, __version__
+from .. import VAR_DESCR, VAR_DESCR_inv, __version__, unit_registry
 from ..generic import (
     bbox_indice_regular,
     build_index,
@@ -102,6 +102,19 @@ def _check_versions(version):
         )
 
 
+def zarr_codecs(filters):
+    """Build zarr filters, filters could be given as codec or as numcodecs configuration
+    like in :py:data:`py_eddy_tracker.VAR_DESCR`
+
+    :param list filters: codecs or dict configurations
+    :return: codecs
+    :rtype: list
+    """
+    from numcodecs import get_codec
+
+    return [get_codec(i) if isinstance(i, dict) else i for i in filters]
+
+
 @njit(cache=True, fastmath=True)
 def shifted_ellipsoid_degrees_mask2(lon0, lat0, lon1, lat1, minor=1.5, major=1.5):
     """
@@ -174,6 +187,7 @@ class EddiesObservations(object):
         "sign_type",
         "raw_data",
         "period_",
+        "solver",
     )
 
     ELEMENTS = [
@@ -217,6 +231,15 @@ class EddiesObservations(object):
 
     NB_COLORS = len(COLORS)
 
+    #: Maximal distance in km between two linked observations
+    TRACKING_RADIUS = 125
+
+    #: Methods to solve conflicts between links, selected by name with `solver` option
+    SOLVERS = dict(
+        greedy="solve_simultaneous_sparse",
+        assignment="solve_assignment",
+    )
+
     def __init__(
         self,
         size=0,
@@ -225,7 +248,13 @@ class EddiesObservations(object):
         array_variables=None,
         only_variables=None,
         raw_data=False,
+        solver="greedy",
     ):
+        if solver not in self.SOLVERS:
+            raise Exception(
+                f"Unknown solver : {solver}, available : {', '.join(self.SOLVERS)}"
+            )
+        self.solver = solver
         self.period_ = None
         self.only_variables = only_variables
         self.raw_data = raw_data
@@ -398,6 +427,11 @@ class EddiesObservations(object):
         raise KeyError("%s unknown" % attr)
 
     def __getattr__(self, attr):
+        # Slots could be not set (like during unpickling), we must not look in elements
+        if attr.startswith("__") or attr in EddiesObservations.__slots__:
+            raise AttributeError(
+                "{!r} object has no attribute {!r}".format(type(self).__name__, attr)
+            )
         if attr in self.elements:
             return self.obs[attr]
         elif attr in VAR_DESCR_inv:
@@ -559,6 +593,7 @@ class EddiesObservations(object):
             last_track = eddies.track[nb_obs_self - 1] + 1
             eddies.track[nb_obs_self:] += last_track
         eddies.sign_type = self.sign_type
+        eddies.solver = self.solver
         return eddies
 
     def reset(self):
@@ -695,6 +730,38 @@ class EddiesObservations(object):
         other eddies."""
         return distance_grid(self.lon, self.lat, other.lon, other.lat)
 
+    def neighbours(self, other, radius):
+        """Find couples of self and other eddies closer than `radius`, couples are
+        searched with a KD-tree on unit sphere so no distance matrix is built.
+
+        :param EddiesObservations other: eddies to compare
+        :param float radius: maximal haversine distance in km
+        :return: index in self, index in other and distance in km, sorted by self
+            index then other index
+        :rtype: array, array, array
+        """
+        from scipy.spatial import cKDTree
+
+        if len(self) == 0 or len(other) == 0:
+            return empty(0, dtype="i8"), empty(0, dtype="i8"), empty(0)
+        # Chord on unit sphere, with a small tolerance because exact distance is
+        # computed after on each couple
+        angle = min(radius * 1.0001 / 6370.997, pi)
+        tree_self = cKDTree(unit_sphere(self.lon, self.lat))
+        tree_other = cKDTree(unit_sphere(other.lon, other.lat))
+        couples = tree_self.sparse_distance_matrix(
+            tree_other, 2 * sin(angle / 2), output_type="ndarray"
+        )
+        i_self, i_other = couples["i"].astype("i8"), couples["j"].astype("i8")
+        i = lexsort((i_other, i_self))
+        i_self, i_other = i_self[i], i_other[i]
+        dist = distance(
+            self.lon[i_self], self.lat[i_self], other.lon[i_other], other.lat[i_other]
+        )
+        dist /= 1000
+        m = dist < radius
+        return i_self[m], i_other[m], dist[m]
+
     def __copy__(self):
         eddies = self.new_like(self, len(self))
         for k in self.fields:
@@ -732,7 +799,9 @@ class EddiesObservations(object):
 
     @staticmethod
     def zarr_dimension(filename):
-        if isinstance(filename, zarr.storage.MutableMapping):
+        import zarr
+
+        if isinstance(filename, MutableMapping):
             h = filename
         else:
             h = zarr.open(filename)
@@ -769,7 +838,7 @@ class EddiesObservations(object):
         filename_ = (
             filename.filename if isinstance(filename, ExFileObject) else filename
         )
-        if isinstance(filename, zarr.storage.MutableMapping):
+        if isinstance(filename, MutableMapping):
             return cls.load_from_zarr(filename, **kwargs)
         if isinstance(filename, (bytes, str)):
             end = b".zarr" if isinstance(filename_, bytes) else ".zarr"
@@ -805,8 +874,10 @@ class EddiesObservations(object):
         :return: Obsevations selected
         :return type: class
         """
+        import zarr
+
         # FIXME
-        if isinstance(filename, zarr.storage.MutableMapping):
+        if isinstance(filename, MutableMapping):
             h_zarr = filename
         else:
             if not isinstance(filename, str):
@@ -1056,7 +1127,9 @@ class EddiesObservations(object):
     def compare_units(input_unit, output_unit, name):
         if output_unit is None or input_unit is None or output_unit == input_unit:
             return 1
-        units = UnitRegistry()
+        from pint.errors import UndefinedUnitError
+
+        units = unit_registry()
         try:
             input_unit = units.parse_expression(input_unit, case_sensitive=False)
             output_unit = units.parse_expression(output_unit, case_sensitive=False)
@@ -1286,7 +1359,7 @@ class EddiesObservations(object):
         return costs
 
     def mask_function(self, other, distance):
-        return distance < 125
+        return distance < self.TRACKING_RADIUS
 
     @staticmethod
     def cost_function(records_in, records_out, distance):
@@ -1513,8 +1586,100 @@ class EddiesObservations(object):
             logger.debug("%d links resolve", links_resolve)
         return mask
 
+    @staticmethod
+    def solve_simultaneous_sparse(i_self, i_other, cost):
+        """Deduce link from a list of available links, give the same links as
+        :py:meth:`solve_simultaneous` without cost matrix.
+
+        :param array(int) i_self: self index of each link, sorted with i_other
+        :param array(int) i_other: other index of each link
+        :param array(float) cost: Cost for each available link
+        :return: return a boolean mask array, True for each valid link
+        :rtype: array(bool)
+        """
+        if cost.size == 0:
+            return ones(0, dtype="bool")
+        max_links = max(bincount(i_self).max(), bincount(i_other).max())
+        if max_links > 5:
+            logger.warning("One observation have %d links", max_links)
+        return solve_links_by_cost(i_self, i_other, cost)
+
+    @staticmethod
+    def solve_assignment(i_self, i_other, cost):
+        """Deduce link from a list of available links, keep the maximal number of links
+        and among them links with the minimal total cost. Each connected component of
+        links is solved with sparse Jonker-Volgenant algorithm
+        (:py:func:`scipy.sparse.csgraph.min_weight_full_bipartite_matching`).
+
+        :param array(int) i_self: self index of each link
+        :param array(int) i_other: other index of each link
+        :param array(float) cost: Cost for each available link
+        :return: return a boolean mask array, True for each valid link
+        :rtype: array(bool)
+        """
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        nb_link = cost.shape[0]
+        keep = zeros(nb_link, dtype="bool")
+        if nb_link == 0:
+            return keep
+        _, i_self = unique(i_self, return_inverse=True)
+        _, i_other = unique(i_other, return_inverse=True)
+        nb_self = i_self.max() + 1
+        nb_node = nb_self + i_other.max() + 1
+        graph = coo_matrix(
+            (ones(nb_link), (i_self, i_other + nb_self)), shape=(nb_node, nb_node)
+        )
+        _, labels = connected_components(graph, directed=False)
+        labels = labels[i_self]
+        # Link alone in its component is not in conflict
+        nb_by_label = bincount(labels)
+        keep[nb_by_label[labels] == 1] = True
+        order = argsort(labels, kind="stable")
+        bounds = concatenate(((0,), nb_by_label.cumsum()))
+        for i in where(nb_by_label > 1)[0]:
+            links = order[bounds[i] : bounds[i + 1]]
+            keep[links] = assignment_component(
+                i_self[links], i_other[links], cost[links]
+            )
+        logger.debug(
+            "%d links resolve in %d conflicts",
+            keep.sum(),
+            (nb_by_label > 1).sum(),
+        )
+        return keep
+
+    def solve_links(self, i_self, i_other, cost):
+        """Deduce link from a list of available links with method of
+        :py:attr:`SOLVERS` selected by `solver` option
+
+        :param array(int) i_self: self index of each link, sorted with i_other
+        :param array(int) i_other: other index of each link
+        :param array(float) cost: Cost for each available link
+        :return: return a boolean mask array, True for each valid link
+        :rtype: array(bool)
+        """
+        return getattr(self, self.SOLVERS[self.solver])(i_self, i_other, cost)
+
     def solve_function(self, cost_matrix):
-        return numba_where(self.solve_simultaneous(cost_matrix))
+        i_self, i_other = numba_where(~ma.getmaskarray(cost_matrix))
+        m = self.solve_links(i_self, i_other, cost_matrix.data[i_self, i_other])
+        return i_self[m], i_other[m]
+
+    def sparse_tracking(self):
+        """Sparse tracking is used when links are selected and solved by default
+        methods, with overridden :py:meth:`mask_function`, :py:meth:`solve_function`
+        or :py:meth:`post_process_link` a cost matrix is needed.
+
+        :rtype: bool
+        """
+        cls = self.__class__
+        return (
+            cls.mask_function is EddiesObservations.mask_function
+            and cls.solve_function is EddiesObservations.solve_function
+            and cls.post_process_link is EddiesObservations.post_process_link
+        )
 
     def post_process_link(self, other, i_self, i_other):
         if unique(i_other).shape[0] != i_other.shape[0]:
@@ -1522,7 +1687,24 @@ class EddiesObservations(object):
         return i_self, i_other
 
     def tracking(self, other):
-        """Track obs between self and other"""
+        """Track obs between self and other
+
+        With :py:meth:`sparse_tracking`, only couples closer than
+        :py:attr:`TRACKING_RADIUS` are evaluated, otherwise a cost matrix between
+        all self and other obs is built.
+        """
+        if self.sparse_tracking():
+            i_self, i_other, dist = self.neighbours(other, self.TRACKING_RADIUS)
+            m = self.mask_function(other, dist)
+            i_self, i_other = i_self[m], i_other[m]
+            cost = self.cost_function(
+                self.obs[i_self], other.obs[i_other], dist[m]
+            ).astype("f4")
+            m = self.solve_links(i_self, i_other, cost)
+            i_self, i_other, cost = i_self[m], i_other[m], cost[m]
+            logger.debug("%d matched with previous", i_self.shape[0])
+            return i_self, i_other, cost
+
         dist = self.distance(other)
         mask_accept_dist = self.mask_function(other, dist)
         indexs_closest = where(mask_accept_dist)
@@ -1672,6 +1854,8 @@ class EddiesObservations(object):
         :param str name: private variable name
         :return list: filters list
         """
+        import zarr
+
         content = VAR_DESCR.get(name)
         filters = list()
         store_dtype = content["output_type"]
@@ -1689,7 +1873,7 @@ class EddiesObservations(object):
                     astype=store_dtype,
                 )
             )
-        filters.extend(content.get("filters", []))
+        filters.extend(zarr_codecs(content.get("filters", [])))
         return filters
 
     def create_variable_zarr(
@@ -1704,6 +1888,8 @@ class EddiesObservations(object):
         compressor=None,
         chunck_size=2500000,
     ):
+        import zarr
+
         kwargs_variable["shape"] = data.shape
         kwargs_variable["compressor"] = (
             zarr.Blosc(cname="zstd", clevel=2) if compressor is None else compressor
@@ -1722,7 +1908,7 @@ class EddiesObservations(object):
                 )
             )
         if filters is not None:
-            kwargs_variable["filters"].extend(filters)
+            kwargs_variable["filters"].extend(zarr_codecs(filters))
         dims = kwargs_variable.get("dimensions", None)
         # Manage chunk in 2d case
         if len(dims) == 1:
@@ -1778,6 +1964,8 @@ class EddiesObservations(object):
             zarr_flag = True
         logger.info("Store in %s (%d observations)", filename, len(self))
         if zarr_flag:
+            import zarr
+
             handler = zarr.open(filename, "w")
             self.to_zarr(handler, **kwargs)
         else:
@@ -1933,6 +2121,10 @@ class EddiesObservations(object):
 
         .. minigallery:: py_eddy_tracker.EddiesObservations.filled
         """
+        from matplotlib.cm import get_cmap
+        from matplotlib.collections import PolyCollection
+        from matplotlib.colors import Normalize
+
         x_name, y_name = self.intern(intern)
         x, y = self[x_name], self[y_name]
         if ref is not None:
@@ -2094,6 +2286,10 @@ class EddiesObservations(object):
 
         .. minigallery:: py_eddy_tracker.EddiesObservations.display_color
         """
+        from matplotlib.cm import get_cmap
+        from matplotlib.collections import LineCollection
+        from matplotlib.colors import Normalize
+
         xname, yname = self.intern(intern)
         x, y = self[xname], self[yname]
 
@@ -2359,7 +2555,15 @@ class EddiesObservations(object):
         return regular_grid
 
     def interp_grid(
-        self, grid_object, varname, i=None, method="center", dtype=None, intern=None
+        self,
+        grid_object,
+        varname,
+        i=None,
+        method="center",
+        dtype=None,
+        intern=None,
+        plan=None,
+        footprint=None,
     ):
         """
         Interpolate a grid on a center or contour with mean, min or max method
@@ -2372,39 +2576,74 @@ class EddiesObservations(object):
         :param str method: 'center', 'mean', 'max', 'min', 'nearest'
         :param str dtype: if None we use var dtype
         :param bool intern: Use extern or intern contour
+        :param InterpolationPlan plan: plan given by :py:meth:`interpolation_plan` with
+            the same grid coordinates, `i` and `method`, to not compute again pixels and
+            weights of centers for each variable
+        :param PixelFootprint footprint: footprint given by :py:meth:`pixel_footprint` with
+            the same grid coordinates, `i` and `intern`, to not compute again pixels in
+            contours for each variable with 'mean', 'max', 'min' or 'count'
 
         .. minigallery:: py_eddy_tracker.EddiesObservations.interp_grid
         """
         if method in ("center", "nearest"):
+            if plan is not None:
+                return plan.apply(grid_object.grid(varname))
             x, y = self.longitude, self.latitude
             if i is not None:
                 x, y = x[i], y[i]
             return grid_object.interp(varname, x, y, method)
         elif method in ("min", "max", "mean", "count"):
-            x0 = grid_object.x_bounds[0]
-            x_name, y_name = self.intern(False if intern is None else intern)
-            x_ref = ((self.longitude - x0) % 360 + x0 - 180).reshape(-1, 1)
-            x, y = (self[x_name] - x_ref) % 360 + x_ref, self[y_name]
-            if i is not None:
-                x, y = x[i], y[i]
             grid = grid_object.grid(varname)
-            result = empty(x.shape[0], dtype=grid.dtype if dtype is None else dtype)
-            min_method = method == "min"
-            grid_stat(
-                grid_object.x_c,
-                grid_object.y_c,
-                -grid.data if min_method else grid.data,
-                grid.mask,
-                x,
-                y,
-                result,
-                grid_object.is_circular(),
-                method="max" if min_method else method,
-            )
-            return -result if min_method else result
+            if footprint is None:
+                footprint = self.pixel_footprint(grid_object, i=i, intern=intern)
+            return footprint.reduce(grid, method, dtype)
         else:
             raise Exception(f'method "{method}" unknown')
 
+    def pixel_footprint(self, grid_object, i=None, intern=None):
+        """
+        Give pixels of grid in each contour, to compute statistics of several variables
+        with :py:meth:`interp_grid` or :py:meth:`PixelFootprint.reduce`
+
+        :param grid_object: Handler of grid
+        :type grid_object: py_eddy_tracker.dataset.grid.RegularGridDataset
+        :param array[bool,int],None i: Index or mask to subset observations
+        :param bool intern: Use extern or intern contour
+        :rtype: PixelFootprint
+        """
+        x0 = grid_object.x_bounds[0]
+        x_name, y_name = self.intern(False if intern is None else intern)
+        x_ref = ((self.longitude - x0) % 360 + x0 - 180).reshape(-1, 1)
+        x, y = (self[x_name] - x_ref) % 360 + x_ref, self[y_name]
+        if i is not None:
+            x, y = x[i], y[i]
+        first, i_x, i_y = contour_pixels(
+            grid_object.x_c, grid_object.y_c, x, y, grid_object.is_circular()
+        )
+        return PixelFootprint(
+            (grid_object.x_c.shape[0], grid_object.y_c.shape[0]), first, i_x, i_y
+        )
+
+    def interpolation_plan(self, grid_object, i=None, method="center"):
+        """
+        Precompute pixels and weights to interpolate several variables on centers,
+        look at :py:meth:`interp_grid`
+
+        :param grid_object: Handler of grid to interp
+        :type grid_object: py_eddy_tracker.dataset.grid.RegularGridDataset
+        :param array[bool,int],None i: Index or mask to subset observations
+        :param str method: 'center' or 'nearest'
+        :rtype: InterpolationPlan
+        """
+        if method not in ("center", "nearest"):
+            raise Exception(f'method "{method}" could not be planned')
+        x, y = self.longitude, self.latitude
+        if i is not None:
+            x, y = x[i], y[i]
+        return grid_object.interpolation_plan(
+            x, y, "nearest" if method == "nearest" else "bilinear"
+        )
+
     @property
     def period(self):
         """
@@ -2575,21 +2814,66 @@ def grid_stat(x_c, y_c, grid, mask, x, y, result, circular=False, method="mean")
     :param bool circular: True if grid is wrappable
     :param str method: 'mean', 'max'
     """
+    first, i_x, i_y = contour_pixels(x_c, y_c, x, y, circular)
+    footprint_stat(grid, mask, first, i_x, i_y, result, method)
+
+
+@njit(cache=True)
+def contour_pixels(x_c, y_c, x, y, circular=False):
+    """
+    Give pixels of a regular grid in each contour, pixels of contour `i` are
+    `i_x[first[i]:first[i + 1]]`, `i_y[first[i]:first[i + 1]]`
+
+    :param array_like x_c: the grid longitude coordinates
+    :param array_like y_c: the grid latitude coordinates
+    :param array_like x: longitude of contours
+    :param array_like y: latitude of contours
+    :param bool circular: True if grid is wrappable
+    :return: first pixel of each contour (N + 1), x and y indexes of pixels
+    :rtype: array,array,array
+    """
     # FIXME : how does it work on grid bound
-    nb = result.shape[0]
+    nb = x.shape[0]
     xstep, ystep = x_c[1] - x_c[0], y_c[1] - y_c[0]
     x0, y0 = x_c - xstep / 2.0, y_c - ystep / 2.0
     nb_x = x_c.shape[0]
-    max_method = "max" == method
-    mean_method = "mean" == method
-    count_method = "count" == method
+    first = zeros(nb + 1, dtype=numba_types.int64)
+    pixels = list()
     for elt in range(nb):
         v = create_vertice(x[elt], y[elt])
         (x_start, x_stop), (y_start, y_stop) = bbox_indice_regular(
             v, x0, y0, xstep, ystep, 1, circular, nb_x
         )
         i, j = get_pixel_in_regular(v, x_c, y_c, x_start, x_stop, y_start, y_stop)
+        pixels.append((i, j))
+        first[elt + 1] = first[elt] + i.shape[0]
+    i_x = empty(first[-1], dtype=numba_types.int32)
+    i_y = empty(first[-1], dtype=numba_types.int32)
+    for elt in range(nb):
+        i, j = pixels[elt]
+        i_x[first[elt] : first[elt + 1]] = i
+        i_y[first[elt] : first[elt + 1]] = j
+    return first, i_x, i_y
+
+
+@njit(cache=True)
+def footprint_stat(grid, mask, first, i_x, i_y, result, method="mean"):
+    """
+    Compute the mean or the max of the grid on pixels of each contour
 
+    :param array_like grid: grid value
+    :param array[bool] mask: mask for invalid value
+    :param array first: first pixel of each contour, look at :py:func:`contour_pixels`
+    :param array i_x: x index of pixels
+    :param array i_y: y index of pixels
+    :param array_like result: return values
+    :param str method: 'mean', 'max', 'count'
+    """
+    max_method = "max" == method
+    mean_method = "mean" == method
+    count_method = "count" == method
+    for elt in range(result.shape[0]):
+        i, j = i_x[first[elt] : first[elt + 1]], i_y[first[elt] : first[elt + 1]]
         if count_method:
             result[elt] = i.shape[0]
         elif mean_method:
@@ -2614,6 +2898,89 @@ def grid_stat(x_c, y_c, grid, mask, x, y, result, circular=False, method="mean")
             result[elt] = v_max
 
 
+class PixelFootprint(object):
+    """Pixels of a regular grid in each contour of a dataset, stored in CSR.
+
+    Footprint depends only on contours and grid coordinates, so it could be computed
+    once and used to reduce many variables or time steps of the same grid.
+    """
+
+    __slots__ = ("shape", "first", "i_x", "i_y")
+
+    def __init__(self, shape, first, i_x, i_y):
+        """
+        :param (int,int) shape: shape of grid
+        :param array first: first pixel of each contour, last value is number of pixels
+        :param array i_x: x index of pixels
+        :param array i_y: y index of pixels
+        """
+        self.shape = tuple(shape)
+        self.first, self.i_x, self.i_y = first, i_x, i_y
+
+    def __len__(self):
+        return self.first.shape[0] - 1
+
+    @property
+    def nb_pixel(self):
+        """Number of pixels in each contour"""
+        return self.first[1:] - self.first[:-1]
+
+    def pixels(self, i):
+        """Give pixels of contour `i`
+
+        :param int i: index of contour
+        :return: x and y indexes
+        :rtype: array,array
+        """
+        sl = slice(self.first[i], self.first[i + 1])
+        return self.i_x[sl], self.i_y[sl]
+
+    def reduce(self, grid, method="mean", dtype=None):
+        """Compute a statistic of grid in each contour
+
+        :param array grid: masked grid with the same shape as footprint
+        :param str method: 'mean', 'max', 'min', 'count'
+        :param str dtype: if None we use grid dtype
+        :return: one value by contour
+        :rtype: array
+        """
+        if method not in ("min", "max", "mean", "count"):
+            raise Exception(f'method "{method}" unknown')
+        if grid.shape != self.shape:
+            raise Exception(
+                f"Grid shape {grid.shape} is not footprint shape {self.shape}"
+            )
+        result = empty(len(self), dtype=grid.dtype if dtype is None else dtype)
+        min_method = method == "min"
+        data = ma.getdata(grid)
+        footprint_stat(
+            -data if min_method else data,
+            ma.getmaskarray(grid),
+            self.first,
+            self.i_x,
+            self.i_y,
+            result,
+            method="max" if min_method else method,
+        )
+        return -result if min_method else result
+
+    def save(self, filename):
+        """Store footprint in a npz file, for example next to the atlas of contours"""
+        np.savez(
+            filename,
+            shape=array(self.shape),
+            first=self.first,
+            i_x=self.i_x,
+            i_y=self.i_y,
+        )
+
+    @classmethod
+    def load(cls, filename):
+        """Read a footprint stored with :py:meth:`save`"""
+        with np.load(filename) as h:
+            return cls(h["shape"], h["first"], h["i_x"], h["i_y"])
+
+
 class VirtualEddiesObservations(EddiesObservations):
     """Class to work with virtual obs"""
 
@@ -2626,6 +2993,166 @@ class VirtualEddiesObservations(EddiesObservations):
         return list(set(elements))
 
 
+class ObservationsBuilder(object):
+    """Accumulate observations one after the other and produce a single
+    :py:class:`EddiesObservations` at the end.
+
+    Storage is a structured array which is doubled when full, so appending costs
+    no allocation most of the time, and no intermediate object is created by observation.
+
+    .. code-block:: python
+
+        builder = ObservationsBuilder(EddiesObservations(track_array_variables=50, array_variables=["contour_lon_e"]))
+        i = builder.append(lon=10.5, lat=42.1)
+        builder.observations["contour_lon_e"][i] = contour
+        eddies = builder.build()
+    """
+
+    __slots__ = ("model", "observations", "size")
+
+    def __init__(self, model, capacity=64):
+        """
+        :param EddiesObservations model: observations which give variables and class of output,
+            its content is not used
+        :param int capacity: number of observations allocated at start
+        """
+        self.model = model
+        self.observations = zeros(max(capacity, 1), dtype=model.dtype)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return self.observations.shape[0]
+
+    def reserve(self, capacity):
+        """Extend storage to be able to store `capacity` observations.
+
+        :param int capacity: minimal number of observations to store
+        """
+        if capacity <= self.capacity:
+            return
+        observations = zeros(capacity, dtype=self.observations.dtype)
+        observations[: self.size] = self.observations[: self.size]
+        self.observations = observations
+
+    def append(self, **values):
+        """Add one observation, variables not given are set to 0.
+
+        Storage could be reallocated by an append, so :py:attr:`observations` must be read
+        again after each call to write directly in it.
+
+        :param values: value for each variable (row of `NbSample` for array variables)
+        :return: index of new observation
+        :rtype: int
+        """
+        if self.size == self.capacity:
+            self.reserve(2 * self.capacity)
+        i = self.size
+        for name, value in values.items():
+            self.observations[name][i] = value
+        self.size += 1
+        return i
+
+    def build(self):
+        """Trim storage to filled observations and return them.
+
+        :return: observations of the same class and variables as the model
+        :rtype: EddiesObservations
+        """
+        eddies = self.model.new_like(self.model, 0)
+        eddies.observations = self.observations[: self.size].copy()
+        eddies.sign_type = self.model.sign_type
+        return eddies
+
+
+@njit(cache=True)
+def unit_sphere(lon, lat):
+    """Cartesian coordinates on unit sphere
+
+    :param array lon: longitudes in degrees
+    :param array lat: latitudes in degrees
+    :return: x, y, z of each point
+    :rtype: array
+    """
+    nb = lon.shape[0]
+    xyz = empty((nb, 3))
+    D2R = pi / 180.0
+    for i in range(nb):
+        cos_lat = cos(lat[i] * D2R)
+        xyz[i, 0] = cos_lat * cos(lon[i] * D2R)
+        xyz[i, 1] = cos_lat * sin(lon[i] * D2R)
+        xyz[i, 2] = sin(lat[i] * D2R)
+    return xyz
+
+
+@njit(cache=True)
+def solve_links_by_cost(i_self, i_other, cost):
+    """Keep links by increasing cost when self and other obs are not already linked,
+    links with the same cost are taken in order of i_self then i_other
+
+    :param array(int) i_self: self index of each link, sorted with i_other
+    :param array(int) i_other: other index of each link
+    :param array(float) cost: Cost for each available link
+    :return: True for each kept link
+    :rtype: array(bool)
+    """
+    nb = cost.shape[0]
+    keep = zeros(nb, dtype=numba_types.bool_)
+    self_used = zeros(i_self.max() + 1, dtype=numba_types.bool_)
+    other_used = zeros(i_other.max() + 1, dtype=numba_types.bool_)
+    for k in argsort(cost, kind="mergesort"):
+        i, j = i_self[k], i_other[k]
+        if self_used[i] or other_used[j]:
+            continue
+        self_used[i] = True
+        other_used[j] = True
+        keep[k] = True
+    return keep
+
+
+def assignment_component(i_self, i_other, cost):
+    """Solve assignment of one component of links, with a dummy node for each self
+    and other obs to allow obs without link. Linking two obs removes two dummy links
+    which cost more than all links together, so the number of links is maximal.
+
+    :param array(int) i_self: self index of each link
+    :param array(int) i_other: other index of each link
+    :param array(float) cost: Cost for each available link
+    :return: True for each kept link
+    :rtype: array(bool)
+    """
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+    _, i_self = unique(i_self, return_inverse=True)
+    _, i_other = unique(i_other, return_inverse=True)
+    nb_self, nb_other, nb_link = i_self.max() + 1, i_other.max() + 1, cost.shape[0]
+    # Weights are shifted to be strictly positive, a null weight would be a missing
+    # edge of the sparse graph. Dummy weight makes the number of links the first
+    # criterion, so compared matchings have the same number of links and the shift
+    # adds the same value to their costs
+    weights = cost - cost.min() + 1
+    dummy = weights.sum() + 1
+    # Rows are self obs then dummy by other obs, columns are other obs then dummy by
+    # self obs, dummies are linked together where obs could be linked
+    rows = concatenate(
+        (i_self, arange(nb_self), arange(nb_other) + nb_self, i_other + nb_self)
+    )
+    cols = concatenate(
+        (i_other, arange(nb_self) + nb_other, arange(nb_other), i_self + nb_other)
+    )
+    values = concatenate((weights, ones(nb_self + nb_other) * dummy, ones(nb_link)))
+    nb = nb_self + nb_other
+    graph = csr_matrix((values, (rows, cols)), shape=(nb, nb))
+    row_index, col_index = min_weight_full_bipartite_matching(graph)
+    matched = empty(nb, dtype=col_index.dtype)
+    matched[row_index] = col_index
+    return matched[i_self] == i_other
+
+
 @njit(cache=True)
 def numba_where(mask):
     """Usefull when mask is close to be empty"""
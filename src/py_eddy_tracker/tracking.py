@@ -2,9 +2,13 @@
 """
 Class to store link between observations
 """
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import json
 import logging
+from multiprocessing import Pool
+from os.path import basename
 import platform
 from tarfile import ExFileObject
 
@@ -17,6 +21,7 @@ from numpy import (
     concatenate,
     empty,
     isin,
+    lexsort,
     ma,
     ones,
     setdiff1d,
@@ -26,6 +31,7 @@ from numpy import (
     zeros,
 )
 
+from py_eddy_tracker import VAR_DESCR
 from py_eddy_tracker.observations.observation import (
     EddiesObservations,
     VirtualEddiesObservations,
@@ -46,6 +52,28 @@ def index(ar, items):
     return indexs
 
 
+def _tracking_task(task):
+    """Track each couple of consecutive datasets of a block, used by
+    :py:meth:`Correspondances.track_parallel`
+
+    :return: for each couple, index in previous, index in current, cost and number
+        of previous obs
+    :rtype: list
+    """
+    class_method, class_kw, memory, datasets, kwargs = task
+    c = Correspondances(
+        datasets, class_method=class_method, class_kw=class_kw, memory=memory
+    )
+    links = list()
+    previous = None
+    for dataset in datasets:
+        current = c.load_dataset(dataset, **kwargs)
+        if previous is not None:
+            links.append((*previous.tracking(current), len(previous)))
+        previous = current
+    return links
+
+
 class Correspondances(list):
     """Object to store correspondances
     And run tracking
@@ -67,6 +95,8 @@ class Correspondances(list):
         class_kw=None,
         previous_correspondance=None,
         memory=False,
+        prefetch=0,
+        nb_process=1,
     ):
         """Initiate tracking
 
@@ -75,6 +105,10 @@ class Correspondances(list):
         :param dict class_kw: keyword argument to setup class
         :param Correspondances previous_correspondance: A previous correspondance object if you want continue tracking
         :param bool memory: identification file are load in memory before to be open with netcdf
+        :param int prefetch: number of next datasets loaded by a background thread during tracking,
+            0 to load datasets only when they are needed
+        :param int nb_process: number of process used to track couples of datasets,
+            only without virtual observations
         """
         super().__init__()
         # Correspondance dtype
@@ -90,6 +124,8 @@ class Correspondances(list):
             self.class_method = class_method
         self.class_kw = dict() if class_kw is None else class_kw
         self.memory = memory
+        self.prefetch = prefetch
+        self.nb_process = nb_process
 
         # To count ID
         self.current_id = 0
@@ -167,17 +203,58 @@ class Correspondances(list):
         )
         return date_start, date_stop
 
-    def swap_dataset(self, dataset, *args, **kwargs):
-        """Swap to next dataset"""
-        self.previous2_obs = self.previous_obs
-        self.previous_obs = self.current_obs
+    def load_dataset(self, dataset, *args, **kwargs):
+        """Load observations of a dataset with class options"""
         kwargs = kwargs.copy()
         kwargs.update(self.class_kw)
         if self.memory:
             with open(dataset, "rb") as h:
-                self.current_obs = self.class_method.load_file(h, *args, **kwargs)
-        else:
-            self.current_obs = self.class_method.load_file(dataset, *args, **kwargs)
+                return self.class_method.load_file(h, *args, **kwargs)
+        return self.class_method.load_file(dataset, *args, **kwargs)
+
+    def iter_datasets(self, datasets, **kwargs):
+        """Yield each dataset with its observations, with `prefetch` the next datasets
+        are loaded by a background thread while current one is used. At most
+        `prefetch` datasets are loaded in advance.
+
+        :param list datasets: datasets to load
+        :param dict kwargs: arguments given to :py:meth:`load_dataset`
+        """
+        if self.prefetch < 1:
+            for dataset in datasets:
+                yield dataset, self.load_dataset(dataset, **kwargs)
+            return
+        datasets = iter(datasets)
+        pending = deque()
+        with ThreadPoolExecutor(1) as executor:
+
+            def submit():
+                dataset = next(datasets, None)
+                if dataset is not None:
+                    future = executor.submit(self.load_dataset, dataset, **kwargs)
+                    pending.append((dataset, future))
+
+            try:
+                for _ in range(self.prefetch):
+                    submit()
+                while pending:
+                    dataset, future = pending.popleft()
+                    obs = future.result()
+                    submit()
+                    yield dataset, obs
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def swap_obs(self, obs):
+        """Swap to next observations"""
+        self.previous2_obs = self.previous_obs
+        self.previous_obs = self.current_obs
+        self.current_obs = obs
+
+    def swap_dataset(self, dataset, *args, **kwargs):
+        """Swap to next dataset"""
+        self.swap_obs(self.load_dataset(dataset, *args, **kwargs))
 
     def merge_correspondance(self, other):
         # Verify compliance of file
@@ -213,9 +290,12 @@ class Correspondances(list):
         self.current_id = translate[-1] + 1
 
     def store_correspondance(
-        self, i_previous, i_current, nb_real_obs, association_cost
+        self, i_previous, i_current, nb_real_obs, association_cost, nb_previous=None
     ):
-        """Storing correspondance in an array"""
+        """Storing correspondance in an array
+
+        :param int nb_previous: number of previous obs, by default size of `previous_obs`
+        """
         # Create array to store correspondance data
         correspondance = array(i_previous, dtype=self.correspondance_dtype)
         if self.virtual:
@@ -229,7 +309,7 @@ class Correspondances(list):
             # it's a virtual data
             correspondance["virtual"] = i_previous >= nb_real_obs
 
-        if self.previous2_obs is None:
+        if len(self) == 0:
             # First time we set ID (Program starting)
             nb_match = i_previous.shape[0]
             # Set an id for each match
@@ -237,10 +317,10 @@ class Correspondances(list):
             self.append(correspondance)
             return True
 
+        if nb_previous is None:
+            nb_previous = len(self.previous_obs)
         # We set all id to UINT32_MAX
-        id_previous = (
-            ones(len(self.previous_obs), dtype=self.ID_DTYPE) * self.UINT32_MAX
-        )
+        id_previous = ones(nb_previous, dtype=self.ID_DTYPE) * self.UINT32_MAX
         # We get old id for previously eddies tracked
         id_previous[self[-1]["out"]] = self[-1]["id"]
         # We store ID in correspondance if the ID is UINT32_MAX, we never
@@ -371,10 +451,20 @@ class Correspondances(list):
         needed_variable = self.class_method.needed_variable()
         if needed_variable is not None:
             kwargs["include_vars"] = needed_variable
-        self.swap_dataset(self.datasets[first_dataset - 1], **kwargs)
+        # Less than two couples of datasets to track are done with one process
+        nb_couple = len(self.datasets) - first_dataset
+        if self.nb_process > 1 and nb_couple > 1:
+            if not self.virtual:
+                return self.track_parallel(first_dataset, **kwargs)
+            logger.warning(
+                "Tracking with virtual observations can't be parallelized, "
+                "it will be done with one process"
+            )
+        datasets = self.iter_datasets(self.datasets[first_dataset - 1 :], **kwargs)
+        self.swap_obs(next(datasets)[1])
         # We begin with second file, first one is in previous
-        for file_name in self.datasets[first_dataset:]:
-            self.swap_dataset(file_name, **kwargs)
+        for file_name, obs in datasets:
+            self.swap_obs(obs)
             filename_ = (
                 file_name.filename if isinstance(file_name, ExFileObject) else file_name
             )
@@ -402,6 +492,157 @@ class Correspondances(list):
             if self.virtual:
                 flg_virtual = True
 
+    def track_parallel(self, first_dataset, **kwargs):
+        """Run tracking of each couple of datasets in a pool of process, then set ID
+        sequentially. Couples are independent only without virtual observations.
+
+        :param int first_dataset: index of first dataset to track
+        :param dict kwargs: arguments given to :py:meth:`load_dataset`
+        """
+        datasets = self.datasets[first_dataset - 1 :]
+        nb_couple = len(datasets) - 1
+        if nb_couple < 1:
+            raise Exception("At least two datasets are needed to track in parallel")
+        # Blocks of consecutive datasets share their bounds, so each dataset is
+        # loaded once by block
+        nb_block = min(nb_couple, self.nb_process * 4)
+        bounds = (arange(nb_block + 1) * nb_couple) // nb_block
+        tasks = [
+            (
+                self.class_method,
+                self.class_kw,
+                self.memory,
+                datasets[i0 : i1 + 1],
+                kwargs,
+            )
+            for i0, i1 in zip(bounds[:-1], bounds[1:])
+        ]
+        with Pool(min(self.nb_process, nb_block)) as pool:
+            i_dataset = 1
+            for links in pool.imap(_tracking_task, tasks):
+                for i_previous, i_current, association_cost, nb_previous in links:
+                    logger.info("%s match with previous state", datasets[i_dataset])
+                    self.store_correspondance(
+                        i_previous,
+                        i_current,
+                        nb_previous,
+                        association_cost,
+                        nb_previous=nb_previous,
+                    )
+                    if len(self) > 1:
+                        self.recense_dead_id_to_extend()
+                    i_dataset += 1
+        self.current_obs = self.load_dataset(datasets[-1], **kwargs)
+
+    def append_to_store(self, store):
+        """Append observations of tracking steps which are not yet in a track store,
+        only datasets of these steps are loaded and stored observations are not
+        rewritten. Virtual observations are filled by linear interpolation.
+
+        :param str,zarr.hierarchy.Group,TrackStore store: store of tracks
+        :return: updated store
+        :rtype: TrackStore
+        """
+        if not isinstance(store, TrackStore):
+            store = TrackStore(store)
+        store.rollback()
+        first_step, nb_step = store.nb_step, len(self)
+        if first_step >= nb_step:
+            logger.info("Track store is already up to date")
+            return store
+        dataset = self.datasets[first_step]
+        if first_step > 0 and store.last_dataset != TrackStore.dataset_name(dataset):
+            raise Exception(
+                f"Track store stops at {store.last_dataset}, "
+                f"but dataset of step {first_step} is {dataset}"
+            )
+        previous = self.load_dataset(dataset)
+        for i in range(first_step, nb_step):
+            dataset = self.datasets[i + 1]
+            logger.info("%s append in track store", dataset)
+            current = self.load_dataset(dataset)
+            store.begin()
+            nb_obs = self._append_step_to_store(store, self[i], previous, current)
+            store.commit(i + 1, dataset, nb_obs)
+            previous = current
+        return store
+
+    def _append_step_to_store(self, store, links, previous, current):
+        """Append observations of one step of tracking in a track store
+
+        :return: number of observations in store after this step
+        :rtype: int
+        """
+        ids = links["id"]
+        nb_link = ids.shape[0]
+        last, n = store.track_state(ids)
+        m_new = last == -1
+        if self.virtual:
+            m_virtual = links["virtual"].astype(bool_)
+            nb_virtual = links["virtual_length"][m_virtual].astype("i8")
+        else:
+            m_virtual = zeros(nb_link, dtype=bool_)
+            nb_virtual = zeros(0, dtype="i8")
+        nb_first, nb_virtual_obs = m_new.sum(), nb_virtual.sum()
+        i_current = nb_first + nb_virtual_obs
+        block = TrackEddiesObservations(
+            size=i_current + nb_link,
+            track_extra_variables=current.track_extra_variables,
+            track_array_variables=current.track_array_variables,
+            array_variables=current.array_variables,
+            raw_data=current.raw_data,
+        )
+        block.sign_type = current.sign_type
+        block["cost_association"][:] = default_fillvals["f4"]
+        position = store.nb_obs
+        fields = current.fields
+        # First observation of new tracks
+        for field in fields:
+            block[field][:nb_first] = previous[field][links["in"][m_new]]
+        block["track"][:nb_first] = ids[m_new]
+        last[m_new] = position + arange(nb_first)
+        # Virtual observations, interpolated between last stored observation and
+        # current one
+        if nb_virtual_obs > 0:
+            i_link = arange(nb_virtual.shape[0]).repeat(nb_virtual)
+            i_start = nb_virtual.cumsum() - nb_virtual
+            step = arange(nb_virtual_obs) - i_start.repeat(nb_virtual) + 1
+            ratio = step / (nb_virtual[i_link] + 1)
+            fields_ = [
+                i
+                for i in fields
+                if i not in ("cost_association",) and i not in current.array_variables
+            ]
+            values_0 = store.read(fields_, last[m_virtual])
+            i_out = links["out"][m_virtual]
+            rows = slice(nb_first, i_current)
+            for field in fields_:
+                v0, v1 = values_0[field], current[field][i_out]
+                if field in ("lon", "lon_max"):
+                    v1 = (v1 - v0 + 180) % 360 + v0 - 180
+                block[field][rows] = (v0[i_link] + (v1 - v0)[i_link] * ratio).astype(
+                    block[field].dtype
+                )
+            block["virtual"][rows] = 1
+            block["track"][rows] = ids[m_virtual][i_link]
+            block["n"][rows] = n[m_virtual][i_link] + step
+            # Cost is given to the last virtual observation
+            last[m_virtual] = position + nb_first + i_start + nb_virtual - 1
+            n[m_virtual] += nb_virtual
+        # Cost of link is stored on previous observation of the track
+        cost = links["cost_value"]
+        m_block = last >= position
+        block["cost_association"][last[m_block] - position] = cost[m_block]
+        # Current observations
+        for field in fields:
+            block[field][i_current:] = current[field][links["out"]]
+        block["track"][i_current:] = ids
+        n += 1
+        block["n"][i_current:] = n
+        store.append(block, last[~m_block], cost[~m_block])
+        store.set_track_state(ids, position + i_current + arange(nb_link), n)
+        return position + len(block)
+
     def to_netcdf(self, handler):
         nb_step = len(self.datasets) - 1
         logger.info("Create correspondance file")
@@ -753,3 +994,161 @@ class Correspondances(list):
                 current_obs = self.class_method.load_file(dataset, raw_data=raw_data)
             eddies.append(current_obs.index(index_used, reverse=True))
         return EddiesObservations.concatenate(eddies)
+
+
+class TrackStore:
+    """Tracks stored in a zarr group, observations of each new step of tracking are
+    appended along the obs dimension, so stored observations are never rewritten.
+
+    Group `tracks` contains observations in order of insertion, :py:meth:`load` sorts
+    them by track. Group `index` contains position and number of the last observation
+    of each track. A step is valid only once committed, observations and index written
+    by an interrupted step are removed by :py:meth:`rollback`.
+    """
+
+    __slots__ = ("handler",)
+
+    def __init__(self, store):
+        """
+        :param str,MutableMapping,zarr.hierarchy.Group store: path or store of zarr group
+        """
+        import zarr
+
+        if isinstance(store, zarr.hierarchy.Group):
+            self.handler = store
+        else:
+            self.handler = zarr.open_group(store, mode="a")
+
+    @staticmethod
+    def dataset_name(dataset):
+        if isinstance(dataset, bytes):
+            dataset = dataset.decode("utf-8")
+        return basename(str(dataset))
+
+    @property
+    def nb_step(self):
+        """Number of tracking steps already stored"""
+        return self.handler.attrs.get("nb_step", 0)
+
+    @property
+    def nb_obs(self):
+        """Number of observations of committed steps"""
+        return self.handler.attrs.get("nb_obs", 0)
+
+    @property
+    def last_dataset(self):
+        """Name of last dataset stored"""
+        return self.handler.attrs.get("last_dataset", None)
+
+    def load(self, **kwargs):
+        """Load tracks, observations are sorted by track and n
+
+        :param dict kwargs: arguments given to
+            :py:meth:`~py_eddy_tracker.observations.observation.EddiesObservations.load_from_zarr`
+        :rtype: TrackEddiesObservations
+        """
+        eddies = TrackEddiesObservations.load_from_zarr(
+            self.handler["tracks"], **kwargs
+        )
+        return eddies.index(lexsort((eddies.n, eddies.track)))
+
+    def read(self, fields, index):
+        """Read values of stored observations
+
+        :param list(str) fields: fields to read
+        :param array(int) index: position of observations
+        :return: values by field
+        :rtype: dict
+        """
+        tracks = self.handler["tracks"]
+        return {
+            field: tracks[VAR_DESCR[field]["nc_name"]].get_coordinate_selection(index)
+            for field in fields
+        }
+
+    def track_state(self, tracks):
+        """Position and number of last observation of tracks, position is -1 for
+        tracks not yet stored
+
+        :param array(int) tracks: track ids
+        :rtype: array(int), array(int)
+        """
+        last = -ones(tracks.shape[0], dtype="i8")
+        n = zeros(tracks.shape[0], dtype="i8")
+        if "index" in self.handler:
+            index = self.handler["index"]
+            m = tracks < index["last"].shape[0]
+            last[m] = index["last"].get_coordinate_selection(tracks[m])
+            n[m] = index["n"].get_coordinate_selection(tracks[m])
+        return last, n
+
+    def set_track_state(self, tracks, last, n):
+        index = self.handler.require_group("index")
+        if "last" not in index:
+            kw = dict(shape=(0,), chunks=(1000000,))
+            index.create_dataset("last", dtype="i8", fill_value=-1, **kw)
+            index.create_dataset("n", dtype="i8", fill_value=0, **kw)
+        if tracks.shape[0] == 0:
+            return
+        nb_track = int(max(tracks.max() + 1, index["last"].shape[0]))
+        for name, values in (("last", last), ("n", n)):
+            index[name].resize(nb_track)
+            index[name].set_coordinate_selection(tracks, values)
+
+    def append(self, eddies, cost_index, cost):
+        """Append observations and set cost of stored observations
+
+        :param TrackEddiesObservations eddies: observations to append
+        :param array(int) cost_index: position of stored observations to update
+        :param array(float) cost: cost of association to the next observation
+        """
+        if "tracks" not in self.handler:
+            eddies.to_zarr(self.handler.create_group("tracks"))
+        else:
+            tracks = self.handler["tracks"]
+            for field in eddies.fields:
+                tracks[VAR_DESCR[field]["nc_name"]].append(eddies[field])
+        if cost_index.shape[0]:
+            name = VAR_DESCR["cost_association"]["nc_name"]
+            self.handler["tracks"][name].set_coordinate_selection(cost_index, cost)
+
+    def begin(self):
+        """Mark a step as pending before writing it"""
+        self.handler.attrs["pending"] = True
+
+    def commit(self, nb_step, dataset, nb_obs):
+        """Mark steps as stored"""
+        self.handler.attrs.update(
+            dict(
+                nb_step=nb_step,
+                last_dataset=self.dataset_name(dataset),
+                nb_obs=int(nb_obs),
+                pending=False,
+            )
+        )
+
+    def rollback(self):
+        """Remove observations of a pending step and rebuild index of tracks from
+        observations of committed steps. Cost of stored observations could be written
+        again by the step, with the same values.
+        """
+        if not self.handler.attrs.get("pending", False):
+            return
+        nb_obs = self.nb_obs
+        logger.warning("Remove an interrupted step after observation %d", nb_obs)
+        if "index" in self.handler:
+            del self.handler["index"]
+        if nb_obs == 0:
+            if "tracks" in self.handler:
+                del self.handler["tracks"]
+        else:
+            tracks = self.handler["tracks"]
+            for _, values in tracks.arrays():
+                values.resize(nb_obs, *values.shape[1:])
+            track = tracks[VAR_DESCR["track"]["nc_name"]][:]
+            n = tracks[VAR_DESCR["n"]["nc_name"]][:]
+            # Last observation of each track is its last occurrence
+            ids, i = unique(track[::-1], return_index=True)
+            last = nb_obs - 1 - i
+            self.set_track_state(ids, last, n[last])
+        self.handler.attrs["pending"] = False
@@ -1,11 +1,52 @@
+import json
+from os import environ, pathsep
+from os.path import dirname
+from subprocess import run
+import sys
+
 from matplotlib.path import Path
-from numpy import arange, array, isnan, ma, nan, ones, zeros
+from numpy import (
+    arange,
+    array,
+    cos,
+    deg2rad,
+    isnan,
+    ma,
+    meshgrid,
+    nan,
+    ones,
+    pi,
+    sin,
+    zeros,
+)
 from pytest import approx
 
+import py_eddy_tracker
+from py_eddy_tracker.appli.misc import warmup
 from py_eddy_tracker.data import get_demo_path
-from py_eddy_tracker.dataset.grid import RegularGridDataset
+from py_eddy_tracker.dataset.grid import (
+    CurvilinearIndex,
+    CurvilinearIndexCache,
+    GridCache,
+    IdentificationStats,
+    KernelCache,
+    RegularGridDataset,
+    _get_pixel_in_unregular,
+    identification_recall,
+)
+from py_eddy_tracker.generic import distance
 
 G = RegularGridDataset(get_demo_path("mask_1_60.nc"), "lon", "lat")
+
+
+def run_script(script, timeout=300):
+    """Run script in an other interpreter, which must exit before timeout"""
+    env = environ.copy()
+    path = dirname(dirname(py_eddy_tracker.__file__))
+    env["PYTHONPATH"] = pathsep.join((path, env.get("PYTHONPATH", "")))
+    run([sys.executable, "-c", script], env=env, timeout=timeout, check=True)
+
+
 X = 0.025
 contour = Path(
     (
@@ -87,6 +128,28 @@ def test_interp():
     assert isnan(g.interp("z", x2, y2))
 
 
+def test_interpolation_plan():
+    g = RegularGridDataset(
+        get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc"),
+        "longitude",
+        "latitude",
+    )
+    x, y = meshgrid(arange(-10, 40, 0.37), arange(28, 48, 0.29))
+    x, y = x.reshape(-1), y.reshape(-1)
+    adt, sla = g.grid("adt"), g.grid("sla")
+    for method in ("bilinear", "nearest"):
+        plan = g.interpolation_plan(x, y, method)
+        for z, name in ((adt, "adt"), (sla, "sla")):
+            ref = g.interp(name, x, y, method)
+            values = plan.apply(z)
+            assert (isnan(ref) == isnan(values)).all()
+            assert values[~isnan(ref)] == approx(ref[~isnan(ref)])
+        # Several grids in one call
+        values = plan.apply(ma.stack((adt, sla)))
+        assert values.shape == (2, x.size)
+        assert (isnan(values[1]) == isnan(g.interp("sla", x, y, method))).all()
+
+
 def test_convolution():
     """
     Add some dummy check on convolution filter
@@ -122,3 +185,246 @@ def test_convolution():
     d = g.convolve_filter_with_dynamic_kernel("z", kernel_func)
     assert not isnan(d[0, 0])
     assert isnan(d[1:4, 1:4]).all()
+
+
+def test_convolution_thread():
+    g = RegularGridDataset(
+        get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc"),
+        "longitude",
+        "latitude",
+    )
+    kw = dict(kernel_func=g.kernel_bessel, wave_length=500, order=1)
+    d = g.convolve_filter_with_dynamic_kernel("adt", **kw)
+    d_thread = g.convolve_filter_with_dynamic_kernel("adt", nb_thread=3, **kw)
+    assert (d.mask == d_thread.mask).all()
+    assert (d == d_thread).all()
+
+
+def test_kernel_cache(tmp_path):
+    filename = get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc")
+    g = RegularGridDataset(filename, "longitude", "latitude", kernel_cache=None)
+    g.bessel_high_filter("adt", 500)
+    cache = KernelCache(str(tmp_path))
+    g_cache = RegularGridDataset(
+        filename, "longitude", "latitude", kernel_cache=cache
+    )
+    g_cache.bessel_high_filter("adt", 500)
+    assert (g.grid("adt") == g_cache.grid("adt")).all()
+    (kernel_file,) = tmp_path.iterdir()
+    date = kernel_file.stat().st_mtime_ns
+    # A new cache on the same directory read kernels without computing them
+    cache = KernelCache(str(tmp_path))
+    g_cache = RegularGridDataset(
+        filename, "longitude", "latitude", kernel_cache=cache
+    )
+    g_cache.bessel_high_filter("adt", 500)
+    assert kernel_file.stat().st_mtime_ns == date
+    assert (g.grid("adt") == g_cache.grid("adt")).all()
+    # Least recently used set of parameters is removed from memory when cache is full
+    cache = KernelCache(str(tmp_path / "lru"), max_size=1)
+    g_cache = RegularGridDataset(filename, "longitude", "latitude", kernel_cache=cache)
+    g_cache.bessel_high_filter("adt", 500)
+    for g_ in (g, g_cache):
+        g_.bessel_high_filter("adt", 300)
+    assert (g.grid("adt") == g_cache.grid("adt")).all()
+    (kernels,) = cache.kernels.values()
+    assert cache.size == sum(kernel.nbytes for kernel in kernels.values())
+    assert len(list((tmp_path / "lru").iterdir())) == 2
+
+
+def test_grid_cache(tmp_path):
+    filename = get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc")
+    g = RegularGridDataset(filename, "longitude", "latitude")
+    g.add_uv("adt")
+    g.bessel_high_filter("adt", 500)
+    for _ in range(2):
+        cache = GridCache(str(tmp_path))
+        g_cache = RegularGridDataset(filename, "longitude", "latitude", cache=cache)
+        g_cache.add_uv("adt")
+        g_cache.bessel_high_filter("adt", 500)
+        for name in ("adt", "u", "v"):
+            assert (g.grid(name) == g_cache.grid(name)).all()
+            assert (g.grid(name).mask == g_cache.grid(name).mask).all()
+        assert len(list(tmp_path.iterdir())) == 2
+    # Another wavelength is a new entry
+    g_cache = RegularGridDataset(filename, "longitude", "latitude", cache=cache)
+    g_cache.bessel_high_filter("adt", 400)
+    assert len(list(tmp_path.iterdir())) == 3
+    # Key of a variable modified in place is dropped, u/v cached from unfiltered
+    # height must not be used
+    g = RegularGridDataset(filename, "longitude", "latitude")
+    g.lanczos_high_filter("adt", 500)
+    g.add_uv("adt")
+    g_cache = RegularGridDataset(filename, "longitude", "latitude", cache=cache)
+    g_cache.grid("adt")
+    g_cache.lanczos_high_filter("adt", 500)
+    assert g_cache.var_key("adt") is None
+    g_cache.add_uv("adt")
+    for name in ("u", "v"):
+        assert (g.grid(name) == g_cache.grid(name)).all()
+    # Cache size is limited
+    cache.max_size = 1
+    cache.evict()
+    assert len(list(tmp_path.iterdir())) == 0
+
+
+def test_warmup():
+    kernels = warmup(["advection"])
+    for name in ("advect_t_rk4", "advect_t", "advect_rk4", "advect"):
+        names = [k for k in kernels if k.endswith(f".{name}")]
+        assert len(names) == 1
+        assert len(kernels[names[0]]) > 0
+
+
+def test_compute_uv():
+    g = RegularGridDataset(
+        get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc"),
+        "longitude",
+        "latitude",
+    )
+    data = g.grid("adt")
+    day = 23 * 3600 + 56 * 60 + 4.1
+    gof = g.GRAVITY * day / (sin(deg2rad(g.y_c)) * 4 * pi)
+    u, v = g.compute_uv(data)
+    # Same result than stencils computed separately
+    u_ = -g.compute_stencil(data, vertical=True) * gof
+    v_ = g.compute_stencil(data) * gof
+    for a, b in ((u, u_), (v, v_)):
+        assert (a.mask == b.mask).all()
+        assert abs(a - b).max() / abs(b).max() < 1e-10
+    # Output buffers are reused
+    u2, v2 = g.compute_uv(data, out=(u, v))
+    assert u2 is u and v2 is v
+
+
+POOL_AFTER_UV = """
+from multiprocessing import Pool
+from py_eddy_tracker.data import get_demo_path
+from py_eddy_tracker.dataset.grid import RegularGridDataset
+
+g = RegularGridDataset(
+    get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc"), "longitude", "latitude"
+)
+g.add_uv("adt")
+with Pool(2) as pool:
+    assert pool.map(abs, [-1, -2]) == [1, 2]
+"""
+
+
+def test_compute_uv_then_pool():
+    # A process pool used after add_uv must not block exit of interpreter
+    run_script(POOL_AFTER_UV)
+
+
+def test_curvilinear_index(tmp_path):
+    # Rotated grid
+    i, j = meshgrid(arange(80), arange(60), indexing="ij")
+    a = deg2rad(30)
+    x, y = 0.1 * (i * cos(a) - j * sin(a)), 0.1 * (i * sin(a) + j * cos(a))
+    index = CurvilinearIndex.build(x, y)
+    x_flat, y_flat = x.reshape(-1), y.reshape(-1)
+    points = array(((1.02, 3.51), (-10, 0), (5.3, 2.25), (0.5, 6)))
+    dist, idx = index.query(points, k=4)
+    for (x0, y0), d, n in zip(points, dist, idx):
+        d_ = ((x_flat - x0) ** 2 + (y_flat - y0) ** 2) ** 0.5
+        assert (n == d_.argsort()[:4]).all()
+        assert d == approx(d_[n])
+    assert index.query((1.02, 3.51))[1] == idx[0, 0]
+    vertices = array(((1, 3), (3, 2.5), (4, 5), (1.5, 6), (1, 3)), dtype="f8")
+    i_x, i_y = index.pixels_in(vertices, x.shape, 0, 80, 0, 60)
+    i_x_, i_y_ = _get_pixel_in_unregular(vertices, x, y, 0, 80, 0, 60)
+    assert i_x.size > 100
+    assert (i_x == i_x_).all() and (i_y == i_y_).all()
+    # Index is stored and read by an other cache
+    cache = CurvilinearIndexCache(str(tmp_path))
+    assert cache.get(x, y) is cache.get(x, y)
+    assert len(list(tmp_path.iterdir())) == 1
+    index = CurvilinearIndexCache(str(tmp_path)).get(x, y)
+    assert (index.query(points, k=4)[1] == idx).all()
+
+
+def test_spectrum_lonlat():
+    from scipy.interpolate import interp1d
+    from scipy.signal import welch
+
+    g = RegularGridDataset(
+        get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc"),
+        "longitude",
+        "latitude",
+    )
+    area = dict(llcrnrlon=4.25, urcrnrlon=10, llcrnrlat=38.5, urcrnrlat=43)
+    (wave_x, pw_x), (wave_y, pw_y) = g.spectrum_lonlat("adt", area=area)
+    # Same spectrum as welch line by line with step of each latitude
+    x0, y0 = g.nearest_grd_indice(area["llcrnrlon"], area["llcrnrlat"])
+    x1, y1 = g.nearest_grd_indice(area["urcrnrlon"], area["urcrnrlat"])
+    data = g.grid("adt")[x0:x1, y0:y1]
+    pws = list()
+    for i, lat in enumerate(g.y_c[y0:y1]):
+        step = g.xstep * distance(0, lat, 1, lat) / 1000
+        f, pw = welch(data[:, i], 1 / step)
+        pws.append(interp1d(f, pw)(1 / wave_x[1:]))
+    assert pw_x[1:] == approx(array(pws).mean(axis=0))
+    assert pw_y.shape == wave_y.shape
+
+
+def test_iter_netcdf_cube():
+    filename = get_demo_path("dt_med_allsat_phy_l4_2005T2.nc")
+    kw = dict(x_name="longitude", y_name="latitude")
+    # Grids kept after the end of iteration read the file again
+    cube = RegularGridDataset.iter_netcdf_cube(filename, t_name="time", **kw)
+    grids = [next(cube)[1], next(cube)[1]]
+    cube.close()
+    for i, g in enumerate(grids):
+        g_ = RegularGridDataset(filename, indexs=dict(time=i), **kw)
+        assert g.units("adt") == g_.units("adt")
+        assert (g.grid("adt") == g_.grid("adt")).all()
+
+
+COARSE_TO_FINE_STATS = """
+from datetime import datetime
+from py_eddy_tracker.data import get_demo_path
+from py_eddy_tracker.dataset.grid import IdentificationStats, RegularGridDataset
+
+g = RegularGridDataset(
+    get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc"), "longitude", "latitude"
+)
+g.add_uv("adt")
+stats = IdentificationStats()
+g.eddy_identification_coarse_to_fine(
+    "adt", "u", "v", datetime(2016, 5, 15), factor=2, nb_process=2, stats=stats,
+    step=0.002, shape_error=55,
+)
+stats.to_json("%s")
+"""
+
+
+def test_eddy_identification_coarse_to_fine(tmp_path):
+    from datetime import datetime
+
+    g = RegularGridDataset(
+        get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc"),
+        "longitude",
+        "latitude",
+    )
+    g.add_uv("adt")
+    kw = dict(step=0.002, shape_error=55)
+    date = datetime(2016, 5, 15)
+    references = g.eddy_identification("adt", "u", "v", date, **kw)
+    eddies = g.eddy_identification_coarse_to_fine(
+        "adt", "u", "v", date, factor=2, **kw
+    )
+    for e, ref in zip(eddies, references):
+        recall = identification_recall(e, ref)
+        assert recall["reference"] == len(ref)
+        assert recall["recall"] > 0.9
+    # Stats of windows identified in other process are added, coarse pass is not counted
+    stats = IdentificationStats()
+    g.eddy_identification_coarse_to_fine(
+        "adt", "u", "v", date, factor=2, stats=stats, **kw
+    )
+    assert stats.counts["cyclonic"]["accepted"] >= len(eddies[1])
+    # Pool is used in an other interpreter, which must exit
+    filename = tmp_path / "stats.json"
+    run_script(COARSE_TO_FINE_STATS % filename)
+    with open(filename) as f:
+        assert json.load(f)["counts"] == stats.counts
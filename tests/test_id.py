@@ -1,7 +1,17 @@
 from datetime import datetime
+import json
+from os import environ, listdir, pathsep
+from os.path import dirname
+from subprocess import run
+import sys
 
+from numpy import arange, sort
+
+import py_eddy_tracker
+from py_eddy_tracker.appli.grid import eddy_id_batch, identification, identification_cube
 from py_eddy_tracker.data import get_demo_path
-from py_eddy_tracker.dataset.grid import RegularGridDataset
+from py_eddy_tracker.dataset.grid import IdentificationStats, RegularGridDataset
+from py_eddy_tracker.eddy_feature import Contours
 
 g = RegularGridDataset(
     get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc"), "longitude", "latitude"
@@ -13,3 +23,158 @@ def test_id():
     a, c = g.eddy_identification("adt", "u", "v", datetime(2019, 2, 23))
     assert len(a) == 36
     assert len(c) == 36
+
+
+def test_id_float32():
+    eddies = dict()
+    for dtype in (None, "f4"):
+        g_ = RegularGridDataset(
+            get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc"),
+            "longitude",
+            "latitude",
+            dtype=dtype,
+        )
+        g_.add_uv("adt")
+        g_.bessel_high_filter("adt", 500)
+        eddies[dtype] = g_.eddy_identification("adt", "u", "v", datetime(2019, 2, 23))
+    assert g_.grid("adt").dtype == "f4"
+    assert g_.grid("u").dtype == "f4"
+    for e8, e4 in zip(eddies[None], eddies["f4"]):
+        assert len(e8) == len(e4)
+        d = (e8.lon[:, None] - e4.lon) ** 2 + (e8.lat[:, None] - e4.lat) ** 2
+        i = d.argmin(axis=1)
+        assert (d.min(axis=1) ** 0.5 < 1e-5).all()
+        assert (abs(e8.amplitude - e4.amplitude[i]) < 1e-6).all()
+
+
+def test_id_batch(tmp_path):
+    args = [
+        get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc"),
+        "adt",
+        "None",
+        "None",
+        "longitude",
+        "latitude",
+        str(tmp_path),
+        "--nb_process",
+        "1",
+    ]
+    eddy_id_batch(args)
+    outputs = sorted(listdir(tmp_path))
+    assert outputs == [
+        "Anticyclonic_20190101T000000.nc",
+        "Cyclonic_20190101T000000.nc",
+    ]
+    # Second call must skip dates already computed
+    date = (tmp_path / outputs[0]).stat().st_mtime
+    eddy_id_batch(args)
+    assert (tmp_path / outputs[0]).stat().st_mtime == date
+
+
+def test_id_cube():
+    filename = get_demo_path("dt_med_allsat_phy_l4_2005T2.nc")
+    kw = dict(lon="longitude", lat="latitude", h="adt")
+    cube = identification_cube(filename, t_name="time", steps=[0, 10], **kw)
+    for i, (date, a, c) in zip((0, 10), cube):
+        assert date == datetime(2005, 4, 1 + i)
+        a_, c_ = identification(filename, date=date, indexs=dict(time=i), **kw)
+        assert (a.obs == a_.obs).all()
+        assert (c.obs == c_.obs).all()
+
+
+TILED_STATS = """
+from datetime import datetime
+from py_eddy_tracker.data import get_demo_path
+from py_eddy_tracker.dataset.grid import IdentificationStats, RegularGridDataset
+
+g = RegularGridDataset(
+    get_demo_path("dt_med_allsat_phy_l4_20160515_20190101.nc"), "longitude", "latitude"
+)
+g.add_uv("adt")
+stats = IdentificationStats()
+g.eddy_identification_tiled(
+    "adt", "u", "v", datetime(2019, 2, 23), tiles=(3, 2), nb_process=2, stats=stats
+)
+stats.to_json("%s")
+"""
+
+
+def run_script(script, timeout=300):
+    """Run script in an other interpreter, which must exit before timeout"""
+    env = environ.copy()
+    path = dirname(dirname(py_eddy_tracker.__file__))
+    env["PYTHONPATH"] = pathsep.join((path, env.get("PYTHONPATH", "")))
+    run([sys.executable, "-c", script], env=env, timeout=timeout, check=True)
+
+
+def test_id_tiled(tmp_path):
+    g.add_uv("adt")
+    a, c = g.eddy_identification("adt", "u", "v", datetime(2019, 2, 23))
+    a_t, c_t = g.eddy_identification_tiled(
+        "adt", "u", "v", datetime(2019, 2, 23), tiles=(3, 2)
+    )
+    assert len(a_t) == len(a)
+    assert len(c_t) == len(c)
+    assert (sort(a_t.amplitude) == sort(a.amplitude)).all()
+    assert (sort(c_t.lon) == sort(c.lon)).all()
+    # Stats of tiles identified in other process are added
+    stats = IdentificationStats()
+    g.eddy_identification_tiled(
+        "adt", "u", "v", datetime(2019, 2, 23), tiles=(3, 2), stats=stats
+    )
+    assert stats.counts["anticyclonic"]["accepted"] >= len(a)
+    # Pool is used in an other interpreter, which must exit
+    filename = tmp_path / "stats.json"
+    run_script(TILED_STATS % filename)
+    with open(filename) as f:
+        assert json.load(f)["counts"] == stats.counts
+
+
+def test_contour_backend():
+    data = g.grid("adt")
+    levels = arange(-0.5, 0.5, 0.002)
+    c_native = Contours(g.x_c, g.y_c, data, levels, backend="native")
+    c_mpl = Contours(g.x_c, g.y_c, data, levels, backend="matplotlib")
+    assert (c_native.nb_contour_per_level == c_mpl.nb_contour_per_level).all()
+    assert c_native.nb_pt_per_contour.sum() == c_mpl.nb_pt_per_contour.sum()
+    for bound in ("x_min", "x_max", "y_min", "y_max"):
+        v_native = sort(getattr(c_native, f"{bound}_per_contour"))
+        v_mpl = sort(getattr(c_mpl, f"{bound}_per_contour"))
+        assert abs(v_native - v_mpl).max() < 1e-10
+
+
+def test_nearest_path_index():
+    c = Contours(g.x_c, g.y_c, g.grid("adt"), arange(-0.5, 0.5, 0.01))
+    for level, coll in enumerate(c.iter()):
+        for path in coll.get_paths():
+            x, y = path.vertices[1]
+            assert c.get_index_nearest_path_bbox_contain_pt(level, x, y) is path
+        # Point outside of all bbox
+        assert c.get_index_nearest_path_bbox_contain_pt(level, 0, -90) is None
+
+
+def test_speed_coef_mean_contours():
+    g.add_uv("adt")
+    g.init_speed_coef()
+    c = Contours(g.x_c, g.y_c, g.grid("adt"), arange(-0.5, 0.5, 0.01))
+    speeds = g.speed_coef_mean_contours(c)
+    level = len(c.levels) // 2
+    i_start, i_stop = c.contours_range(level)
+    assert (g.speed_coef_mean_contours(c, level) == speeds[i_start:i_stop]).all()
+    for coll in c.iter():
+        for path in coll.get_paths():
+            assert speeds[path.i_contour] == g.speed_coef_mean(path)
+
+
+def test_id_stats(tmp_path):
+    g.add_uv("adt")
+    stats = IdentificationStats()
+    a, c = g.eddy_identification("adt", "u", "v", datetime(2019, 2, 23), stats=stats)
+    assert stats.counts["anticyclonic"]["accepted"] == len(a)
+    assert stats.counts["cyclonic"]["accepted"] == len(c)
+    assert stats.counts["anticyclonic"]["shape_error"] > 0
+    for stage in ("contours", "fit_circle", "pixels_in", "get_amplitude", "get_uavg"):
+        assert stats.timing[stage] > 0
+    stats.to_json(tmp_path / "stats.json")
+    with open(tmp_path / "stats.json") as f:
+        assert json.load(f) == stats.to_dict()
@@ -0,0 +1,56 @@
+from json import loads
+from os import environ, pathsep
+from os.path import dirname
+from subprocess import check_output
+import sys
+
+import py_eddy_tracker
+
+# Import budget in second and modules which must not be loaded by entry point modules
+IMPORT_BUDGET = {
+    "py_eddy_tracker": (
+        1,
+        ("zarr", "numba", "matplotlib", "scipy", "netCDF4", "cv2", "pint", "requests"),
+    ),
+    "py_eddy_tracker.appli.misc": (
+        1,
+        ("zarr", "numba", "matplotlib", "scipy", "netCDF4", "cv2", "pint", "requests"),
+    ),
+    "py_eddy_tracker.appli.eddies": (
+        5,
+        ("zarr", "matplotlib", "cv2", "pint", "requests", "scipy.signal"),
+    ),
+    "py_eddy_tracker.appli.network": (
+        5,
+        ("zarr", "matplotlib", "cv2", "pint", "requests", "scipy.signal"),
+    ),
+    "py_eddy_tracker.appli.grid": (
+        5,
+        ("zarr", "matplotlib.figure", "pint", "requests", "scipy.signal"),
+    ),
+}
+
+SCRIPT = """
+from json import dumps
+import sys
+from time import perf_counter
+
+t0 = perf_counter()
+import %s
+print(dumps(dict(time=perf_counter() - t0, modules=list(sys.modules))))
+"""
+
+
+def import_cost(module):
+    env = environ.copy()
+    path = dirname(dirname(py_eddy_tracker.__file__))
+    env["PYTHONPATH"] = pathsep.join((path, env.get("PYTHONPATH", "")))
+    return loads(check_output([sys.executable, "-c", SCRIPT % module], env=env))
+
+
+def test_import_budget():
+    for module, (budget, forbidden) in IMPORT_BUDGET.items():
+        cost = import_cost(module)
+        loaded = [i for i in forbidden if i in cost["modules"]]
+        assert loaded == [], f"{module} loads {loaded}"
+        assert cost["time"] < budget, f"{module} imported in {cost['time']:.2f} s"
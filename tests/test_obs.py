@@ -1,7 +1,15 @@
+from numpy import array_equal, empty, ma, nan
 import zarr
 
 from py_eddy_tracker.data import get_demo_path
-from py_eddy_tracker.observations.observation import EddiesObservations
+from py_eddy_tracker.dataset.grid import RegularGridDataset
+from py_eddy_tracker.generic import bbox_indice_regular
+from py_eddy_tracker.observations.observation import (
+    EddiesObservations,
+    ObservationsBuilder,
+    PixelFootprint,
+)
+from py_eddy_tracker.poly import create_vertice, get_pixel_in_regular
 
 a_filename, c_filename = (
     get_demo_path("Anticyclonic_20190223.nc"),
@@ -34,3 +42,73 @@ def test_index():
         memory_store, indexs=dict(obs=slice(500, 1000)), buffer_size=50
     )
     assert a_nc_subset == a_zarr_subset
+
+
+def test_builder():
+    builder = ObservationsBuilder(EddiesObservations.new_like(a, 0), capacity=2)
+    for i in range(len(a)):
+        builder.append(**{k: a.obs[k][i] for k in a.fields})
+    assert builder.capacity >= len(a)
+    new = builder.build()
+    assert len(new) == len(a)
+    assert (new.obs == a.obs).all()
+    assert len(ObservationsBuilder(a).build()) == 0
+
+
+def grid_stat_reference(eddies, g, varname, method, i):
+    """interp_grid on contours before PixelFootprint, pixels of each contour are
+    searched and reduced one by one like the previous grid_stat"""
+    x0 = g.x_bounds[0]
+    x_name, y_name = eddies.intern(False)
+    x_ref = ((eddies.longitude - x0) % 360 + x0 - 180).reshape(-1, 1)
+    x, y = ((eddies[x_name] - x_ref) % 360 + x_ref)[i], eddies[y_name][i]
+    grid = g.grid(varname)
+    data, mask = grid.data, ma.getmaskarray(grid)
+    if method == "min":
+        data = -data
+    xstep, ystep = g.x_c[1] - g.x_c[0], g.y_c[1] - g.y_c[0]
+    x0, y0 = g.x_c - xstep / 2.0, g.y_c - ystep / 2.0
+    result = empty(x.shape[0], dtype=grid.dtype)
+    for elt in range(x.shape[0]):
+        v = create_vertice(x[elt], y[elt])
+        (x_start, x_stop), (y_start, y_stop) = bbox_indice_regular(
+            v, x0, y0, xstep, ystep, 1, g.is_circular(), g.x_c.shape[0]
+        )
+        i_x, i_y = get_pixel_in_regular(v, g.x_c, g.y_c, x_start, x_stop, y_start, y_stop)
+        if method == "count":
+            result[elt] = i_x.shape[0]
+        elif method == "mean":
+            v_sum, nb = 0, 0
+            for i_, j_ in zip(i_x, i_y):
+                if not mask[i_, j_]:
+                    v_sum += data[i_, j_]
+                    nb += 1
+            result[elt] = v_sum / nb if nb else nan
+        else:
+            # Mask is not used for max
+            result[elt] = max([-1e40] + [data[i_, j_] for i_, j_ in zip(i_x, i_y)])
+    return -result if method == "min" else result
+
+
+def test_pixel_footprint(tmp_path):
+    g = RegularGridDataset(
+        get_demo_path("nrt_global_allsat_phy_l4_20190223_20190226.nc"),
+        "longitude",
+        "latitude",
+    )
+    i = slice(0, 200)
+    footprint = a.pixel_footprint(g, i=i)
+    assert len(footprint) == 200
+    for method in ("mean", "max", "min", "count"):
+        for varname in ("adt", "ugos"):
+            reference = grid_stat_reference(a, g, varname, method, i)
+            for values in (
+                a.interp_grid(g, varname, i=i, method=method),
+                a.interp_grid(g, varname, method=method, footprint=footprint),
+            ):
+                assert array_equal(values, reference, equal_nan=True)
+    filename = str(tmp_path / "footprint.npz")
+    footprint.save(filename)
+    footprint_ = PixelFootprint.load(filename)
+    assert footprint_.shape == footprint.shape
+    assert (footprint_.nb_pixel == footprint.nb_pixel).all()
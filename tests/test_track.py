@@ -1,10 +1,12 @@
 from netCDF4 import Dataset
+from numpy import array, array_equal, random
+from pytest import raises
 import zarr
 
 from py_eddy_tracker.data import get_demo_path
 from py_eddy_tracker.featured_tracking.area_tracker import AreaTracker
 from py_eddy_tracker.observations.observation import EddiesObservations
-from py_eddy_tracker.tracking import Correspondances
+from py_eddy_tracker.tracking import Correspondances, TrackStore
 
 filename = get_demo_path("Anticyclonic_20190223.nc")
 a0 = EddiesObservations.load_file(filename)
@@ -48,3 +50,144 @@ def test_area_tracking_parameter():
 
     # test access to the lifetime (item)
     eddies_tracked["lifetime"]
+
+
+class DenseTracker(EddiesObservations):
+    __slots__ = tuple()
+
+    def sparse_tracking(self):
+        return False
+
+
+def test_sparse_tracking():
+    rng = random.default_rng(0)
+    e = a0.index(rng.permutation(len(a0))[:2000])
+    e.lon[:] += rng.normal(0, 0.3, len(e))
+    e.lat[:] += rng.normal(0, 0.3, len(e))
+    e.amplitude[:] *= rng.uniform(0.7, 1.3, len(e))
+    assert a0.sparse_tracking()
+    i, j, cost = a0.tracking(e)
+    dense = DenseTracker.new_like(a0, len(a0))
+    for k in a0.fields:
+        dense[k][:] = a0[k]
+    i_, j_, cost_ = dense.tracking(e)
+    assert array_equal(i, i_) and array_equal(j, j_)
+    assert array_equal(cost, cost_.data)
+    # No candidates
+    i, j, cost = a0.tracking(e.index([]))
+    assert i.size == 0 and cost.size == 0
+
+
+def test_tracking_solver():
+    i, j, cost = array([0, 0, 1]), array([0, 1, 0]), array([0.1, 0.5, 0.2])
+    # Greedy keeps the cheapest link, assignment keeps the most links
+    greedy = EddiesObservations.solve_simultaneous_sparse(i, j, cost)
+    assert greedy.tolist() == [True, False, False]
+    assignment = EddiesObservations.solve_assignment(i, j, cost)
+    assert assignment.tolist() == [False, True, True]
+    # Links are never lost, whatever the sign of costs
+    for shift in (-2.1, -2.5, -20):
+        assignment = EddiesObservations.solve_assignment(i, j, cost + shift)
+        assert assignment.tolist() == [False, True, True]
+
+    e = EddiesObservations.load_file(filename, solver="assignment")
+    assert e.merge(e.index([])).solver == "assignment"
+    i, j, cost = e.tracking(a0)
+    assert array_equal(i, j) and (cost == 0).all()
+
+
+def test_tracking_prefetch():
+    datasets = list()
+    for i in range(5):
+        e = a0.copy()
+        e.lon[:] += 0.05 * i
+        e.time[:] += i
+        h = zarr.group()
+        e.to_zarr(h)
+        datasets.append(h)
+    correspondances = list()
+    for prefetch in (0, 2):
+        c = Correspondances(datasets=datasets, virtual=2, prefetch=prefetch)
+        c.track()
+        correspondances.append(c)
+    assert len(correspondances[0]) == len(correspondances[1]) == 4
+    for c0, c1 in zip(*correspondances):
+        assert array_equal(c0, c1)
+
+
+def test_tracking_parallel(tmp_path):
+    datasets = list()
+    for i in range(6):
+        e = a0.copy()
+        e.lon[:] += 0.05 * i
+        e.time[:] += i
+        filename = str(tmp_path / f"a_{i}.nc")
+        e.write_file(filename=filename)
+        datasets.append(filename)
+    # With less than two couples, tracking falls back on one process
+    for nb_dataset in (1, 2, 6):
+        c = Correspondances(datasets=datasets[:nb_dataset])
+        c.track()
+        c_parallel = Correspondances(datasets=datasets[:nb_dataset], nb_process=2)
+        c_parallel.track()
+        assert c.current_id == c_parallel.current_id
+        assert c.nb_link_max == c_parallel.nb_link_max
+        assert len(c) == len(c_parallel) == nb_dataset - 1
+        for c0, c1 in zip(c, c_parallel):
+            assert array_equal(c0, c1)
+
+
+def test_track_store(tmp_path, monkeypatch):
+    rng = random.default_rng(0)
+    datasets = list()
+    for i in range(6):
+        e = a0.copy()
+        e.lon[:] += 0.05 * i
+        e.time[:] += i
+        # Missing eddies will be replaced by virtual observations
+        e = e.index(sorted(rng.permutation(len(e))[:3000]))
+        filename = str(tmp_path / f"a_{i}.nc")
+        e.write_file(filename=filename)
+        datasets.append(filename)
+    c = Correspondances(datasets=datasets, virtual=2)
+    c.track()
+    c.prepare_merging()
+    tracks = c.merge(raw_data=False)
+    tracks["virtual"][:] = tracks["time"] == 0
+    tracks.filled_by_interpolation(tracks["virtual"] == 1)
+    # First steps, then new steps are appended from saved correspondances
+    c_in = str(tmp_path / "c_in.nc")
+    c = Correspondances(datasets=datasets[:4], virtual=2)
+    c.track()
+    c.save(c_in)
+    store = TrackStore(zarr.group())
+    c.append_to_store(store)
+    assert store.nb_step == 3
+    c = Correspondances(datasets=datasets, virtual=2, previous_correspondance=c_in)
+    c.track()
+    c.append_to_store(store)
+    assert store.nb_step == 5 and store.nb_obs == len(tracks)
+    tracks_ = store.load()
+    for k in ("track", "n", "virtual", "time", "lat"):
+        assert array_equal(tracks[k], tracks_[k])
+    # Step interrupted before index or before commit is removed by next append
+    reference = store
+    c_first = Correspondances(datasets=datasets[:4], virtual=2)
+    c_first.track()
+
+    def interrupt(*args, **kwargs):
+        raise KeyboardInterrupt()
+
+    for method in ("set_track_state", "commit"):
+        store = TrackStore(zarr.group())
+        c_first.append_to_store(store)
+        with monkeypatch.context() as m:
+            m.setattr(TrackStore, method, interrupt)
+            with raises(KeyboardInterrupt):
+                c.append_to_store(store)
+        assert store.nb_step == 3
+        c.append_to_store(store)
+        assert store.nb_step == 5 and store.nb_obs == len(tracks)
+        for name in ("tracks", "index"):
+            for key, values in reference.handler[name].arrays():
+                assert array_equal(store.handler[name][key][:], values[:])